@@ -11,6 +11,7 @@ Author: GlobalCreativeApkDev
 
 
 import sys
+import atexit
 import time
 import uuid
 import pickle
@@ -18,12 +19,29 @@ import copy
 import google.generativeai as gemini
 import random
 import os
+import json
+import hashlib
+import sqlite3
+import threading
+import queue
+import heapq
+import re
+import math
 from dotenv import load_dotenv
 from functools import reduce
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from statistics import NormalDist
+from google.api_core import exceptions as google_exceptions
 
 from mpmath import mp, mpf
 from tabulate import tabulate
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 mp.pretty = True
 
 
@@ -43,6 +61,45 @@ ELEMENT_CHART: list = [
      "OTHER",
      "OTHER", "OTHER", "OTHER"]
 ]
+CITY_NAME_PROMPT: str = "Please enter a good name of a fictional city (safe one word response only please)!"
+AI_TRAINER_NAME_PROMPT: str = "Please enter a good male/female game character name (safe one word response only please)! "
+BALL_NAME_PROMPT: str = "Please enter a good name of a ball to catch a monster like in Pokemon games " \
+                        "(safe one word response only please)!"
+RUNE_NAME_PROMPT: str = "Please enter a good name of a rune to strengthen legendary creatures " \
+                        "(safe one word response only please)!"
+NAME_PROMPTS: list = [CITY_NAME_PROMPT, AI_TRAINER_NAME_PROMPT, BALL_NAME_PROMPT, RUNE_NAME_PROMPT]
+NAME_CATEGORIES: dict = {
+    "CITY": CITY_NAME_PROMPT,
+    "AI_TRAINER": AI_TRAINER_NAME_PROMPT,
+    "BALL": BALL_NAME_PROMPT,
+    "RUNE": RUNE_NAME_PROMPT,
+}
+NAME_PROVIDER_TYPES: list = ["GEMINI", "CACHED_GEMINI", "LOCAL"]
+NAME_CORPUS: dict = {
+    CITY_NAME_PROMPT: ["Avalon", "Brightwater", "Calderon", "Dunmere", "Eldoria", "Falkreath", "Glenhaven",
+                       "Highmoor", "Ironvale", "Jadeport", "Kingsbridge", "Lumina", "Marrowind", "Northhold",
+                       "Oakenshire", "Pyreton", "Quarrowick", "Ravenhurst", "Silverton", "Thornbury", "Umberlee",
+                       "Valmora", "Westmarch", "Yarrowby", "Zephyria", "Ashford", "Belmora", "Cindervale",
+                       "Driftmoor", "Emberfall", "Frostholm", "Goldcrest", "Hollowmere", "Larkspur", "Mistral",
+                       "Novaris", "Oriel", "Portmaris", "Rivenhall", "Stormhaven", "Tidewater", "Verdantia"],
+    AI_TRAINER_NAME_PROMPT: ["Aiden", "Bianca", "Caleb", "Daisy", "Elias", "Fiona", "Gavin", "Hazel", "Isaac",
+                             "Jasmine", "Kieran", "Luna", "Milo", "Nadia", "Oliver", "Piper", "Quinn", "Rosa",
+                             "Silas", "Talia", "Ulric", "Vera", "Wesley", "Xenia", "Yara", "Zane", "Amara",
+                             "Bastian", "Celeste", "Dorian", "Elena", "Felix", "Giselle", "Hugo", "Ivy", "Jonah",
+                             "Kira", "Leon", "Maya", "Nico", "Ophelia", "Rowan", "Sienna", "Theo"],
+    BALL_NAME_PROMPT: ["Captorb", "Snareball", "Glimmersphere", "Tetherorb", "Lureball", "Holdsphere",
+                       "Bindorb", "Cradleball", "Netsphere", "Vaultorb", "Stasisball", "Gripsphere", "Hookorb",
+                       "Keepball", "Lockorb", "Nestsphere", "Prismball", "Quellorb", "Shellsphere", "Trapball",
+                       "Orbix", "Capsulon", "Enclosa", "Harnessa", "Catchora", "Seizor", "Clasperon"],
+    RUNE_NAME_PROMPT: ["Valor", "Fury", "Swift", "Guard", "Energy", "Blade", "Focus", "Rage", "Fatal",
+                       "Despair", "Vampire", "Endure", "Shield", "Revenge", "Will", "Nemesis", "Destroy",
+                       "Fight", "Determination", "Enhance", "Accuracy", "Tolerance", "Violent", "Intangible",
+                       "Seal", "Oblivion", "Aegis", "Zenith", "Ember", "Tempest", "Warden", "Solace"],
+}
+MAX_GEMINI_WORKERS: int = 8
+MAX_BULK_NAME_ATTEMPTS: int = 3
+CACHE_DIRECTORY: str = "../cache"
+CITY_REPRESENTATIONS: list = ["GRID", "COMPACT", "CHUNKED"]
 
 
 # Creating static functions to be used in this game.
@@ -71,46 +128,46 @@ def tabulate_element_chart() -> str:
     return str(tabulate(ELEMENT_CHART, headers='firstrow', tablefmt='fancy_grid'))
 
 
-def generate_random_name() -> str:
+def generate_random_name(rng=random) -> str:
     res: str = ""  # initial value
-    name_length: int = random.randint(3, 25)
+    name_length: int = rng.randint(3, 25)
     for i in range(name_length):
-        res += LETTERS[random.randint(0, len(LETTERS) - 1)]
+        res += LETTERS[rng.randint(0, len(LETTERS) - 1)]
 
     return res.capitalize()
 
 
-def generate_random_legendary_creature(element):
-    # type: (str) -> LegendaryCreature
-    name: str = generate_random_name()
-    max_hp: mpf = mpf(random.randint(45000, 55000))
-    max_magic_points: mpf = mpf(random.randint(45000, 55000))
-    attack_power: mpf = mpf(random.randint(8500, 9500))
-    defense: mpf = mpf(random.randint(8500, 9500))
-    attack_speed: mpf = mpf(random.randint(100, 125))
+def generate_random_legendary_creature(element, rng=random):
+    # type: (str, random.Random) -> LegendaryCreature
+    name: str = generate_random_name(rng)
+    max_hp: mpf = mpf(rng.randint(45000, 55000))
+    max_magic_points: mpf = mpf(rng.randint(45000, 55000))
+    attack_power: mpf = mpf(rng.randint(8500, 9500))
+    defense: mpf = mpf(rng.randint(8500, 9500))
+    attack_speed: mpf = mpf(rng.randint(100, 125))
     skills: list = []  # initial value
     num_attack_skills: int = 0  # initial value
     num_heal_skills: int = 0  # initial value
     for i in range(4):
-        if random.random() < 0.5:
+        if rng.random() < 0.5:
             # Generating attack skill
             num_attack_skills += 1
             new_skill: Skill = Skill("ATTACK SKILL #" + str(num_attack_skills), "An attack skill.",
-                                     "ATTACK", num_attack_skills * mpf("0.01") * random.randint(350, 450),
-                                     mpf("0"), mpf("10") ** (num_attack_skills * random.randint(2, 4)))
+                                     "ATTACK", num_attack_skills * mpf("0.01") * rng.randint(350, 450),
+                                     mpf("0"), mpf("10") ** (num_attack_skills * rng.randint(2, 4)))
             skills.append(new_skill)
         else:
             # Generating heal skill
             num_heal_skills += 1
             new_skill: Skill = Skill("HEAL SKILL #" + str(num_heal_skills), "A heal skill", "HEAL",
-                                     mpf("0"), mpf("10") ** (num_attack_skills * random.randint(1, 3)),
-                                     mpf("10") ** (num_attack_skills * random.randint(2, 4)))
+                                     mpf("0"), mpf("10") ** (num_attack_skills * rng.randint(1, 3)),
+                                     mpf("10") ** (num_attack_skills * rng.randint(2, 4)))
             skills.append(new_skill)
 
-    awaken_bonus: AwakenBonus = AwakenBonus(mpf(random.randint(115, 135)), mpf(random.randint(115, 135)),
-                                            mpf(random.randint(115, 135)), mpf(random.randint(115, 135)),
-                                            mpf(random.randint(0, 15)),
-                                            mpf(0.01 * random.randint(0, 15)), mpf(0.01 * random.randint(0, 15)))
+    awaken_bonus: AwakenBonus = AwakenBonus(mpf(rng.randint(115, 135)), mpf(rng.randint(115, 135)),
+                                            mpf(rng.randint(115, 135)), mpf(rng.randint(115, 135)),
+                                            mpf(rng.randint(0, 15)),
+                                            mpf(0.01 * rng.randint(0, 15)), mpf(0.01 * rng.randint(0, 15)))
     new_legendary_creature: LegendaryCreature = LegendaryCreature(name, element, max_hp, max_magic_points,
                                                                   attack_power, defense, attack_speed, skills,
                                                                   awaken_bonus)
@@ -178,10 +235,509 @@ def save_game_data(game_data, file_name):
 
 def clear():
     # type: () -> None
-    if sys.platform.startswith('win'):
-        os.system('cls')  # For Windows System
+    if isinstance(sys.stdout, Terminal):
+        sys.stdout.clear()
+    elif sys.stdout.isatty():
+        sys.stdout.write(Terminal.CLEAR_SCREEN)
+
+
+def ask_gemini_for_name(client_manager, prompt, rate_limiter=None):
+    # type: (GeminiClientManager, str, RateLimiter or None) -> str
+    num_attempts: list = [0]  # initial value
+
+    def send_message(message):
+        # type: (str) -> str
+        num_attempts[0] += 1
+        return client_manager.send_message(message)
+
+    start_time: float = time.perf_counter()
+    try:
+        if client_manager.call_policy is not None:
+            text: str = client_manager.call_policy.call(send_message, prompt, rate_limiter=rate_limiter)
+        else:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            text: str = send_message(prompt)
+    except GeminiUnavailableError:
+        client_manager.stats.record_call(prompt, time.perf_counter() - start_time, max(0, num_attempts[0] - 1),
+                                         "", failed=True)
+        raise
+
+    client_manager.stats.record_call(prompt, time.perf_counter() - start_time, num_attempts[0] - 1, text)
+    return text
+
+
+def make_bulk_name_prompt(prompt, num_names):
+    # type: (str, int) -> str
+    return "Please enter a JSON array of " + str(num_names) + " unique one word names, each of them being a " \
+           "response to the following request: \"" + str(prompt).strip() + "\" Respond with the JSON array only!"
+
+
+def parse_bulk_name_prompt(bulk_name_prompt):
+    # type: (str) -> tuple or None
+    """
+    Finding out which prompt and how many names a prompt made by make_bulk_name_prompt() asks for.
+    :return: a tuple with the prompt and the number of names, or None if 'bulk_name_prompt' is not such a prompt
+    """
+
+    match = re.fullmatch(r"Please enter a JSON array of (\d+) unique one word names, each of them being a "
+                         r"response to the following request: \"(.*)\" Respond with the JSON array only!",
+                         bulk_name_prompt, re.DOTALL)
+    if match is None:
+        return None
+    return match.group(2), int(match.group(1))
+
+
+def parse_bulk_names(text, num_names):
+    # type: (str, int) -> list
+    """
+    Parsing the names in a JSON array returned by Google Gemini AI. Anything which is not a one word name and any
+    duplicated name is left out.
+    :return: at most 'num_names' unique names
+    """
+
+    start: int = text.find("[")
+    end: int = text.rfind("]")
+    if start < 0 or end < start:
+        return []
+
+    try:
+        parsed_names = json.loads(text[start:end + 1])
+    except ValueError:
+        return []
+
+    if not isinstance(parsed_names, list):
+        return []
+
+    names: list = []  # initial value
+    seen_names: set = set()  # initial value
+    for parsed_name in parsed_names:
+        if not isinstance(parsed_name, str):
+            continue
+
+        name: str = parsed_name.strip()
+        if len(name.split()) != 1 or name.lower() in seen_names:
+            continue
+
+        names.append(name)
+        seen_names.add(name.lower())
+        if len(names) == num_names:
+            break
+
+    return names
+
+
+def ask_gemini_for_bulk_names(client_manager, prompt, num_names, rate_limiter=None):
+    # type: (GeminiClientManager, str, int, RateLimiter or None) -> list
+    """
+    Asking Google Gemini AI for 'num_names' unique names for 'prompt' as a JSON array in one call. Only the
+    shortfall is asked for again, and any names still missing after that are asked for one by one, each up to
+    MAX_BULK_NAME_ATTEMPTS times until it is unique too. If Google Gemini AI becomes unavailable on the way, the names
+    obtained so far are kept.
+    :return: a list of 'num_names' names, with None for the names which could not be obtained
+    """
+
+    names: list = []  # initial value
+    seen_names: set = set()  # initial value
+    attempts: int = 0  # initial value
+    try:
+        while len(names) < num_names and attempts < MAX_BULK_NAME_ATTEMPTS:
+            attempts += 1
+            shortfall: int = num_names - len(names)
+            for name in parse_bulk_names(ask_gemini_for_name(client_manager, make_bulk_name_prompt(prompt, shortfall),
+                                                             rate_limiter), shortfall):
+                if name.lower() not in seen_names:
+                    names.append(name)
+                    seen_names.add(name.lower())
+
+        while len(names) < num_names:
+            for attempt in range(MAX_BULK_NAME_ATTEMPTS):
+                name: str = ask_gemini_for_name(client_manager, prompt, rate_limiter).strip()
+                if name.lower() not in seen_names:
+                    names.append(name)
+                    seen_names.add(name.lower())
+                    break
+            else:
+                names.append(None)
+    except GeminiUnavailableError:
+        pass
+
+    return names + [None] * (num_names - len(names))
+
+
+def ask_gemini_for_names(client_manager, prompts, rate_limiter=None):
+    # type: (GeminiClientManager, list, RateLimiter or None) -> list
+    """
+    Asking Google Gemini AI for a name for each prompt in 'prompts'. Prompts asked more than once are asked in bulk,
+    and different prompts are asked concurrently.
+    :return: the names in the same order as 'prompts', with None for the names which could not be asked for because
+    Google Gemini AI is unavailable
+    """
+
+    if len(prompts) == 0:
+        return []
+
+    indices_by_prompt: dict = {}  # initial value
+    for i in range(len(prompts)):
+        indices_by_prompt.setdefault(prompts[i], []).append(i)
+
+    def ask(prompt):
+        # type: (str) -> list
+        num_names: int = len(indices_by_prompt[prompt])
+        try:
+            if num_names == 1:
+                return [ask_gemini_for_name(client_manager, prompt, rate_limiter)]
+            return ask_gemini_for_bulk_names(client_manager, prompt, num_names, rate_limiter)
+        except GeminiUnavailableError:
+            return [None] * num_names
+
+    names: list = [None] * len(prompts)  # initial value
+    with ThreadPoolExecutor(max_workers=min(MAX_GEMINI_WORKERS, len(indices_by_prompt))) as executor:
+        for prompt, prompt_names in zip(indices_by_prompt.keys(), executor.map(ask, indices_by_prompt.keys())):
+            for i in range(len(prompt_names)):
+                names[indices_by_prompt[prompt][i]] = prompt_names[i]
+
+    return names
+
+
+def create_generative_model(generation_config, safety_settings):
+    # type: (dict, list) -> gemini.GenerativeModel or StubGenerativeModel
+    """
+    Creating the generative model used in this game. If the environment variable GEMINI_BACKEND is "STUB", a local
+    stand-in for Google Gemini AI configured by the GEMINI_STUB_* environment variables is used instead.
+    :return: a generative model
+    """
+
+    if os.environ.get("GEMINI_BACKEND", "GEMINI").upper() == "STUB":
+        return StubGenerativeModel.from_environment(generation_config, safety_settings)
+
+    return gemini.GenerativeModel(model_name="gemini-1.0-pro",
+                                  generation_config=generation_config,
+                                  safety_settings=safety_settings)
+
+
+def benchmark_name_generation(client_manager, num_cities=5, num_shops=5):
+    # type: (GeminiClientManager, int, int) -> dict
+    """
+    Measuring how long generating cities and stocking item shops take with 'client_manager', without any name cache
+    or prefetching. Using StubGenerativeModel gives reproducible numbers on a machine with no network.
+    :return: a dictionary with the average number of seconds taken per city and per item shop
+    """
+
+    trainer: Trainer = Trainer("BENCHMARK")
+    for i in range(5):
+        new_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
+                                                     (random.choice(LegendaryCreature.POTENTIAL_ELEMENTS)))
+        trainer.add_legendary_creature(new_legendary_creature)
+        trainer.add_legendary_creature_to_team(new_legendary_creature)
+
+    name_provider: GeminiNameProvider = GeminiNameProvider(client_manager)
+    start_time: float = time.perf_counter()
+    for i in range(num_cities):
+        generate_city(name_provider, trainer)
+
+    city_time: float = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for i in range(num_shops):
+        generate_items_sold(name_provider)
+
+    shop_time: float = time.perf_counter() - start_time
+    return {
+        "seconds_per_city": city_time / max(1, num_cities),
+        "seconds_per_item_shop": shop_time / max(1, num_shops),
+    }
+
+
+def benchmark_battles(num_battles=100, seed=0):
+    # type: (int, int) -> dict
+    """
+    Measuring how long the same battles take with each numeric backend. Every numeric backend plays battles between
+    the same randomly generated teams with the same random number generator seeds.
+    :return: a dictionary with the average number of seconds taken per battle with each numeric backend and the
+    speedup of "FLOAT" over "MPF"
+    """
+
+    rng: random.Random = random.Random(seed)
+    matchups: list = []  # initial value
+    for i in range(num_battles):
+        matchups.append([BattleTeam([generate_random_legendary_creature(
+            rng.choice(LegendaryCreature.POTENTIAL_ELEMENTS), rng)
+            for j in range(BattleTeam.MAX_LEGENDARY_CREATURES)]) for k in range(2)])
+
+    result: dict = {}
+    for numeric_backend_name in NumericBackend.NAMES:
+        cloned_matchups: list = [[team.clone() for team in matchup] for matchup in matchups]
+        start_time: float = time.perf_counter()
+        for i in range(num_battles):
+            team1, team2 = cloned_matchups[i]
+            BattleEngine(team1, team2, FocusedBattlePolicy(), RandomBattlePolicy(), rng=random.Random(i),
+                         numeric_backend_name=numeric_backend_name).run()
+
+        result["seconds_per_battle_" + numeric_backend_name.lower()] = \
+            (time.perf_counter() - start_time) / max(1, num_battles)
+
+    result["speedup"] = result["seconds_per_battle_mpf"] / result["seconds_per_battle_float"]
+    return result
+
+
+def get_saved_game_files():
+    # type: () -> list
+    """
+    Listing the saved games in the "saved" folder, leaving out the folders of the cities cached for them.
+    :return: a list of file names
+    """
+
+    return [f for f in os.listdir("../saved") if os.path.isfile(os.path.join("../saved", f))]
+
+
+def get_city_cache_directory(player_trainer_name):
+    # type: (str) -> str
+    """
+    Getting the folder the cities left in the saved game of 'player_trainer_name' are written to, so that the world
+    graph of one saved game never points at cities written by another.
+    :return: the path of the folder
+    """
+
+    return os.path.join("../saved", str(player_trainer_name) + "_cities")
+
+
+def create_name_provider(client_manager, name_cache, rate_limiter):
+    # type: (GeminiClientManager, NameCache, RateLimiter) -> NameProvider
+    """
+    Creating the name provider used in this game. The type of name provider used for each name category is read
+    from the environment variable <CATEGORY>_NAME_PROVIDER (e.g. CITY_NAME_PROVIDER=LOCAL) and is one of
+    NAME_PROVIDER_TYPES, with CACHED_GEMINI being the default.
+    :return: a name provider
+    """
+
+    name_providers_by_type: dict = {
+        "GEMINI": GeminiNameProvider(client_manager, rate_limiter),
+        "CACHED_GEMINI": CachedGeminiNameProvider(client_manager, name_cache, rate_limiter),
+        "LOCAL": LocalNameProvider(),
+    }
+    name_providers: dict = {}  # initial value
+    for category, prompt in NAME_CATEGORIES.items():
+        name_provider_type: str = os.environ.get(category + "_NAME_PROVIDER", "CACHED_GEMINI").upper()
+        if name_provider_type not in NAME_PROVIDER_TYPES:
+            name_provider_type = "CACHED_GEMINI"
+        name_providers[prompt] = name_providers_by_type[name_provider_type]
+
+    return NameProviderRouter(name_providers, name_providers_by_type["CACHED_GEMINI"])
+
+
+def generate_items_sold(name_provider):
+    # type: (NameProvider) -> list
+    """
+    Generating the items sold in the item shop. The names of all balls and runes are resolved together before
+    any item is created.
+    :return: a list of items
+    """
+
+    items_sold: list = []  # initial value
+    num_items: int = random.randint(30, 50)
+    item_types: list = [random.choice(["BALL", "RUNE", "AWAKEN SHARD", "EXP SHARD", "LEVEL UP SHARD",
+                                       "SKILL LEVEL UP SHARD"]) for i in range(num_items)]
+
+    # Asking for the names of all balls and runes at once
+    prompts: list = [BALL_NAME_PROMPT if item_type == "BALL" else RUNE_NAME_PROMPT for item_type in item_types
+                     if item_type in ["BALL", "RUNE"]]
+    names: list = name_provider.generate_names(prompts)
+    name_index: int = 0  # initial value
+
+    # Populating the items in the item shop
+    for item_type in item_types:
+        if item_type == "BALL":
+            ball_name: str = names[name_index]
+            name_index += 1
+            gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
+            new_ball: Ball = Ball(ball_name, "A ball to catch a legendary creature.", gold_cost,
+                                  mpf(random.randint(50, 100) / 100))
+            items_sold.append(new_ball)
+        elif item_type == "RUNE":
+            rune_name: str = names[name_index]
+            name_index += 1
+            gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
+            rating: int = random.randint(Rune.MIN_RATING, Rune.MAX_RATING)
+            slot_number: int = random.randint(Rune.MIN_SLOT_NUMBER, Rune.MAX_SLOT_NUMBER)
+            new_rune: Rune = Rune(rune_name, "A rune to strengthen legendary creatures.", gold_cost,
+                                  rating, slot_number, rating, rating, rating, rating, rating * 2,
+                                  rating * mpf("0.01"), rating * mpf("0.05"))
+            items_sold.append(new_rune)
+        elif item_type == "AWAKEN SHARD":
+            new_awaken_shard: AwakenShard = AwakenShard("Awaken Shard", "A shard to immediately "
+                                                                        "awaken a legendary creature.", mpf("5e7"),
+                                                        random.choice(LegendaryCreature.POTENTIAL_ELEMENTS))
+            items_sold.append(new_awaken_shard)
+        elif item_type == "EXP SHARD":
+            gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(6, 11)
+            exp_granted: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
+            new_exp_shard: EXPShard = EXPShard("EXP Shard", "An EXP shard used to immediately increase the EXP of a "
+                                                            "legendary creature.", gold_cost, exp_granted)
+            items_sold.append(new_exp_shard)
+        elif item_type == "LEVEL UP SHARD":
+            new_level_up_shard: LevelUpShard = LevelUpShard("Level Up Shard", "A shard to immediately "
+                                                                              "level up a legendary creature.",
+                                                            mpf("5e7"))
+            items_sold.append(new_level_up_shard)
+        elif item_type == "SKILL LEVEL UP SHARD":
+            new_skill_level_up_shard: SkillLevelUpShard = SkillLevelUpShard("Skill Level Up Shard",
+                                                                            "A shard to immediately level up a skill "
+                                                                            "a legendary creature has.", mpf("5e7"))
+            items_sold.append(new_skill_level_up_shard)
+        else:
+            pass
+
+    return items_sold
+
+
+def get_average_battle_creature_level(trainer):
+    # type: (Trainer) -> int
+    return (sum(legendary_creature.level for legendary_creature in trainer.battle_team.get_legendary_creatures())
+            // len(trainer.battle_team.get_legendary_creatures()))
+
+
+def generate_city(name_provider, trainer, city_representation="GRID"):
+    # type: (NameProvider, Trainer, str) -> City
+    """
+    Generating a new city with 5 to 10 random AI trainers and spawning 'trainer' at the top left tile of it.
+    :return: the new city
+    """
+
+    city: City = build_city(name_provider, get_average_battle_creature_level(trainer), city_representation)
+    spawn_trainer(city, trainer)
+    return city
+
+
+def spawn_trainer(city, trainer):
+    # type: (City, Trainer) -> None
+    if isinstance(trainer.city, City) and trainer.get_city_tile() is not None:
+        trainer.get_city_tile().remove_trainer(trainer)
+
+    trainer.city = city
+    trainer.location = AdventureModeLocation(0, 0)
+    city.get_tile_at(0, 0).add_trainer(trainer)
+
+
+def generate_ai_trainer(name, average_player_battle_creature_level, rng=random):
+    # type: (str, int, random.Random) -> AITrainer
+    ai_trainer: AITrainer = AITrainer(name)
+    for j in range(5):
+        new_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
+                                                     (rng.choice(LegendaryCreature.POTENTIAL_ELEMENTS), rng))
+        while new_legendary_creature.level < average_player_battle_creature_level:
+            new_legendary_creature.exp = new_legendary_creature.required_exp
+            new_legendary_creature.level_up()
+
+        ai_trainer.add_legendary_creature(new_legendary_creature)
+        ai_trainer.add_legendary_creature_to_team(new_legendary_creature)
+
+    return ai_trainer
+
+
+def build_city(name_provider, average_player_battle_creature_level, city_representation="GRID", seed=None,
+               names=None):
+    # type: (NameProvider or None, int, str, int or None, list or None) -> City
+    """
+    Building a new city with 5 to 10 random AI trainers whose legendary creatures are at least at
+    'average_player_battle_creature_level'. The top left tile is kept free for the player. 'city_representation'
+    is one of CITY_REPRESENTATIONS. Everything but the names is derived from 'seed', so the same seed and 'names'
+    always build the same city.
+    :return: the new city
+    """
+
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    if city_representation == "CHUNKED":
+        return ChunkedCity(name_provider.generate_name(CITY_NAME_PROMPT) if names is None else names[0],
+                           ChunkedCity.SIZE, ChunkedCity.SIZE, seed, average_player_battle_creature_level)
+
+    rng: random.Random = random.Random(seed)
+
+    city_width: int = rng.randint(6, 10)
+    city_height: int = rng.randint(6, 10)
+    city_tile_types: list = []  # initial value
+    portals: int = 0  # initial value
+    for y in range(city_height):
+        curr_row: list = []
+        for x in range(city_width):
+            if x == 0 and y == 0:
+                curr_row.append(PavementTile)
+            elif portals == 0:
+                if x == city_width - 1 and y == city_height - 1:
+                    portals += 1
+                    curr_row.append(PortalTile)
+                else:
+                    curr_tile: str = rng.choice(["PORTAL", "PAVEMENT", "GRASS"])
+                    if curr_tile == "PORTAL":
+                        portals += 1
+                        curr_row.append(PortalTile)
+                    elif curr_tile == "PAVEMENT":
+                        curr_row.append(PavementTile)
+                    elif curr_tile == "GRASS":
+                        curr_row.append(GrassTile)
+            else:
+                curr_tile: str = rng.choice(["PAVEMENT", "GRASS"])
+                if curr_tile == "PAVEMENT":
+                    curr_row.append(PavementTile)
+                elif curr_tile == "GRASS":
+                    curr_row.append(GrassTile)
+
+        city_tile_types.append(curr_row)
+
+    # Asking for the names of the city and all AI trainers at once
+    num_ai_trainers: int = rng.randint(5, 10)
+    if names is None:
+        names = name_provider.generate_names([CITY_NAME_PROMPT] + [AI_TRAINER_NAME_PROMPT] * num_ai_trainers)
+    if city_representation == "COMPACT":
+        city: City = CompactCity.from_tile_types(names[0], city_tile_types)
     else:
-        os.system('clear')  # For Linux System
+        city: City = City(names[0], [[tile_type() for tile_type in row] for row in city_tile_types])
+
+    # Spawn 5 to 10 random AI trainers.
+    ai_trainers: list = []  # initial value
+    for i in range(num_ai_trainers):
+        tile_x: int = rng.randint(0, len(city.get_tiles()[0]) - 1)
+        tile_y: int = rng.randint(0, len(city.get_tiles()) - 1)
+        while tile_x == 0 and tile_y == 0:
+            tile_x = rng.randint(0, len(city.get_tiles()[0]) - 1)
+            tile_y = rng.randint(0, len(city.get_tiles()) - 1)
+
+        ai_trainer: AITrainer = generate_ai_trainer(names[i + 1], average_player_battle_creature_level, rng)
+        ai_trainer.location = AdventureModeLocation(tile_x, tile_y)
+        city.get_tile_at(tile_x, tile_y).add_trainer(ai_trainer)
+        ai_trainers.append(ai_trainer)
+
+    city.set_generation(seed, average_player_battle_creature_level, city_representation, names, ai_trainers)
+    return city
+
+
+def simulate_battles(team1, team2, num_simulations, seed, policy1=None, policy2=None, max_turns=None,
+                     numeric_backend_name="FLOAT"):
+    # type: (BattleTeam, BattleTeam or LegendaryCreature, int, str, BattlePolicy, BattlePolicy, int, str) -> list
+    """
+    Simulating 'num_simulations' battles between copies of 'team1' and 'team2' with a random number generator seeded
+    with 'seed'. This runs in the worker processes of battle outcome estimators.
+    :return: the number of battles won by side 1, the total number of turns and the total HP left on each side
+    """
+
+    rng: random.Random = random.Random(seed)
+    num_wins: int = 0  # initial value
+    total_turns: int = 0  # initial value
+    total_hp1: mpf = mpf("0")  # initial value
+    total_hp2: mpf = mpf("0")  # initial value
+    for i in range(num_simulations):
+        battle_engine: BattleEngine = BattleEngine(team1.clone(), team2.clone(), policy1, policy2, rng=rng,
+                                                   max_turns=BattleEngine.MAX_TURNS if max_turns is None
+                                                   else max_turns, numeric_backend_name=numeric_backend_name)
+        result: BattleResult = battle_engine.run()
+        if result.get_winning_side() == 1:
+            num_wins += 1
+        total_turns += result.num_turns
+        total_hp1 += sum(max(hp, 0) for hp in result.remaining_hp1)
+        total_hp2 += sum(max(hp, 0) for hp in result.remaining_hp2)
+
+    return [num_wins, total_turns, total_hp1, total_hp2]
 
 
 # Creating necessary classes
@@ -192,6 +748,96 @@ def clear():
 ###########################################
 
 
+class NumericBackend:
+    """
+    This class contains attributes of the kind of numbers the stats of legendary creatures are kept in during
+    battles. "MPF" keeps the mpf numbers used everywhere else in this game and "FLOAT" uses float64 numbers, which
+    battle stats fit in comfortably and which are much faster. Battles convert the stats of their legendary creatures
+    when they begin and write them back as mpf numbers when they end, so saved game data, EXP and gold always stay
+    mpf numbers.
+    """
+
+    NAMES: list = ["MPF", "FLOAT"]
+    LEGENDARY_CREATURE_STAT_NAMES: list = ["curr_hp", "max_hp", "curr_magic_points", "max_magic_points",
+                                           "attack_power", "defense", "attack_speed", "crit_rate", "crit_damage",
+                                           "attack_gauge"]
+    SKILL_STAT_NAMES: list = ["damage_multiplier", "heal_amount", "magic_points_cost"]
+    __BACKENDS: dict = {}  # initial value
+
+    def __init__(self, name):
+        # type: (str) -> None
+        self.name: str = name if name in self.NAMES else self.NAMES[0]
+        self.number_type: type = float if self.name == "FLOAT" else mpf
+        self.zero: mpf or float = self.to_number(0)
+        self.one: mpf or float = self.to_number(1)
+        self.min_attack_gauge: mpf or float = self.to_number(LegendaryCreature.MIN_ATTACK_GAUGE)
+        self.full_attack_gauge: mpf or float = self.to_number(LegendaryCreature.FULL_ATTACK_GAUGE)
+
+        # Looking elemental damage multipliers up instead of working them out in every attack
+        self.elemental_damage_multipliers: dict = {
+            (element1, element2): self.to_number(get_elemental_damage_multiplier(element1, element2))
+            for element1 in LegendaryCreature.POTENTIAL_ELEMENTS for element2 in LegendaryCreature.POTENTIAL_ELEMENTS
+        }
+
+    @staticmethod
+    def get_backend(name):
+        # type: (str) -> NumericBackend
+        if name not in NumericBackend.__BACKENDS:
+            NumericBackend.__BACKENDS[name] = NumericBackend(name)
+        return NumericBackend.__BACKENDS[name]
+
+    @staticmethod
+    def of(number):
+        # type: (mpf or float) -> NumericBackend
+        return NumericBackend.get_backend("FLOAT" if isinstance(number, float) else "MPF")
+
+    def to_number(self, value):
+        # type: (object) -> mpf or float
+        return value if isinstance(value, self.number_type) else self.number_type(value)
+
+    def ceil(self, number):
+        # type: (mpf or float) -> int
+        return math.ceil(number) if self.name == "FLOAT" else int(mp.ceil(number))
+
+    def convert_legendary_creatures(self, legendary_creatures):
+        # type: (list) -> list
+        """
+        Converting the battle stats of 'legendary_creatures' and their skills to numbers of this kind.
+        :return: a list of (owner, stat name, old value, new value) of the stats converted, to be passed to
+        restore_stats()
+        """
+
+        conversions: list = []  # initial value
+        for legendary_creature in legendary_creatures:
+            owners: list = [(legendary_creature, self.LEGENDARY_CREATURE_STAT_NAMES)] + \
+                           [(skill, self.SKILL_STAT_NAMES) for skill in legendary_creature.get_skills()]
+            for owner, stat_names in owners:
+                for stat_name in stat_names:
+                    old_value: object = getattr(owner, stat_name)
+                    if not isinstance(old_value, self.number_type):
+                        new_value: mpf or float = self.number_type(old_value)
+                        setattr(owner, stat_name, new_value)
+                        conversions.append((owner, stat_name, old_value, new_value))
+
+        return conversions
+
+    @staticmethod
+    def restore_stats(conversions):
+        # type: (list) -> None
+        """
+        Writing the stats converted by convert_legendary_creatures() back as mpf numbers. Stats which were not changed
+        since get their old mpf numbers back, so that only the stats changed in battles are rounded.
+        :return: None
+        """
+
+        for owner, stat_name, old_value, new_value in conversions:
+            value: object = getattr(owner, stat_name)
+            if value is new_value:
+                setattr(owner, stat_name, old_value)
+            elif not isinstance(value, mpf):
+                setattr(owner, stat_name, mpf(value))
+
+
 class Action:
     """
     This class contains attributes of an action which can be carried out during battles.
@@ -199,24 +845,28 @@ class Action:
 
     POSSIBLE_NAMES: list = ["NORMAL ATTACK", "NORMAL HEAL", "USE SKILL"]
 
-    def __init__(self, name):
-        # type: (str) -> None
+    def __init__(self, name, verbose=True):
+        # type: (str, bool) -> None
         self.name: str = name if name in self.POSSIBLE_NAMES else self.POSSIBLE_NAMES[0]
+        self.verbose: bool = verbose
 
-    def execute(self, user, target, skill_to_use=None):
-        # type: (LegendaryCreature, LegendaryCreature, Skill or None) -> bool
+    def execute(self, user, target, skill_to_use=None, rng=random):
+        # type: (LegendaryCreature, LegendaryCreature, Skill or None, random.Random) -> bool
         if self.name == "NORMAL ATTACK":
             if user == target:
                 return False
 
-            is_crit: bool = random.random() < user.crit_rate
-            crit_factor: mpf = user.crit_damage if is_crit else mpf("1")
+            numeric_backend: NumericBackend = NumericBackend.of(user.attack_power)
+            is_crit: bool = rng.random() < user.crit_rate
+            crit_factor: mpf = user.crit_damage if is_crit else numeric_backend.one
             raw_damage: mpf = user.attack_power * crit_factor - target.defense
-            damage_multiplier_by_element: mpf = get_elemental_damage_multiplier(user.element, target.element)
+            damage_multiplier_by_element: mpf = numeric_backend.elemental_damage_multipliers[(user.element,
+                                                                                              target.element)]
             raw_damage *= damage_multiplier_by_element
-            damage: mpf = raw_damage if raw_damage > mpf("0") else mpf("0")
+            damage: mpf = raw_damage if raw_damage > numeric_backend.zero else numeric_backend.zero
             target.curr_hp -= damage
-            print(str(user.name) + " dealt " + str(damage) + " damage on " + str(target.name) + "!")
+            if self.verbose:
+                print(str(user.name) + " dealt " + str(damage) + " damage on " + str(target.name) + "!")
             return True
 
         elif self.name == "NORMAL HEAL":
@@ -237,19 +887,21 @@ class Action:
                     if user.curr_hp >= user.max_hp:
                         user.curr_hp = user.max_hp
                 elif skill_to_use.skill_type == "ATTACK":
-                    is_crit: bool = random.random() < user.crit_rate
-                    crit_factor: mpf = user.crit_damage if is_crit else mpf("1")
+                    numeric_backend: NumericBackend = NumericBackend.of(user.attack_power)
+                    is_crit: bool = rng.random() < user.crit_rate
+                    crit_factor: mpf = user.crit_damage if is_crit else numeric_backend.one
                     raw_damage: mpf = user.attack_power * skill_to_use.damage_multiplier * crit_factor - target.defense
-                    damage_multiplier_by_element: mpf = get_elemental_damage_multiplier(user.element, target.element)
+                    damage_multiplier_by_element: mpf = numeric_backend.elemental_damage_multipliers[
+                        (user.element, target.element)]
                     raw_damage *= damage_multiplier_by_element
-                    damage: mpf = raw_damage if raw_damage > mpf("0") else mpf("0")
+                    damage: mpf = raw_damage if raw_damage > numeric_backend.zero else numeric_backend.zero
                     target.curr_hp -= damage
-                    print(str(user.name) + " dealt " + str(damage) + " damage on " + str(target.name) + "!")
+                    if self.verbose:
+                        print(str(user.name) + " dealt " + str(damage) + " damage on " + str(target.name) + "!")
                 return True
             return False
         return False
 
-
     def __str__(self):
         # type: () -> str
         res: str = str(type(self).__name__) + "("  # initial value
@@ -304,15 +956,129 @@ class AwakenBonus:
         return copy.deepcopy(self)
 
 
+class AttackGaugeScheduler:
+    """
+    This class contains attributes of a scheduler deciding which legendary creature in a battle moves next. Instead of
+    ticking the clock until somebody's attack gauge is full, it works out at which tick each legendary creature's
+    attack gauge is full, keeps those ticks in a priority queue and jumps straight to the next of them.
+    """
+
+    ATTACK_GAUGE_RATE: float = 0.07
+
+    def __init__(self, legendary_creatures):
+        # type: (list) -> None
+        self.__legendary_creatures: list = list(legendary_creatures)
+        self.clock: int = 0
+        self.__attack_gauges: list = [None] * len(self.__legendary_creatures)
+        self.__attack_speeds: list = [None] * len(self.__legendary_creatures)
+        self.__attack_gauge_increases: list = [None] * len(self.__legendary_creatures)
+        self.__versions: list = [0] * len(self.__legendary_creatures)
+        self.__full_ticks: list = []  # initial value
+
+    def get_legendary_creatures(self):
+        # type: () -> list
+        return self.__legendary_creatures
+
+    def get_attack_gauge_at(self, index, tick):
+        # type: (int, int) -> mpf
+        num_ticks: int = tick - self.clock
+        if num_ticks == 1:
+            return self.__attack_gauges[index] + self.__attack_gauge_increases[index]
+        return self.__attack_gauges[index] + num_ticks * self.__attack_gauge_increases[index]
+
+    def get_full_tick(self, index):
+        # type: (int) -> int or float
+        """
+        Getting the first tick at which the attack gauge of the legendary creature at 'index' is full.
+        :return: the tick, or infinity if the attack gauge never fills
+        """
+
+        attack_gauge: mpf = self.__attack_gauges[index]
+        attack_gauge_increase: mpf = self.__attack_gauge_increases[index]
+        numeric_backend: NumericBackend = NumericBackend.of(attack_gauge)
+        full_attack_gauge: mpf = numeric_backend.full_attack_gauge
+        if attack_gauge >= full_attack_gauge:
+            return self.clock
+        if attack_gauge_increase <= 0:
+            return math.inf
+
+        num_ticks: int = numeric_backend.ceil((full_attack_gauge - attack_gauge) / attack_gauge_increase)
+
+        # Correcting for rounding so that the attack gauge is full after exactly 'num_ticks' ticks
+        while attack_gauge + num_ticks * attack_gauge_increase < full_attack_gauge:
+            num_ticks += 1
+        while num_ticks > 0 and attack_gauge + (num_ticks - 1) * attack_gauge_increase >= full_attack_gauge:
+            num_ticks -= 1
+        return self.clock + num_ticks
+
+    def reschedule(self, index):
+        # type: (int) -> None
+        legendary_creature: LegendaryCreature = self.__legendary_creatures[index]
+        self.__attack_gauges[index] = legendary_creature.attack_gauge
+        self.__attack_speeds[index] = legendary_creature.attack_speed
+        self.__attack_gauge_increases[index] = legendary_creature.attack_speed * self.ATTACK_GAUGE_RATE
+        self.__versions[index] += 1
+        heapq.heappush(self.__full_ticks, (self.get_full_tick(index), index, self.__versions[index]))
+
+    def get_someone_to_move(self):
+        # type: () -> LegendaryCreature or None
+        """
+        Getting the legendary creature which moves next and bringing the attack gauges of all legendary creatures up
+        to date. Like ticking the clock, the attack gauges get one more tick after the one in which somebody's attack
+        gauge is full, and the fullest attack gauge wins with ties going to the last legendary creature.
+        :return: the legendary creature which moves next, or None if no attack gauge ever fills
+        """
+
+        # Rescheduling legendary creatures whose attack gauge or attack speed changed since the last turn, e.g. the
+        # one which just had its turn.
+        for index, legendary_creature in enumerate(self.__legendary_creatures):
+            if legendary_creature.attack_gauge is not self.__attack_gauges[index] or \
+                    legendary_creature.attack_speed != self.__attack_speeds[index]:
+                self.reschedule(index)
+
+        while len(self.__full_ticks) > 0 and self.__full_ticks[0][2] != self.__versions[self.__full_ticks[0][1]]:
+            heapq.heappop(self.__full_ticks)
+        if len(self.__full_ticks) == 0 or self.__full_ticks[0][0] == math.inf:
+            return None
+
+        # Taking everybody whose attack gauge is full at the first tick in which somebody's is
+        full_tick: int = max(self.__full_ticks[0][0], self.clock)
+        full_entries: list = []  # initial value
+        while len(self.__full_ticks) > 0 and self.__full_ticks[0][0] <= full_tick:
+            entry: tuple = heapq.heappop(self.__full_ticks)
+            if entry[2] == self.__versions[entry[1]]:
+                full_entries.append(entry)
+
+        # Advancing all attack gauges in one step
+        next_clock: int = full_tick + 1
+        for index, legendary_creature in enumerate(self.__legendary_creatures):
+            legendary_creature.attack_gauge = self.get_attack_gauge_at(index, next_clock)
+        self.clock = next_clock
+
+        whose_turn: LegendaryCreature or None = None  # initial value
+        max_attack_gauge: mpf or None = None  # initial value
+        for entry in sorted(full_entries, key=lambda full_entry: full_entry[1]):
+            legendary_creature: LegendaryCreature = self.__legendary_creatures[entry[1]]
+            if max_attack_gauge is None or legendary_creature.attack_gauge >= max_attack_gauge:
+                max_attack_gauge = legendary_creature.attack_gauge
+                whose_turn = legendary_creature
+            heapq.heappush(self.__full_ticks, entry)
+
+        self.__attack_gauges = [legendary_creature.attack_gauge for legendary_creature in self.__legendary_creatures]
+        return whose_turn
+
+
 class Battle:
     """
-    This class contains attributes of a battle in this game.
+    This class contains attributes of a battle in this game. The turns of the battle are carried out by a battle
+    engine using the numeric backend NUMERIC_BACKEND_NAME.
     """
 
+    NUMERIC_BACKEND_NAME: str = "MPF"
+
     def __init__(self, trainer1):
         # type: (Trainer) -> None
         self.trainer1: Trainer = trainer1
-        self.whose_turn: LegendaryCreature or None = None
         self.winner: BattleTeam or None = None
         self.reward: Reward = Reward()  # initial value
 
@@ -350,44 +1116,6 @@ class WildBattle(Battle):
         self.wild_legendary_creature_caught: bool = False
         self.trainer_fled: bool = False
 
-    def get_someone_to_move(self):
-        # type: () -> None
-        """
-        Getting a legendary creature to move and have its turn.
-        :return: None
-        """
-
-        # Finding out which legendary creature moves
-        full_attack_gauge_list: list = []  # initial value
-        while len(full_attack_gauge_list) == 0:
-            for legendary_creature in self.trainer1.battle_team.get_legendary_creatures():
-                if legendary_creature.attack_gauge >= legendary_creature.FULL_ATTACK_GAUGE and legendary_creature not \
-                        in full_attack_gauge_list:
-                    full_attack_gauge_list.append(legendary_creature)
-
-            if (self.wild_legendary_creature.attack_gauge >= self.wild_legendary_creature.FULL_ATTACK_GAUGE and
-                    self.wild_legendary_creature not in full_attack_gauge_list):
-                full_attack_gauge_list.append(self.wild_legendary_creature)
-
-            self.tick()
-
-        max_attack_gauge: mpf = max(legendary_creature.attack_gauge for legendary_creature in full_attack_gauge_list)
-        for legendary_creature in full_attack_gauge_list:
-            if legendary_creature.attack_gauge == max_attack_gauge:
-                self.whose_turn = legendary_creature
-
-    def tick(self):
-        # type: () -> None
-        """
-        The clock ticks when battles are carried out.
-        :return: None
-        """
-
-        for legendary_creature in self.trainer1.battle_team.get_legendary_creatures():
-            legendary_creature.attack_gauge += legendary_creature.attack_speed * 0.07
-
-        self.wild_legendary_creature.attack_gauge += self.wild_legendary_creature.attack_speed * 0.07
-
 
 class TrainerBattle(Battle):
     """
@@ -405,517 +1133,3090 @@ class TrainerBattle(Battle):
                              mpf("10") ** sum(5 * legendary_creature.level for legendary_creature in
                                               self.trainer2.battle_team.get_legendary_creatures()))
 
-    def get_someone_to_move(self):
-        # type: () -> None
-        """
-        Getting a legendary creature to move and have its turn.
-        :return: None
-        """
-
-        # Finding out which legendary creature moves
-        full_attack_gauge_list: list = []  # initial value
-        while len(full_attack_gauge_list) == 0:
-            for legendary_creature in self.trainer1.battle_team.get_legendary_creatures():
-                if legendary_creature.attack_gauge >= legendary_creature.FULL_ATTACK_GAUGE and legendary_creature not \
-                        in full_attack_gauge_list:
-                    full_attack_gauge_list.append(legendary_creature)
 
-            for legendary_creature in self.trainer2.battle_team.get_legendary_creatures():
-                if legendary_creature.attack_gauge >= legendary_creature.FULL_ATTACK_GAUGE and legendary_creature not \
-                        in full_attack_gauge_list:
-                    full_attack_gauge_list.append(legendary_creature)
+class BattleDecision:
+    """
+    This class contains attributes of what a legendary creature does in its turn in a battle.
+    """
 
-            self.tick()
+    def __init__(self, action_name, target=None, skill=None, ball=None):
+        # type: (str, LegendaryCreature or None, Skill or None, Ball or None) -> None
+        self.action_name: str = action_name
+        self.target: LegendaryCreature or None = target
+        self.skill: Skill or None = skill
+        self.ball: Ball or None = ball
 
-        max_attack_gauge: mpf = max(legendary_creature.attack_gauge for legendary_creature in full_attack_gauge_list)
-        for legendary_creature in full_attack_gauge_list:
-            if legendary_creature.attack_gauge == max_attack_gauge:
-                self.whose_turn = legendary_creature
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
 
-    def tick(self):
-        # type: () -> None
-        """
-        The clock ticks when battles are carried out.
-        :return: None
-        """
+            if index < len(vars(self).items()) - 1:
+                res += ", "
 
-        for legendary_creature in self.trainer1.battle_team.get_legendary_creatures():
-            legendary_creature.attack_gauge += legendary_creature.attack_speed * 0.07
+            index += 1
 
-        for legendary_creature in self.trainer2.battle_team.get_legendary_creatures():
-            legendary_creature.attack_gauge += legendary_creature.attack_speed * 0.07
+        return res + ")"
 
 
-class City:
+class BattlePolicy:
     """
-    This class contains attributes of a city in this game.
+    This class contains attributes of a way of deciding what legendary creatures do in their turns in battles. This
+    policy always normally attacks the first living legendary creature of the other side.
     """
 
-    def __init__(self, name, tiles):
-        # type: (str, list) -> None
-        self.name: str = name
-        self.__tiles: list = tiles
+    def choose_decision(self, battle_engine, legendary_creature, rng):
+        # type: (BattleEngine, LegendaryCreature, random.Random) -> BattleDecision
+        enemies: list = battle_engine.get_enemies(legendary_creature)
+        living_enemies: list = [enemy for enemy in enemies if enemy.get_is_alive()]
+        return BattleDecision("NORMAL ATTACK", living_enemies[0] if len(living_enemies) > 0 else enemies[0])
 
-    def get_tile_at(self, x, y):
-        # type: (int, int) -> CityTile or None
-        if x < 0 or x >= len(self.__tiles[0]) or y < 0 or y >= len(self.__tiles):
-            return None
-        return self.__tiles[y][x]
 
-    def get_tiles(self):
-        # type: () -> list
-        return self.__tiles
+class RandomBattlePolicy(BattlePolicy):
+    """
+    This class contains attributes of the way AI trainers and wild legendary creatures decide what to do in battles:
+    a random action, a random skill and a random legendary creature of the other side to attack.
+    """
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(self.name)
-        all_tiles: list = []  # initial value
-        for y in range(len(self.__tiles)):
-            curr_tiles: list = []  # initial value
-            for x in range(len(self.__tiles[y])):
-                curr_tile: CityTile = self.get_tile_at(x, y)
-                curr_tiles.append(str(curr_tile))
+    def choose_decision(self, battle_engine, legendary_creature, rng):
+        # type: (BattleEngine, LegendaryCreature, random.Random) -> BattleDecision
+        enemies: list = battle_engine.get_enemies(legendary_creature)
+        action_name: str = rng.choice(Action.POSSIBLE_NAMES)
+        if action_name == "USE SKILL" and len(legendary_creature.get_skills()) == 0:
+            action_name = "NORMAL ATTACK"
 
-            all_tiles.append(curr_tiles)
-        return res + "\n" + str(tabulate(all_tiles, headers='firstrow', tablefmt='fancy_grid'))
+        if action_name == "NORMAL HEAL":
+            return BattleDecision(action_name, legendary_creature)
+        elif action_name == "NORMAL ATTACK":
+            return BattleDecision(action_name, rng.choice(enemies))
 
-    def clone(self):
-        # type: () -> City
-        return copy.deepcopy(self)
+        skill_to_use: Skill = rng.choice(legendary_creature.get_skills())
+        if skill_to_use.skill_type == "HEAL":
+            return BattleDecision(action_name, legendary_creature, skill_to_use)
+        return BattleDecision(action_name, rng.choice(enemies), skill_to_use)
 
 
-class CityTile:
+class FocusedBattlePolicy(BattlePolicy):
     """
-    This class contains attributes of a tile in a city.
+    This class contains attributes of a way of deciding what to do in battles which heals legendary creatures low on
+    HP and otherwise attacks the living legendary creature of the other side with the least HP, using the strongest
+    attack skill there are enough magic points for.
     """
 
-    def __init__(self):
-        # type: () -> None
-        self.__trainers: list = []  # initial value
-        self.is_portal: bool = False
-        self.can_encounter_wild_battles: bool = False
+    HEAL_HP_FRACTION: mpf = mpf("0.3")
 
-    def get_trainers(self):
-        # type: () -> list
-        return self.__trainers
+    def choose_decision(self, battle_engine, legendary_creature, rng):
+        # type: (BattleEngine, LegendaryCreature, random.Random) -> BattleDecision
+        affordable_skills: list = [skill for skill in legendary_creature.get_skills()
+                                   if skill.magic_points_cost <= legendary_creature.curr_magic_points]
+        if legendary_creature.curr_hp < self.HEAL_HP_FRACTION * legendary_creature.max_hp:
+            heal_skills: list = [skill for skill in affordable_skills if skill.skill_type == "HEAL"]
+            if len(heal_skills) > 0:
+                return BattleDecision("USE SKILL", legendary_creature,
+                                      max(heal_skills, key=lambda skill: skill.heal_amount))
+            return BattleDecision("NORMAL HEAL", legendary_creature)
 
-    def add_trainer(self, trainer):
-        # type: (Trainer) -> None
-        self.__trainers.append(trainer)
+        living_enemies: list = [enemy for enemy in battle_engine.get_enemies(legendary_creature)
+                                if enemy.get_is_alive()]
+        if len(living_enemies) == 0:
+            return BattlePolicy.choose_decision(self, battle_engine, legendary_creature, rng)
 
-    def remove_trainer(self, trainer):
-        # type: (Trainer) -> bool
-        if trainer in self.__trainers:
-            self.__trainers.remove(trainer)
-            return True
-        return False
+        target: LegendaryCreature = min(living_enemies, key=lambda enemy: enemy.curr_hp)
+        attack_skills: list = [skill for skill in affordable_skills if skill.skill_type == "ATTACK"]
+        if len(attack_skills) > 0:
+            return BattleDecision("USE SKILL", target, max(attack_skills, key=lambda skill: skill.damage_multiplier))
+        return BattleDecision("NORMAL ATTACK", target)
 
-    def __str__(self):
-        # type: () -> str
-        return "(" + str(type(self).__name__) + ")\nAND\n" + list_to_string([trainer.name for trainer in self.__trainers])
 
-    def clone(self):
-        # type: () -> CityTile
-        return copy.deepcopy(self)
-
-
-class PortalTile(CityTile):
+class InputBattlePolicy(BattlePolicy):
     """
-    This class contains attributes of a portal from one city to another.
+    This class contains attributes of the way the player decides what the legendary creatures of 'trainer' do in
+    battles, by entering it after being shown the current stats of both sides.
     """
 
-    def __init__(self):
-        # type: () -> None
-        CityTile.__init__(self)
-        self.is_portal = True
+    ACTION_DESCRIPTIONS: dict = {
+        "NORMAL ATTACK": "for normal attack",
+        "NORMAL HEAL": "for normal heal",
+        "USE SKILL": "to use a skill",
+        "FLEE": "to flee from the wild battle",
+        "CATCH": "to catch wild legendary creature",
+    }
 
+    def __init__(self, trainer):
+        # type: (Trainer) -> None
+        self.trainer: Trainer = trainer
 
-class GrassTile(CityTile):
+    @staticmethod
+    def input_index(description, num_choices):
+        # type: (str, int) -> int
+        """
+        Asking the player for the index of one of 'num_choices' choices described by 'description'.
+        :return: the zero-based index entered
+        """
+
+        index: int = int(input("Please enter the index of " + str(description) + " (1 - " + str(num_choices) +
+                               "): "))
+        while index < 1 or index > num_choices:
+            index = int(input("Sorry, invalid input! Please enter the index of " + str(description) + " (1 - " +
+                              str(num_choices) + "): "))
+        return index - 1
+
+    def print_stats(self, battle_engine, legendary_creature):
+        # type: (BattleEngine, LegendaryCreature) -> None
+        print("Below are the current stats of your legendary creatures.\n")
+        creature_number: int = 1
+        for ally in battle_engine.get_allies(legendary_creature):
+            print(str(creature_number) + ". " + str(ally))
+            creature_number += 1
+
+        print("\n")
+        if battle_engine.wild_legendary_creature is not None:
+            print("Below are the current stats of the wild legendary creature.\n")
+            print(battle_engine.wild_legendary_creature)
+        else:
+            print("Below are the current stats of your opponent's legendary creatures.\n")
+            other_creature_number: int = 1
+            for enemy in battle_engine.get_enemies(legendary_creature):
+                print(str(other_creature_number) + ". " + str(enemy))
+                other_creature_number += 1
+        print("\n")
+
+    def choose_target(self, battle_engine, legendary_creature):
+        # type: (BattleEngine, LegendaryCreature) -> LegendaryCreature
+        if battle_engine.wild_legendary_creature is not None:
+            return battle_engine.wild_legendary_creature
+
+        enemies: list = battle_engine.get_enemies(legendary_creature)
+        print("Below is a list of legendary creatures you can attack:\n")
+        creature_index: int = 1
+        for enemy in enemies:
+            print(str(creature_index) + ". " + str(enemy))
+            creature_index += 1
+        return enemies[self.input_index("the legendary creature you want to attack", len(enemies))]
+
+    def choose_decision(self, battle_engine, legendary_creature, rng):
+        # type: (BattleEngine, LegendaryCreature, random.Random) -> BattleDecision
+        action_names: list = Action.POSSIBLE_NAMES + (["FLEE", "CATCH"] if battle_engine.wild_legendary_creature
+                                                      is not None else [])
+        self.print_stats(battle_engine, legendary_creature)
+        while True:
+            for action_name in action_names:
+                print("Enter \"" + str(action_name) + "\" " + str(self.ACTION_DESCRIPTIONS[action_name]) + "!")
+            battle_action: str = input("What do you want to do? ")
+            while battle_action not in action_names:
+                for action_name in action_names:
+                    print("Enter \"" + str(action_name) + "\" " + str(self.ACTION_DESCRIPTIONS[action_name]) + "!")
+                battle_action = input("Sorry, invalid input! What do you want to do? ")
+
+            if battle_action == "NORMAL ATTACK":
+                return BattleDecision(battle_action, self.choose_target(battle_engine, legendary_creature))
+            elif battle_action == "NORMAL HEAL":
+                return BattleDecision(battle_action, legendary_creature)
+            elif battle_action == "USE SKILL":
+                skills: list = legendary_creature.get_skills()
+                if len(skills) == 0:
+                    print("Sorry! " + str(legendary_creature.name) + " has no skills to use!")
+                    continue
+
+                print("Below are the skills that you can use:\n")
+                skill_number: int = 1
+                for skill in skills:
+                    print(str(skill_number) + ". " + str(skill))
+                    skill_number += 1
+
+                skill_to_use: Skill = skills[self.input_index("the skill you want to use", len(skills))]
+                if skill_to_use.skill_type == "HEAL":
+                    return BattleDecision(battle_action, legendary_creature, skill_to_use)
+                return BattleDecision(battle_action, self.choose_target(battle_engine, legendary_creature),
+                                      skill_to_use)
+            elif battle_action == "FLEE":
+                return BattleDecision(battle_action)
+            elif battle_action == "CATCH":
+                ball_objects: list = [item for item in self.trainer.item_inventory.get_items()
+                                      if isinstance(item, Ball)]
+                if len(ball_objects) == 0:
+                    print("Sorry! You have no balls to catch " + str(battle_engine.wild_legendary_creature.name) +
+                          " with!")
+                    continue
+
+                ball_number: int = 1
+                for ball in ball_objects:
+                    print(str(ball_number) + ". " + str(ball))
+                    ball_number += 1
+
+                return BattleDecision(battle_action, battle_engine.wild_legendary_creature,
+                                      ball=ball_objects[self.input_index("the ball you want to use",
+                                                                         len(ball_objects))])
+
+
+class BattleEvent:
     """
-    This class contains attributes of a city tile with grass where the player can encounter wild legendary creatures.
+    This class contains attributes of a turn had by a legendary creature in a battle.
     """
 
-    def __init__(self):
-        # type: () -> None
-        CityTile.__init__(self)
-        self.can_encounter_wild_battles = True
+    def __init__(self, turn, legendary_creature, side, decision, success, hp_change):
+        # type: (int, LegendaryCreature, int, BattleDecision, bool, mpf) -> None
+        self.turn: int = turn
+        self.legendary_creature: LegendaryCreature = legendary_creature
+        self.side: int = side
+        self.decision: BattleDecision = decision
+        self.success: bool = success
+        self.hp_change: mpf = hp_change
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
 
+            if index < len(vars(self).items()) - 1:
+                res += ", "
 
-class PavementTile(CityTile):
+            index += 1
+
+        return res + ")"
+
+
+class BattleResult:
     """
-    This class contains attributes of a tile with pavement where the player can walk safely without any distractions
-    from wild legendary creatures.
+    This class contains attributes of how a battle carried out by a battle engine ended, as seen by side 1.
     """
 
-    def __init__(self):
-        # type: () -> None
-        CityTile.__init__(self)
+    POSSIBLE_OUTCOMES: list = ["WON", "LOST", "FLED", "CAUGHT", "DRAW"]
+
+    def __init__(self, outcome, num_turns, remaining_hp1, remaining_hp2, events):
+        # type: (str, int, list, list, list) -> None
+        self.outcome: str = outcome if outcome in self.POSSIBLE_OUTCOMES else self.POSSIBLE_OUTCOMES[-1]
+        self.num_turns: int = num_turns
+        self.remaining_hp1: list = remaining_hp1
+        self.remaining_hp2: list = remaining_hp2
+        self.events: list = events
+
+    def get_winning_side(self):
+        # type: () -> int or None
+        if self.outcome in ["WON", "CAUGHT"]:
+            return 1
+        elif self.outcome == "LOST":
+            return 2
+        return None
+
+    def __str__(self):
+        # type: () -> str
+        return str(type(self).__name__) + "(outcome=" + str(self.outcome) + ", num_turns=" + \
+            str(self.num_turns) + ", remaining_hp1=" + str(self.remaining_hp1) + ", remaining_hp2=" + \
+            str(self.remaining_hp2) + ")"
 
 
-###########################################
-# ADVENTURE MODE
-###########################################
+class BattleObserver:
+    """
+    This class contains attributes of an observer told about every turn in battles carried out by battle engines.
+    """
 
+    def on_turn(self, battle_engine, event):
+        # type: (BattleEngine, BattleEvent) -> None
+        pass
 
-###########################################
-# INVENTORY
-###########################################
+    def on_battle_end(self, battle_engine, result):
+        # type: (BattleEngine, BattleResult) -> None
+        pass
 
 
-class LegendaryCreatureInventory:
+class PrintingBattleObserver(BattleObserver):
     """
-    This class contains attributes of an inventory containing legendary creatures.
+    This class contains attributes of an observer printing battles carried out by battle engines the way they are
+    printed when playing the game.
     """
 
-    def __init__(self):
-        # type: () -> None
-        self.__legendary_creatures: list = []  # initial value
-
-    def add_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> None
-        self.__legendary_creatures.append(legendary_creature)
+    def on_turn(self, battle_engine, event):
+        # type: (BattleEngine, BattleEvent) -> None
+        if event.decision.action_name == "FLEE":
+            print("You successfully fled!" if event.success else "Sorry! You can't run away!")
+        elif event.decision.action_name == "CATCH":
+            print(("You successfully caught " if event.success else "Cannot catch ") +
+                  str(event.decision.target.name) + "!")
+        elif event.decision.action_name == "USE SKILL" and not event.success:
+            print("Not enough magic points!")
+        elif event.decision.target is not event.legendary_creature and \
+                (event.decision.action_name == "NORMAL ATTACK" or
+                 (event.decision.skill is not None and event.decision.skill.skill_type == "ATTACK")):
+            print(str(event.legendary_creature.name) + " dealt " + str(-event.hp_change) + " damage on " +
+                  str(event.decision.target.name) + "!")
+
+    def on_battle_end(self, battle_engine, result):
+        # type: (BattleEngine, BattleResult) -> None
+        if result.outcome == "WON":
+            print("You won the battle!")
+        elif result.outcome == "LOST":
+            print("You lost!")
+        elif result.outcome == "DRAW":
+            print("The battle ended in a draw!")
+
+
+class BattleEngine:
+    """
+    This class contains attributes of a battle carried out turn by turn under the rules of this game. Side 1 is a
+    team of legendary creatures and side 2 is either another team or a wild legendary creature. Each side's policy
+    decides what its legendary creatures do, and observers are told about every turn. The battles in the game are
+    played with an InputBattlePolicy and a PrintingBattleObserver, and simulated battles use the same rules without
+    any input or output.
+    """
 
-    def remove_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.__legendary_creatures:
-            self.__legendary_creatures.remove(legendary_creature)
-            return True
-        return False
+    MAX_TURNS: int = 1000
+    FLEE_SUCCESS_RATE: float = 0.75
+
+    def __init__(self, team1, team2, policy1=None, policy2=None, observers=None, rng=None, max_turns=MAX_TURNS,
+                 numeric_backend_name="MPF"):
+        # type: (BattleTeam, BattleTeam or LegendaryCreature, BattlePolicy, BattlePolicy, list, random.Random, int, str) -> None
+        self.team1: BattleTeam = team1
+        self.wild_legendary_creature: LegendaryCreature or None = team2 if isinstance(team2, LegendaryCreature) \
+            else None
+        self.team2: BattleTeam = BattleTeam([team2]) if self.wild_legendary_creature is not None else team2
+        self.policy1: BattlePolicy = policy1 if policy1 is not None else RandomBattlePolicy()
+        self.policy2: BattlePolicy = policy2 if policy2 is not None else RandomBattlePolicy()
+        self.observers: list = observers if observers is not None else []
+        self.rng: random.Random = rng if rng is not None else random.Random()
+        self.max_turns: int = max_turns
+        self.num_turns: int = 0
+        self.events: list = []  # initial value
+        self.result: BattleResult or None = None
+        self.__sides: dict = {}  # initial value
+        for legendary_creature in self.team1.get_legendary_creatures():
+            self.__sides[id(legendary_creature)] = 1
+        for legendary_creature in self.team2.get_legendary_creatures():
+            self.__sides[id(legendary_creature)] = 2
+        self.numeric_backend: NumericBackend = NumericBackend.get_backend(numeric_backend_name)
+        self.__numeric_conversions: list = self.numeric_backend.convert_legendary_creatures(
+            self.team1.get_legendary_creatures() + self.team2.get_legendary_creatures())
+        self.__attack_gauge_scheduler: AttackGaugeScheduler = AttackGaugeScheduler(
+            self.team1.get_legendary_creatures() + self.team2.get_legendary_creatures())
+        self.__fled: bool = False
+        self.__caught: bool = False
+
+    def get_side(self, legendary_creature):
+        # type: (LegendaryCreature) -> int
+        return self.__sides[id(legendary_creature)]
+
+    def get_allies(self, legendary_creature):
+        # type: (LegendaryCreature) -> list
+        return self.team1.get_legendary_creatures() if self.get_side(legendary_creature) == 1 else \
+            self.team2.get_legendary_creatures()
+
+    def get_enemies(self, legendary_creature):
+        # type: (LegendaryCreature) -> list
+        return self.team2.get_legendary_creatures() if self.get_side(legendary_creature) == 1 else \
+            self.team1.get_legendary_creatures()
+
+    def carry_out(self, legendary_creature, decision):
+        # type: (LegendaryCreature, BattleDecision) -> BattleEvent
+        """
+        Letting 'legendary_creature' have its turn as in 'decision'.
+        :return: the event describing the turn
+        """
 
-    def get_legendary_creatures(self):
-        # type: () -> list
-        return self.__legendary_creatures
+        side: int = self.get_side(legendary_creature)
+        if decision.action_name == "FLEE" and side == 1 and self.wild_legendary_creature is not None:
+            self.__fled = self.rng.random() < self.FLEE_SUCCESS_RATE
+            return BattleEvent(self.num_turns + 1, legendary_creature, side, decision, self.__fled,
+                               self.numeric_backend.zero)
+        elif decision.action_name == "CATCH" and side == 1 and self.wild_legendary_creature is not None and \
+                isinstance(decision.ball, Ball):
+            decision.target = self.wild_legendary_creature
+            self.__caught = self.rng.random() < decision.ball.catch_success_rate
+            return BattleEvent(self.num_turns + 1, legendary_creature, side, decision, self.__caught,
+                               self.numeric_backend.zero)
+
+        target_hp: mpf = decision.target.curr_hp if decision.target is not None else self.numeric_backend.zero
+        success: bool = legendary_creature.have_turn(decision.target, decision.skill, decision.action_name, self.rng,
+                                                     False)
+        hp_change: mpf = decision.target.curr_hp - target_hp if decision.target is not None else \
+            self.numeric_backend.zero
+        return BattleEvent(self.num_turns + 1, legendary_creature, side, decision, success, hp_change)
+
+    def get_outcome(self):
+        # type: () -> str or None
+        if self.__caught:
+            return "CAUGHT"
+        elif self.__fled:
+            return "FLED"
+        elif self.team2.all_died():
+            return "WON"
+        elif self.team1.all_died():
+            return "LOST"
+        elif self.num_turns >= self.max_turns:
+            return "DRAW"
+        return None
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+    def finish(self, outcome):
+        # type: (str) -> BattleResult
+        NumericBackend.restore_stats(self.__numeric_conversions)
+        self.result = BattleResult(outcome, self.num_turns,
+                                   [legendary_creature.curr_hp for legendary_creature in
+                                    self.team1.get_legendary_creatures()],
+                                   [legendary_creature.curr_hp for legendary_creature in
+                                    self.team2.get_legendary_creatures()], self.events)
+        for observer in self.observers:
+            observer.on_battle_end(self, self.result)
+        return self.result
+
+    def play_turn(self):
+        # type: () -> BattleEvent or None
+        """
+        Letting the next legendary creature have its turn.
+        :return: the event describing the turn, or None if the battle has ended
+        """
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+        if self.result is not None:
+            return None
 
-            index += 1
+        legendary_creature: LegendaryCreature or None = self.__attack_gauge_scheduler.get_someone_to_move()
+        if legendary_creature is None:
+            self.finish("DRAW")
+            return None
 
-        return res + ")"
+        policy: BattlePolicy = self.policy1 if self.get_side(legendary_creature) == 1 else self.policy2
+        event: BattleEvent = self.carry_out(legendary_creature,
+                                            policy.choose_decision(self, legendary_creature, self.rng))
+        self.num_turns += 1
+        self.events.append(event)
+        for observer in self.observers:
+            observer.on_turn(self, event)
+
+        outcome: str or None = self.get_outcome()
+        if outcome is not None:
+            self.finish(outcome)
+        return event
+
+    def run(self):
+        # type: () -> BattleResult
+        """
+        Carrying out the battle until it ends.
+        :return: the result of the battle
+        """
 
-    def clone(self):
-        # type: () -> LegendaryCreatureInventory
-        return copy.deepcopy(self)
+        while self.result is None:
+            self.play_turn()
+        return self.result
 
 
-class ItemInventory:
+class BattleOutcomeEstimate:
     """
-    This class contains attributes of an inventory containing items.
+    This class contains attributes of the estimated outcome of a battle, as seen by side 1.
     """
 
-    def __init__(self):
-        # type: () -> None
-        self.__items: list = []  # initial value
-
-    def add_item(self, item):
-        # type: (Item) -> None
-        self.__items.append(item)
+    def __init__(self, num_simulations, num_wins, total_turns, total_hp1, total_hp2, confidence=0.95):
+        # type: (int, int, int, mpf, mpf, float) -> None
+        self.num_simulations: int = num_simulations
+        self.num_wins: int = num_wins
+        self.confidence: float = confidence
+        self.win_probability: float = num_wins / num_simulations if num_simulations > 0 else 0.0
+        self.win_probability_interval: tuple = self.get_wilson_interval(num_wins, num_simulations, confidence)
+        self.expected_turns: float = total_turns / num_simulations if num_simulations > 0 else 0.0
+        self.expected_remaining_hp1: mpf = total_hp1 / num_simulations if num_simulations > 0 else mpf("0")
+        self.expected_remaining_hp2: mpf = total_hp2 / num_simulations if num_simulations > 0 else mpf("0")
+
+    @staticmethod
+    def get_wilson_interval(num_wins, num_simulations, confidence):
+        # type: (int, int, float) -> tuple
+        """
+        Getting the Wilson score interval of the win probability, which stays within [0, 1] even for win rates
+        close to 0 or 1.
+        :return: the lower and upper bound of the interval
+        """
 
-    def remove_item(self, item):
-        # type: (Item) -> bool
-        if item in self.__items:
-            self.__items.remove(item)
-            return True
-        return False
+        if num_simulations == 0:
+            return 0.0, 1.0
 
-    def get_items(self):
-        # type: () -> list
-        return self.__items
+        z: float = NormalDist().inv_cdf(0.5 + confidence / 2)
+        p: float = num_wins / num_simulations
+        denominator: float = 1 + z * z / num_simulations
+        centre: float = (p + z * z / (2 * num_simulations)) / denominator
+        margin: float = z * math.sqrt(p * (1 - p) / num_simulations + z * z / (4 * num_simulations ** 2)) / \
+            denominator
+        return max(0.0, centre - margin), min(1.0, centre + margin)
 
     def __str__(self):
         # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+        return tabulate([["Simulations", self.num_simulations],
+                         ["Win probability", "%.1f%%" % (100 * self.win_probability)],
+                         [str(round(100 * self.confidence)) + "% confidence interval",
+                          "%.1f%% - %.1f%%" % (100 * self.win_probability_interval[0],
+                                               100 * self.win_probability_interval[1])],
+                         ["Expected turns", "%.1f" % self.expected_turns],
+                         ["Expected HP left (you)", str(mp.nstr(self.expected_remaining_hp1, 6))],
+                         ["Expected HP left (opponent)", str(mp.nstr(self.expected_remaining_hp2, 6))]],
+                        headers=["Battle Odds", "Value"], tablefmt="fancy_grid")
+
+
+class BattleOutcomeEstimator:
+    """
+    This class contains attributes of an estimator of the outcome of battles which simulates them many times with
+    battle engines across worker processes. Simulations are split into batches of BATCH_SIZE, each with its own
+    random number generator seeded from the seed of the estimate and the index of the batch, so the same seed gives
+    the same estimate however many workers there are.
+    """
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+    BATCH_SIZE: int = 25
+    NUM_SIMULATIONS: int = 200
+
+    def __init__(self, max_workers=None, num_simulations=NUM_SIMULATIONS, batch_size=BATCH_SIZE, confidence=0.95):
+        # type: (int or None, int, int, float) -> None
+        self.max_workers: int = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.num_simulations: int = num_simulations
+        self.batch_size: int = batch_size
+        self.confidence: float = confidence
+        self.__executor: ProcessPoolExecutor or None = None
+
+    def get_batches(self, num_simulations, seed):
+        # type: (int, int) -> list
+        return [(min(self.batch_size, num_simulations - start), str(seed) + ":" + str(start // self.batch_size))
+                for start in range(0, num_simulations, self.batch_size)]
+
+    def submit(self, team1, team2, num_simulations, policy1, policy2, seed, max_turns):
+        # type: (BattleTeam, BattleTeam or LegendaryCreature, int, BattlePolicy, BattlePolicy, int, int) -> list
+        if self.max_workers <= 1:
+            return [simulate_battles(team1, team2, batch_size, batch_seed, policy1, policy2, max_turns)
+                    for batch_size, batch_seed in self.get_batches(num_simulations, seed)]
+
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return [self.__executor.submit(simulate_battles, team1, team2, batch_size, batch_seed, policy1, policy2,
+                                       max_turns)
+                for batch_size, batch_seed in self.get_batches(num_simulations, seed)]
+
+    def collect(self, batches, num_simulations):
+        # type: (list, int) -> BattleOutcomeEstimate
+        totals: list = [0, 0, mpf("0"), mpf("0")]  # initial value
+        for batch in batches:
+            batch_totals: list = batch.result() if not isinstance(batch, list) else batch
+            totals = [totals[i] + batch_totals[i] for i in range(len(totals))]
+        return BattleOutcomeEstimate(num_simulations, totals[0], totals[1], totals[2], totals[3], self.confidence)
+
+    def estimate(self, team1, team2, num_simulations=None, policy1=None, policy2=None, seed=None, max_turns=None):
+        # type: (BattleTeam, BattleTeam or LegendaryCreature, int, BattlePolicy, BattlePolicy, int, int) -> BattleOutcomeEstimate
+        """
+        Estimating the outcome of a battle between 'team1' and 'team2' from 'num_simulations' simulated battles.
+        The teams themselves are left untouched.
+        :return: the estimate
+        """
 
-            index += 1
+        if num_simulations is None:
+            num_simulations = self.num_simulations
+        if seed is None:
+            seed = random.getrandbits(64)
+        return self.collect(self.submit(team1, team2, num_simulations, policy1, policy2, seed, max_turns),
+                            num_simulations)
 
-        return res + ")"
+    def compare_teams(self, teams, team2, num_simulations=None, policy1=None, policy2=None, seed=None,
+                      max_turns=None):
+        # type: (list, BattleTeam or LegendaryCreature, int, BattlePolicy, BattlePolicy, int, int) -> list
+        """
+        Estimating the outcome of battles between each team in 'teams' and 'team2'. All simulations are handed to
+        the workers at once, and every team meets the same random numbers.
+        :return: the estimates in the order of 'teams'
+        """
 
-    def clone(self):
-        # type: () -> ItemInventory
-        return copy.deepcopy(self)
+        if num_simulations is None:
+            num_simulations = self.num_simulations
+        if seed is None:
+            seed = random.getrandbits(64)
+        batches: list = [self.submit(team1, team2, num_simulations, policy1, policy2, seed, max_turns)
+                         for team1 in teams]
+        return [self.collect(team_batches, num_simulations) for team_batches in batches]
 
+    def close(self):
+        # type: () -> None
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
 
-###########################################
-# INVENTORY
-###########################################
 
+class BatchBattleResult:
+    """
+    This class contains attributes of the outcomes of many battles simulated at once, as seen by side 1. Winning
+    sides are 1 or 2, or 0 for battles which reached the maximum number of turns.
+    """
 
-###########################################
-# LEGENDARY CREATURE
-###########################################
+    def __init__(self, winning_sides, num_turns, remaining_hp1, remaining_hp2):
+        # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray) -> None
+        self.winning_sides: np.ndarray = winning_sides
+        self.num_turns: np.ndarray = num_turns
+        self.remaining_hp1: np.ndarray = remaining_hp1
+        self.remaining_hp2: np.ndarray = remaining_hp2
 
+    def get_num_battles(self):
+        # type: () -> int
+        return len(self.winning_sides)
 
-class BattleTeam:
+    def get_win_rate(self):
+        # type: () -> float
+        return float(np.mean(self.winning_sides == 1)) if self.get_num_battles() > 0 else 0.0
+
+    def get_estimate(self, confidence=0.95):
+        # type: (float) -> BattleOutcomeEstimate
+        return BattleOutcomeEstimate(self.get_num_battles(), int(np.sum(self.winning_sides == 1)),
+                                     int(np.sum(self.num_turns)), mpf(float(np.sum(self.remaining_hp1))),
+                                     mpf(float(np.sum(self.remaining_hp2))), confidence)
+
+
+class BatchBattleSimulator:
     """
-    This class contains attributes of a team brought to battles.
+    This class contains attributes of a simulator carrying out many battles at once with NumPy. The stats of the
+    legendary creatures of all battles are kept in arrays with one row per battle and one column per legendary
+    creature, side 1 first, and all battles advance together one turn at a time with the rules of battle engines.
+    Each side follows one of POLICIES, which are RandomBattlePolicy and FocusedBattlePolicy.
     """
 
-    MAX_LEGENDARY_CREATURES: int = 5
+    POLICIES: list = ["RANDOM", "FOCUSED"]
+    STAT_NAMES: list = ["hp", "max_hp", "magic_points", "attack_power", "defense", "attack_speed", "crit_rate",
+                        "crit_damage", "attack_gauge"]
+    SKILL_STAT_NAMES: list = ["skill_damage_multipliers", "skill_heal_amounts", "skill_magic_points_costs"]
+    SKILL_TYPE_CODES: dict = {"ATTACK": 1, "HEAL": 2}
+    CHUNK_SIZE: int = 65536
+
+    def __init__(self, stats, team_size1, policy1="FOCUSED", policy2="RANDOM", max_turns=BattleEngine.MAX_TURNS):
+        # type: (dict, int, str, str, int) -> None
+        if np is None:
+            raise ImportError("NumPy is needed to simulate battles in batches.")
+
+        self.stats: dict = stats
+        self.team_size1: int = team_size1
+        self.policy1: str = policy1 if policy1 in self.POLICIES else self.POLICIES[0]
+        self.policy2: str = policy2 if policy2 in self.POLICIES else self.POLICIES[0]
+        self.max_turns: int = max_turns
+        self.element_multipliers: np.ndarray = np.array(
+            [[float(get_elemental_damage_multiplier(element1, element2))
+              for element2 in LegendaryCreature.POTENTIAL_ELEMENTS]
+             for element1 in LegendaryCreature.POTENTIAL_ELEMENTS])
+
+    def get_num_battles(self):
+        # type: () -> int
+        return len(self.stats["present"])
+
+    @staticmethod
+    def from_matchups(matchups, policy1="FOCUSED", policy2="RANDOM", max_turns=BattleEngine.MAX_TURNS):
+        # type: (list, str, str, int) -> BatchBattleSimulator
+        """
+        Packing the stats of the legendary creatures in 'matchups', a list of (team1, team2) pairs where team2 is a
+        BattleTeam or a wild LegendaryCreature, into arrays. Smaller teams are padded with absent legendary
+        creatures, which never move.
+        :return: the simulator
+        """
 
-    def __init__(self, legendary_creatures=None):
-        # type: (list) -> None
-        if legendary_creatures is None:
-            legendary_creatures = []
-        self.__legendary_creatures: list = legendary_creatures if len(legendary_creatures) <= \
-                                                                  self.MAX_LEGENDARY_CREATURES else []
+        if np is None:
+            raise ImportError("NumPy is needed to simulate battles in batches.")
+
+        teams: list = [(team1.get_legendary_creatures(), [team2] if isinstance(team2, LegendaryCreature) else
+                        team2.get_legendary_creatures()) for team1, team2 in matchups]
+        team_size1: int = max([len(team1) for team1, team2 in teams] + [1])
+        team_size2: int = max([len(team2) for team1, team2 in teams] + [1])
+        num_skills: int = max([len(legendary_creature.get_skills()) for team1, team2 in teams
+                               for legendary_creature in team1 + team2] + [1])
+        shape: tuple = (len(teams), team_size1 + team_size2)
+        stats: dict = {name: np.zeros(shape) for name in BatchBattleSimulator.STAT_NAMES}
+        stats.update({name: np.zeros(shape + (num_skills,)) for name in BatchBattleSimulator.SKILL_STAT_NAMES})
+        stats["element"] = np.zeros(shape, dtype=np.int8)
+        stats["present"] = np.zeros(shape, dtype=bool)
+        stats["skill_types"] = np.zeros(shape + (num_skills,), dtype=np.int8)
+        for battle, (team1, team2) in enumerate(teams):
+            slots: list = list(enumerate(team1)) + [(team_size1 + i, legendary_creature)
+                                                    for i, legendary_creature in enumerate(team2)]
+            for slot, legendary_creature in slots:
+                stats["present"][battle, slot] = True
+                stats["element"][battle, slot] = LegendaryCreature.POTENTIAL_ELEMENTS.index(
+                    legendary_creature.element)
+                for name, value in (("hp", legendary_creature.curr_hp), ("max_hp", legendary_creature.max_hp),
+                                    ("magic_points", legendary_creature.curr_magic_points),
+                                    ("attack_power", legendary_creature.attack_power),
+                                    ("defense", legendary_creature.defense),
+                                    ("attack_speed", legendary_creature.attack_speed),
+                                    ("crit_rate", legendary_creature.crit_rate),
+                                    ("crit_damage", legendary_creature.crit_damage),
+                                    ("attack_gauge", legendary_creature.attack_gauge)):
+                    stats[name][battle, slot] = float(value)
+                for i, skill in enumerate(legendary_creature.get_skills()):
+                    stats["skill_types"][battle, slot, i] = BatchBattleSimulator.SKILL_TYPE_CODES[skill.skill_type]
+                    stats["skill_damage_multipliers"][battle, slot, i] = float(skill.damage_multiplier)
+                    stats["skill_heal_amounts"][battle, slot, i] = float(skill.heal_amount)
+                    stats["skill_magic_points_costs"][battle, slot, i] = float(skill.magic_points_cost)
+
+        return BatchBattleSimulator(stats, team_size1, policy1, policy2, max_turns)
+
+    @staticmethod
+    def from_random(num_battles, team_size1=None, team_size2=None, seed=None, policy1="FOCUSED", policy2="RANDOM",
+                    max_turns=BattleEngine.MAX_TURNS):
+        # type: (int, int or None, int or None, int or None, str, str, int) -> BatchBattleSimulator
+        """
+        Drawing 'num_battles' random matchups between full battle teams, or teams of 'team_size1' and 'team_size2',
+        of legendary creatures of random elements, with stats and skills drawn the same way as in
+        generate_random_legendary_creature().
+        :return: the simulator
+        """
 
-    def add_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if len(self.__legendary_creatures) < self.MAX_LEGENDARY_CREATURES:
-            self.__legendary_creatures.append(legendary_creature)
-            return True
-        return False
+        if np is None:
+            raise ImportError("NumPy is needed to simulate battles in batches.")
+
+        if team_size1 is None:
+            team_size1 = BattleTeam.MAX_LEGENDARY_CREATURES
+        if team_size2 is None:
+            team_size2 = BattleTeam.MAX_LEGENDARY_CREATURES
+
+        rng = np.random.default_rng(seed)
+        shape: tuple = (num_battles, team_size1 + team_size2)
+        skill_shape: tuple = shape + (4,)
+        stats: dict = {
+            "max_hp": rng.integers(45000, 55000, shape, endpoint=True).astype(float),
+            "magic_points": rng.integers(45000, 55000, shape, endpoint=True).astype(float),
+            "attack_power": rng.integers(8500, 9500, shape, endpoint=True).astype(float),
+            "defense": rng.integers(8500, 9500, shape, endpoint=True).astype(float),
+            "attack_speed": rng.integers(100, 125, shape, endpoint=True).astype(float),
+            "crit_rate": np.full(shape, float(LegendaryCreature.MIN_CRIT_RATE)),
+            "crit_damage": np.full(shape, float(LegendaryCreature.MIN_CRIT_DAMAGE)),
+            "attack_gauge": np.zeros(shape),
+            "element": rng.integers(0, len(LegendaryCreature.POTENTIAL_ELEMENTS), shape).astype(np.int8),
+            "present": np.ones(shape, dtype=bool)
+        }
+        stats["hp"] = stats["max_hp"].copy()
+
+        # Like in generate_random_legendary_creature(), the powers of ten in skills grow with the number of attack
+        # skills so far.
+        is_attack_skill: np.ndarray = rng.random(skill_shape) < 0.5
+        num_attack_skills: np.ndarray = np.cumsum(is_attack_skill, axis=2)
+        stats["skill_types"] = np.where(is_attack_skill, 1, 2).astype(np.int8)
+        stats["skill_damage_multipliers"] = np.where(
+            is_attack_skill, num_attack_skills * 0.01 * rng.integers(350, 450, skill_shape, endpoint=True), 0.0)
+        stats["skill_heal_amounts"] = np.where(
+            is_attack_skill, 0.0, 10.0 ** (num_attack_skills * rng.integers(1, 3, skill_shape, endpoint=True)))
+        stats["skill_magic_points_costs"] = 10.0 ** (num_attack_skills *
+                                                     rng.integers(2, 4, skill_shape, endpoint=True))
+        return BatchBattleSimulator(stats, team_size1, policy1, policy2, max_turns)
+
+    def choose_random_decisions(self, actor_stats, actors, enemy_starts, enemy_counts, rng):
+        # type: (dict, np.ndarray, np.ndarray, np.ndarray, np.random.Generator) -> tuple
+        num_battles: int = len(actors)
+        num_skills: np.ndarray = np.count_nonzero(actor_stats["skill_types"], axis=1)
+        action_codes: np.ndarray = rng.integers(0, 3, num_battles)
+        action_codes[(action_codes == 2) & (num_skills == 0)] = 0
+        skills: np.ndarray = (rng.random(num_battles) * np.maximum(num_skills, 1)).astype(np.int64)
+        targets: np.ndarray = enemy_starts + (rng.random(num_battles) * enemy_counts).astype(np.int64)
+        heals_self: np.ndarray = (action_codes == 1) | ((action_codes == 2) & (np.take_along_axis(
+            actor_stats["skill_types"], skills[:, None], axis=1)[:, 0] == 2))
+        return action_codes, skills, np.where(heals_self, actors, targets)
+
+    def choose_focused_decisions(self, state, actor_stats, actors, enemy_starts, sides):
+        # type: (dict, dict, np.ndarray, np.ndarray, np.ndarray) -> tuple
+        skill_types: np.ndarray = actor_stats["skill_types"]
+        affordable: np.ndarray = (skill_types > 0) & (actor_stats["skill_magic_points_costs"] <=
+                                                      actor_stats["magic_points"][:, None])
+        heal_amounts: np.ndarray = np.where(affordable & (skill_types == 2), actor_stats["skill_heal_amounts"],
+                                            -np.inf)
+        damage_multipliers: np.ndarray = np.where(affordable & (skill_types == 1),
+                                                  actor_stats["skill_damage_multipliers"], -np.inf)
+        best_heal_skills: np.ndarray = np.argmax(heal_amounts, axis=1)
+        best_attack_skills: np.ndarray = np.argmax(damage_multipliers, axis=1)
+        has_heal_skill: np.ndarray = np.any(heal_amounts > -np.inf, axis=1)
+        has_attack_skill: np.ndarray = np.any(damage_multipliers > -np.inf, axis=1)
+
+        is_enemy: np.ndarray = state["is_side2"][None, :] == (sides == 1)[:, None]
+        living_enemy_hp: np.ndarray = np.where(is_enemy & (state["hp"] > 0), state["hp"], np.inf)
+        weakest_enemies: np.ndarray = np.argmin(living_enemy_hp, axis=1)
+        weakest_enemies = np.where(np.isinf(np.take_along_axis(living_enemy_hp, weakest_enemies[:, None],
+                                                               axis=1)[:, 0]), enemy_starts, weakest_enemies)
+
+        low_hp: np.ndarray = actor_stats["hp"] < float(FocusedBattlePolicy.HEAL_HP_FRACTION) * actor_stats["max_hp"]
+        action_codes: np.ndarray = np.where(low_hp, np.where(has_heal_skill, 2, 1), np.where(has_attack_skill, 2, 0))
+        skills: np.ndarray = np.where(low_hp, best_heal_skills, best_attack_skills)
+        return action_codes, skills, np.where(low_hp, actors, weakest_enemies)
+
+    def play_turns(self, state, rng):
+        # type: (dict, np.random.Generator) -> None
+        """
+        Letting the next legendary creature in every battle in 'state' have its turn.
+        :return: None
+        """
 
-    def remove_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.__legendary_creatures:
-            self.__legendary_creatures.remove(legendary_creature)
-            return True
-        return False
+        num_battles, num_slots = state["hp"].shape
+        attack_gauges: np.ndarray = state["attack_gauge"]
+
+        # Jumping to the first tick in which somebody's attack gauge is full, plus one more tick as in
+        # AttackGaugeScheduler, and letting the fullest attack gauge win with ties going to the last. Absent
+        # legendary creatures need infinitely many ticks.
+        num_ticks: np.ndarray = np.maximum(np.ceil((1.0 - attack_gauges) * state["ticks_per_attack_gauge"]), 0.0)
+        min_ticks: np.ndarray = np.min(num_ticks, axis=1)
+        attack_gauges += (min_ticks + 1)[:, None] * state["attack_gauge_increases"]
+        full_attack_gauges: np.ndarray = np.where(num_ticks == min_ticks[:, None], attack_gauges, -np.inf)
+        actors: np.ndarray = num_slots - 1 - np.argmax(full_attack_gauges[:, ::-1], axis=1)
+        flat_actors: np.ndarray = np.arange(num_battles) * num_slots + actors
+        attack_gauges.reshape(-1)[flat_actors] = 0.0
+
+        # Gathering the stats of the legendary creatures which move
+        actor_stats: dict = {name: state[name].reshape(-1)[flat_actors] for name in
+                             ["hp", "max_hp", "magic_points", "attack_power", "crit_rate", "crit_damage", "element"]}
+        actor_stats.update({name: state[name].reshape(num_battles * num_slots, -1)[flat_actors] for name in
+                            ["skill_types"] + self.SKILL_STAT_NAMES})
+
+        # Deciding what the legendary creatures do
+        sides: np.ndarray = np.where(actors < self.team_size1, 1, 2)
+        enemy_starts: np.ndarray = np.where(sides == 1, self.team_size1, 0)
+        decisions: dict = {}  # initial value
+        for policy in {self.policy1, self.policy2}:
+            decisions[policy] = self.choose_random_decisions(
+                actor_stats, actors, enemy_starts, np.where(sides == 1, state["team_sizes2"], state["team_sizes1"]),
+                rng) if policy == "RANDOM" else \
+                self.choose_focused_decisions(state, actor_stats, actors, enemy_starts, sides)
+        action_codes, skills, targets = decisions[self.policy1] if self.policy1 == self.policy2 else \
+            [np.where(sides == 1, decisions[self.policy1][i], decisions[self.policy2][i]) for i in range(3)]
+
+        # Carrying out the decisions
+        skill_stats: dict = {name: np.take_along_axis(actor_stats[name], skills[:, None], axis=1)[:, 0] for name in
+                             ["skill_types"] + self.SKILL_STAT_NAMES}
+        uses_skill: np.ndarray = (action_codes == 2) & (actor_stats["magic_points"] >=
+                                                        skill_stats["skill_magic_points_costs"])
+        state["magic_points"].reshape(-1)[flat_actors] -= np.where(uses_skill, skill_stats["skill_magic_points_costs"],
+                                                                   0.0)
+
+        heal_amounts: np.ndarray = np.where(action_codes == 1, 0.05 * actor_stats["max_hp"],
+                                            np.where(uses_skill & (skill_stats["skill_types"] == 2),
+                                                     skill_stats["skill_heal_amounts"], 0.0))
+        state["hp"].reshape(-1)[flat_actors] = np.where(heal_amounts > 0,
+                                                        np.minimum(actor_stats["hp"] + heal_amounts,
+                                                                   actor_stats["max_hp"]), actor_stats["hp"])
+
+        flat_targets: np.ndarray = np.arange(num_battles) * num_slots + targets
+        attacks: np.ndarray = (action_codes == 0) | (uses_skill & (skill_stats["skill_types"] == 1))
+        damage_multipliers: np.ndarray = np.where(action_codes == 0, 1.0, skill_stats["skill_damage_multipliers"])
+        crit_factors: np.ndarray = np.where(rng.random(num_battles) < actor_stats["crit_rate"],
+                                            actor_stats["crit_damage"], 1.0)
+        raw_damage: np.ndarray = (actor_stats["attack_power"] * damage_multipliers * crit_factors -
+                                  state["defense"].reshape(-1)[flat_targets]) * \
+            self.element_multipliers[actor_stats["element"], state["element"].reshape(-1)[flat_targets]]
+        state["hp"].reshape(-1)[flat_targets[attacks]] -= np.maximum(raw_damage[attacks], 0.0)
+        state["num_turns"] += 1
+
+    def run_chunk(self, start, stop, rng, result):
+        # type: (int, int, np.random.Generator, BatchBattleResult) -> None
+        state: dict = {name: np.ascontiguousarray(values[start:stop]) for name, values in self.stats.items()}
+        state["ids"] = np.arange(start, stop)
+        state["attack_gauge_increases"] = np.where(state["present"], state["attack_speed"] *
+                                                   AttackGaugeScheduler.ATTACK_GAUGE_RATE, 0.0)
+        with np.errstate(divide="ignore"):
+            state["ticks_per_attack_gauge"] = np.where(state["attack_gauge_increases"] > 0,
+                                                       1.0 / state["attack_gauge_increases"], np.inf)
+        state["hp"] = np.where(state["present"], state["hp"], 0.0)
+        state["team_sizes1"] = np.count_nonzero(state["present"][:, :self.team_size1], axis=1)
+        state["team_sizes2"] = np.count_nonzero(state["present"][:, self.team_size1:], axis=1)
+        state["num_turns"] = np.zeros(stop - start, dtype=np.int64)
+        state["active"] = np.any(state["present"], axis=1)
+        state["is_side2"] = np.arange(state["hp"].shape[1]) >= self.team_size1
+
+        # Battles which have finished keep being played until enough of them have finished to be worth removing.
+        while len(state["ids"]) > 0:
+            self.play_turns(state, rng)
+
+            dead: np.ndarray = state["hp"] <= 0
+            side2_died: np.ndarray = np.all(dead[:, self.team_size1:], axis=1)
+            side1_died: np.ndarray = np.all(dead[:, :self.team_size1], axis=1)
+            finished: np.ndarray = state["active"] & (side2_died | side1_died |
+                                                      (state["num_turns"] >= self.max_turns))
+            if np.any(finished):
+                ids: np.ndarray = state["ids"][finished]
+                remaining_hp: np.ndarray = np.maximum(state["hp"][finished], 0.0)
+                result.winning_sides[ids] = np.where(side2_died, 1, np.where(side1_died, 2, 0))[finished]
+                result.num_turns[ids] = state["num_turns"][finished]
+                result.remaining_hp1[ids] = np.sum(remaining_hp[:, :self.team_size1], axis=1)
+                result.remaining_hp2[ids] = np.sum(remaining_hp[:, self.team_size1:], axis=1)
+                state["active"] &= ~finished
+
+            num_active: int = int(np.count_nonzero(state["active"]))
+            if num_active <= 3 * len(state["ids"]) // 4:
+                active: np.ndarray = state["active"]
+                for name in state:
+                    if name != "is_side2":
+                        state[name] = state[name][active]
+
+    def run(self, seed=None):
+        # type: (int or None) -> BatchBattleResult
+        """
+        Carrying out all battles, CHUNK_SIZE battles at a time.
+        :return: the outcomes of the battles
+        """
 
-    def get_legendary_creatures(self):
-        # type: () -> list
-        return self.__legendary_creatures
+        rng = np.random.default_rng(seed)
+        num_battles: int = self.get_num_battles()
+        result: BatchBattleResult = BatchBattleResult(np.zeros(num_battles, dtype=np.int8),
+                                                      np.zeros(num_battles, dtype=np.int64), np.zeros(num_battles),
+                                                      np.zeros(num_battles))
+        for start in range(0, num_battles, self.CHUNK_SIZE):
+            self.run_chunk(start, min(num_battles, start + self.CHUNK_SIZE), rng, result)
+        return result
 
-    def recover_all(self):
+
+class TrainerOccupancyIndex:
+    """
+    This class contains attributes of an index of which trainers are on which tiles of a city. Trainers are added,
+    moved and removed in constant time: each trainer remembers its position in the list of its tile, and removing a
+    trainer moves the last trainer of that list into its place.
+    """
+
+    def __init__(self):
         # type: () -> None
-        for legendary_creature in self.__legendary_creatures:
-            legendary_creature.restore()
+        self.__trainers_at: dict = {}  # initial value
+        self.__locations: dict = {}  # initial value
+        self.__slots: dict = {}  # initial value
+        self.__versions: dict = {}  # initial value
 
-    def all_died(self):
-        # type: () -> bool
-        for legendary_creature in self.__legendary_creatures:
-            if legendary_creature.get_is_alive():
-                return False
+    def touch(self, x, y):
+        # type: (int, int) -> None
+        self.__versions[(x, y)] = self.__versions.get((x, y), 0) + 1
+
+    def get_version(self, x, y):
+        # type: (int, int) -> int
+        """
+        Getting a number which changes whenever a trainer enters or leaves (x, y).
+        :return: the version of the tile at (x, y)
+        """
+
+        return self.__versions.get((x, y), 0)
+
+    def add(self, x, y, trainer):
+        # type: (int, int, Trainer) -> None
+        if trainer in self.__locations:
+            self.remove(self.__locations[trainer][0], self.__locations[trainer][1], trainer)
+
+        trainers: list = self.__trainers_at.setdefault((x, y), [])
+        self.__slots[trainer] = len(trainers)
+        self.__locations[trainer] = (x, y)
+        trainers.append(trainer)
+        self.touch(x, y)
+
+    def remove(self, x, y, trainer):
+        # type: (int, int, Trainer) -> bool
+        if self.__locations.get(trainer) != (x, y):
+            return False
+
+        trainers: list = self.__trainers_at[(x, y)]
+        slot: int = self.__slots.pop(trainer)
+        last_trainer: Trainer = trainers.pop()
+        if last_trainer is not trainer:
+            trainers[slot] = last_trainer
+            self.__slots[last_trainer] = slot
+        if len(trainers) == 0:
+            del self.__trainers_at[(x, y)]
+        del self.__locations[trainer]
+        self.touch(x, y)
         return True
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+    def move(self, trainer, x, y):
+        # type: (Trainer, int, int) -> None
+        self.add(x, y, trainer)
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+    def get_location(self, trainer):
+        # type: (Trainer) -> tuple or None
+        return self.__locations.get(trainer)
+
+    def get_trainers(self, x, y):
+        # type: (int, int) -> list
+        return self.__trainers_at.get((x, y), [])
+
+    def count(self, x, y):
+        # type: (int, int) -> int
+        return len(self.__trainers_at.get((x, y), []))
+
+    def get_occupied_locations(self):
+        # type: () -> list
+        return list(self.__trainers_at.keys())
+
+    def choose_opponent(self, x, y, trainer, rng=random):
+        # type: (int, int, Trainer, random.Random) -> Trainer or None
+        """
+        Choosing a random trainer at (x, y) other than 'trainer' without drawing again.
+        :return: the chosen trainer, or None if there is nobody else at (x, y)
+        """
 
+        trainers: list = self.__trainers_at.get((x, y), [])
+        own_slot: int or None = self.__slots[trainer] if self.__locations.get(trainer) == (x, y) else None
+        num_others: int = len(trainers) - (1 if own_slot is not None else 0)
+        if num_others <= 0:
+            return None
+
+        index: int = rng.randrange(num_others)
+        if own_slot is not None and index >= own_slot:
             index += 1
+        return trainers[index]
 
-        return res + ")"
+    @staticmethod
+    def choose_other_trainer(trainers, trainer, rng=random):
+        # type: (list, Trainer, random.Random) -> Trainer or None
+        others: list = [other for other in trainers if other is not trainer]
+        return rng.choice(others) if len(others) > 0 else None
 
-    def clone(self):
-        # type: () -> BattleTeam
-        return copy.deepcopy(self)
+    def __len__(self):
+        # type: () -> int
+        return len(self.__locations)
 
 
-class LegendaryCreature:
+class City:
     """
-    This class contains attributes of a legendary creature in this game.
+    This class contains attributes of a city in this game.
     """
 
-    MIN_CRIT_RATE: mpf = mpf("0.15")
-    MAX_CRIT_RATE: mpf = mpf("1")
-    MIN_CRIT_DAMAGE: mpf = mpf("1.5")
-    MIN_ATTACK_GAUGE: mpf = mpf("0")
-    FULL_ATTACK_GAUGE: mpf = mpf("1")
-    POTENTIAL_ELEMENTS: list = ["TERRA", "FLAME", "SEA", "NATURE", "ELECTRIC", "ICE", "METAL", "DARK", "LIGHT", "WAR",
-                                "PURE", "LEGEND", "PRIMAL", "WIND", "BEAUTY", "MAGIC", "CHAOS", "HAPPY", "DREAM",
-                                "SOUL"]
-
-    def __init__(self, name, element, max_hp, max_magic_points, attack_power, defense, attack_speed, skills,
-                 awaken_bonus):
-        # type: (str, mpf, str, mpf, mpf, mpf, mpf, list, AwakenBonus) -> None
+    def __init__(self, name, tiles):
+        # type: (str, list) -> None
         self.name: str = name
-        self.element: str = element if element in self.POTENTIAL_ELEMENTS else self.POTENTIAL_ELEMENTS[0]
-        self.level: int = 1
-        self.exp: mpf = mpf("0")
-        self.required_exp: mpf = mpf("1e6")
-        self.curr_hp: mpf = max_hp
-        self.max_hp: mpf = max_hp
-        self.curr_magic_points: mpf = max_magic_points
-        self.max_magic_points: mpf = max_magic_points
-        self.attack_power: mpf = attack_power
-        self.defense: mpf = defense
-        self.attack_speed: mpf = attack_speed
-        self.__skills: list = skills
-        self.awaken_bonus: AwakenBonus = awaken_bonus
-        self.crit_rate: mpf = self.MIN_CRIT_RATE
-        self.crit_damage: mpf = self.MIN_CRIT_DAMAGE
-        self.__runes: dict = {}  # initial value
+        self.__tiles: list = tiles
+        self.occupancy: TrainerOccupancyIndex = TrainerOccupancyIndex()
+        self.bind_tiles()
+        self.city_id: str = str(uuid.uuid1())
+        self.seed: int or None = None  # initial value
+        self.generation: dict or None = None  # initial value
+        self.__generated_ai_trainers: list = []  # initial value
+        self.__updated_ai_trainer_indices: set = set()  # initial value
+
+    def bind_tiles(self):
+        # type: () -> None
+        for y in range(len(self.__tiles)):
+            for x in range(len(self.__tiles[y])):
+                self.__tiles[y][x].bind(self.occupancy, x, y)
+
+    def set_generation(self, seed, average_player_battle_creature_level, city_representation, names, ai_trainers):
+        # type: (int, int, str, list, list) -> None
+        """
+        Remembering how build_city() built this city, so that a saved city only needs the seed and the changes made
+        to it since.
+        :return: None
+        """
+
+        self.seed = seed
+        self.generation = {
+            "average_player_battle_creature_level": average_player_battle_creature_level,
+            "city_representation": city_representation,
+            "names": names,
+            "ai_trainer_locations": [(ai_trainer.location.tile_x, ai_trainer.location.tile_y)
+                                     for ai_trainer in ai_trainers],
+        }
+        self.__generated_ai_trainers = list(ai_trainers)
+        self.__updated_ai_trainer_indices = set()
+
+    def record_trainer_update(self, trainer):
+        # type: (Trainer) -> None
+        """
+        Marking 'trainer' as changed so that it is saved in full instead of being built again from the seed.
+        :return: None
+        """
+
+        for i in range(len(self.__generated_ai_trainers)):
+            if self.__generated_ai_trainers[i] is trainer:
+                self.__updated_ai_trainer_indices.add(i)
+
+    def __getstate__(self):
+        # type: () -> dict
+        if self.seed is None:
+            return self.__dict__
+
+        # Only the AI trainers which changed, moved or left and the trainers which entered the city are saved.
+        ai_trainer_changes: dict = {}  # initial value
+        for i in range(len(self.__generated_ai_trainers)):
+            ai_trainer: Trainer = self.__generated_ai_trainers[i]
+            location: tuple = (ai_trainer.location.tile_x, ai_trainer.location.tile_y)
+            if self.occupancy.get_location(ai_trainer) != location:
+                ai_trainer_changes[i] = None
+            elif i in self.__updated_ai_trainer_indices or \
+                    location != self.generation["ai_trainer_locations"][i]:
+                ai_trainer_changes[i] = (location, ai_trainer)
+
+        generated_ids: set = {id(ai_trainer) for ai_trainer in self.__generated_ai_trainers}
+        visitors: list = []  # initial value
+        for x, y in self.occupancy.get_occupied_locations():
+            for trainer in self.occupancy.get_trainers(x, y):
+                if id(trainer) not in generated_ids:
+                    visitors.append(((x, y), trainer))
+
+        return {
+            "city_id": self.city_id,
+            "name": self.name,
+            "seed": self.seed,
+            "generation": self.generation,
+            "ai_trainer_changes": ai_trainer_changes,
+            "visitors": visitors,
+        }
+
+    def __setstate__(self, state):
+        # type: (dict) -> None
+        if "ai_trainer_changes" not in state:
+            self.__dict__.update(state)
+            self.__dict__.setdefault("city_id", str(uuid.uuid1()))
+            self.__dict__.setdefault("seed", None)
+            self.__dict__.setdefault("generation", None)
+            self.__dict__.setdefault("_City__generated_ai_trainers", [])
+            self.__dict__.setdefault("_City__updated_ai_trainer_indices", set())
+            if "occupancy" not in state:
+                # Saved before trainers were indexed by the city, so the trainers are still kept by the tiles.
+                self.occupancy = TrainerOccupancyIndex()
+                self.bind_tiles()
+            return
+
+        generation: dict = state["generation"]
+        city: City = build_city(None, generation["average_player_battle_creature_level"],
+                                generation["city_representation"], state["seed"], generation["names"])
+        self.__dict__.update(city.__dict__)
+        self.city_id = state["city_id"]
+        self.name = state["name"]
+        for i, ai_trainer_change in state["ai_trainer_changes"].items():
+            generated_ai_trainer: Trainer = self.__generated_ai_trainers[i]
+            self.get_tile_at(generated_ai_trainer.location.tile_x,
+                             generated_ai_trainer.location.tile_y).remove_trainer(generated_ai_trainer)
+            if ai_trainer_change is not None:
+                location, ai_trainer = ai_trainer_change
+                self.get_tile_at(location[0], location[1]).add_trainer(ai_trainer)
+                self.__generated_ai_trainers[i] = ai_trainer
+                self.__updated_ai_trainer_indices.add(i)
+
+        # Trainers which entered the city, like the player, may still be being loaded, so their saved locations
+        # are used rather than their own.
+        for location, trainer in state["visitors"]:
+            self.get_tile_at(location[0], location[1]).add_trainer(trainer)
+
+    def get_tile_at(self, x, y):
+        # type: (int, int) -> CityTile or None
+        if x < 0 or x >= len(self.__tiles[0]) or y < 0 or y >= len(self.__tiles):
+            return None
+        return self.__tiles[y][x]
+
+    def get_tiles(self):
+        # type: () -> list
+        return self.__tiles
+
+    def get_portal_locations(self, bounds=None):
+        # type: (tuple or None) -> list
+        if bounds is not None:
+            return self.get_tile_locations(bounds, PortalTile)
+        return [(x, y) for y in range(len(self.__tiles)) for x in range(len(self.__tiles[y]))
+                if self.__tiles[y][x].is_portal]
+
+    def get_tile_locations(self, bounds, tile_type):
+        # type: (tuple, type) -> list
+        """
+        Finding the tiles of type 'tile_type' within 'bounds', which is (min_x, min_y, max_x, max_y).
+        :return: a list of (x, y) locations
+        """
+
+        min_x, min_y, max_x, max_y = bounds
+        return [(x, y) for y in range(min_y, max_y) for x in range(min_x, max_x)
+                if isinstance(self.get_tile_at(x, y), tile_type)]
+
+    def get_trainer_locations(self, bounds, trainer=None):
+        # type: (tuple, Trainer or None) -> list
+        """
+        Finding the tiles within 'bounds', which is (min_x, min_y, max_x, max_y), with a trainer other than
+        'trainer' on them.
+        :return: a sorted list of (x, y) locations
+        """
+
+        min_x, min_y, max_x, max_y = bounds
+        return sorted((x, y) for x, y in self.occupancy.get_occupied_locations()
+                      if min_x <= x < max_x and min_y <= y < max_y and
+                      any(other is not trainer for other in self.occupancy.get_trainers(x, y)))
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(self.name)
+        all_tiles: list = []  # initial value
+        for y in range(len(self.__tiles)):
+            curr_tiles: list = []  # initial value
+            for x in range(len(self.__tiles[y])):
+                curr_tile: CityTile = self.get_tile_at(x, y)
+                curr_tiles.append(str(curr_tile))
+
+            all_tiles.append(curr_tiles)
+        return res + "\n" + str(tabulate(all_tiles, headers='firstrow', tablefmt='fancy_grid'))
+
+    def clone(self):
+        # type: () -> City
+        return copy.deepcopy(self)
+
+
+class WorldGraph:
+    """
+    This class contains attributes of the cities the player has visited and the portals between them. Portals work
+    both ways, so every city the player came from can be returned to.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.__city_names: dict = {}  # initial value
+        self.__neighbours: dict = {}  # initial value
+
+    def add_city(self, city):
+        # type: (City) -> None
+        self.__city_names[city.city_id] = str(city.name)
+        self.__neighbours.setdefault(city.city_id, [])
+
+    def add_portal(self, city1, city2):
+        # type: (City, City) -> None
+        self.add_city(city1)
+        self.add_city(city2)
+        if city2.city_id not in self.__neighbours[city1.city_id]:
+            self.__neighbours[city1.city_id].append(city2.city_id)
+        if city1.city_id not in self.__neighbours[city2.city_id]:
+            self.__neighbours[city2.city_id].append(city1.city_id)
+
+    def get_neighbours(self, city_id):
+        # type: (str) -> list
+        return self.__neighbours.get(city_id, [])
+
+    def get_city_name(self, city_id):
+        # type: (str) -> str
+        return self.__city_names.get(city_id, "UNKNOWN CITY")
+
+
+class VisitedCityCache:
+    """
+    This class contains attributes of a cache of the cities the player has left. The most recently visited cities
+    are kept in memory and the others are written to files in 'directory', which belongs to one saved game.
+    """
+
+    MAX_CITIES_IN_MEMORY: int = 8
+
+    def __init__(self, directory, max_cities_in_memory=MAX_CITIES_IN_MEMORY):
+        # type: (str, int) -> None
+        self.directory: str = directory
+        self.max_cities_in_memory: int = max_cities_in_memory
+        self.num_hits: int = 0
+        self.num_disk_hits: int = 0
+        self.num_misses: int = 0
+        self.__cities: OrderedDict = OrderedDict()  # initial value
+        os.makedirs(directory, exist_ok=True)
+
+    def get_file_name(self, city_id):
+        # type: (str) -> str
+        return os.path.join(self.directory, str(city_id) + ".pickle")
+
+    def put(self, city):
+        # type: (City) -> None
+        self.__cities[city.city_id] = city
+        self.__cities.move_to_end(city.city_id)
+        while len(self.__cities) > self.max_cities_in_memory:
+            self.spill(self.__cities.popitem(last=False)[1])
+
+    def spill(self, city):
+        # type: (City) -> None
+        with open(self.get_file_name(city.city_id), "wb") as file:
+            pickle.dump(city, file)
+
+    def get(self, city_id):
+        # type: (str) -> City or None
+        """
+        Taking the city with 'city_id' out of the cache for the player to enter. It is put back with put() when the
+        player leaves it again.
+        :return: the city, or None if it is not cached
+        """
+
+        if city_id in self.__cities:
+            self.num_hits += 1
+            return self.__cities.pop(city_id)
+
+        if os.path.isfile(self.get_file_name(city_id)):
+            self.num_disk_hits += 1
+            with open(self.get_file_name(city_id), "rb") as file:
+                city: City = pickle.load(file)
+
+            # The city changes once the player is in it, so the file would only go stale.
+            os.remove(self.get_file_name(city_id))
+            return city
+
+        self.num_misses += 1
+        return None
+
+    def close(self):
+        # type: () -> None
+        while len(self.__cities) > 0:
+            self.spill(self.__cities.popitem(last=False)[1])
+
+    def __str__(self):
+        # type: () -> str
+        return "Visited cities: " + str(self.num_hits) + " hits in memory, " + str(self.num_disk_hits) + \
+            " hits on disk, " + str(self.num_misses) + " misses"
+
+
+class DistanceField:
+    """
+    This class contains attributes of the number of steps from every tile in a region of a city to the nearest of a
+    set of target tiles. Paths never go through blocked tiles, although a blocked tile can itself be a target.
+    """
+
+    UNREACHABLE: int = -1
+
+    def __init__(self, bounds, targets, blocked=None):
+        # type: (tuple, list, set or None) -> None
+        self.bounds: tuple = bounds
+        min_x, min_y, max_x, max_y = bounds
+        self.width: int = max_x - min_x
+        self.height: int = max_y - min_y
+        self.distances: list = [self.UNREACHABLE] * (self.width * self.height)
+
+        # Breadth-first search from all targets at once
+        frontier: deque = deque()  # initial value
+        for x, y in targets:
+            if min_x <= x < max_x and min_y <= y < max_y and self.get_distance(x, y) == self.UNREACHABLE:
+                self.distances[(y - min_y) * self.width + x - min_x] = 0
+                frontier.append((x, y))
+
+        while len(frontier) > 0:
+            x, y = frontier.popleft()
+            distance: int = self.get_distance(x, y)
+            for next_x, next_y in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                if min_x <= next_x < max_x and min_y <= next_y < max_y and \
+                        self.get_distance(next_x, next_y) == self.UNREACHABLE and \
+                        (blocked is None or (next_x, next_y) not in blocked):
+                    self.distances[(next_y - min_y) * self.width + next_x - min_x] = distance + 1
+                    frontier.append((next_x, next_y))
+
+    def get_distance(self, x, y):
+        # type: (int, int) -> int
+        min_x, min_y, max_x, max_y = self.bounds
+        if x < min_x or x >= max_x or y < min_y or y >= max_y:
+            return self.UNREACHABLE
+        return self.distances[(y - min_y) * self.width + x - min_x]
+
+    def get_next_step(self, x, y):
+        # type: (int, int) -> str or None
+        """
+        Finding the direction of a step from (x, y) which brings the player one step closer to the nearest target.
+        :return: "UP", "DOWN", "LEFT" or "RIGHT", or None if (x, y) is a target or no target can be reached
+        """
+
+        distance: int = self.get_distance(x, y)
+        if distance <= 0:
+            return None
+
+        for direction, next_x, next_y in (("UP", x, y - 1), ("DOWN", x, y + 1), ("LEFT", x - 1, y),
+                                          ("RIGHT", x + 1, y)):
+            if self.get_distance(next_x, next_y) == distance - 1:
+                return direction
+        return None
+
+
+class DistanceFieldCache:
+    """
+    This class contains attributes of a cache of distance fields to portals, grass, trainers and single tiles of
+    cities. Stepping on a portal takes the player to another city, so paths only go through portals when the player
+    is going to a portal. Fields to portals, grass and tiles stay valid as long as the city does; fields to trainers
+    are kept for as long as no trainer other than the player has entered or left a tile. Cities with more than
+    MAX_TILES tiles get fields over a region around the player instead, which for a ChunkedCity is kept small enough
+    for all of its chunks to stay in memory.
+    """
+
+    MAX_TILES: int = 250000
+    REGION_RADIUS: int = 64
+    MAX_FIELDS: int = 16
+    TARGET_TYPES: list = ["PORTAL", "GRASS", "TRAINER"]
+
+    def __init__(self, max_fields=MAX_FIELDS):
+        # type: (int) -> None
+        self.max_fields: int = max_fields
+        self.num_hits: int = 0
+        self.num_misses: int = 0
+        self.__fields: OrderedDict = OrderedDict()  # initial value
+
+    def get_bounds(self, city, trainer):
+        # type: (City, Trainer) -> tuple
+        height: int = len(city.get_tiles())
+        width: int = len(city.get_tiles()[0])
+        if width * height <= self.MAX_TILES:
+            return 0, 0, width, height
+
+        region_radius: int = self.REGION_RADIUS
+        if isinstance(city, ChunkedCity):
+            region_radius = min(region_radius, city.get_max_region_radius())
+
+        # The region moves in whole steps of its radius so that it is shared by nearby positions.
+        min_x: int = max(0, (trainer.location.tile_x // region_radius - 1) * region_radius)
+        min_y: int = max(0, (trainer.location.tile_y // region_radius - 1) * region_radius)
+        return min_x, min_y, min(width, min_x + 3 * region_radius), min(height, min_y + 3 * region_radius)
+
+    def get_targets(self, city, trainer, target, bounds):
+        # type: (City, Trainer, str or tuple, tuple) -> list
+        if target == "PORTAL":
+            return city.get_portal_locations(bounds)
+        elif target == "GRASS":
+            return city.get_tile_locations(bounds, GrassTile)
+        elif target == "TRAINER":
+            return city.get_trainer_locations(bounds, trainer)
+        else:
+            return [target]
+
+    def get_field(self, trainer, target):
+        # type: (Trainer, str or tuple) -> DistanceField
+        """
+        Getting the distance field to 'target', which is one of TARGET_TYPES or a tuple (x, y), in the city
+        'trainer' is in.
+        :return: the distance field
+        """
+
+        city: City = trainer.city
+        bounds: tuple = self.get_bounds(city, trainer)
+        key: tuple = (id(city), target, bounds)
+        targets: list or None = None  # initial value
+        if target == "TRAINER":
+            targets = self.get_targets(city, trainer, target, bounds)
+            key += tuple(targets)
+
+        cached_field: tuple or None = self.__fields.get(key)
+        if cached_field is not None:
+            self.num_hits += 1
+            self.__fields.move_to_end(key)
+            return cached_field[1]
+
+        self.num_misses += 1
+        if targets is None:
+            targets = self.get_targets(city, trainer, target, bounds)
+
+        blocked: set or None = None  # initial value
+        if target != "PORTAL":
+            blocked = set(city.get_portal_locations(bounds))
+            if target == "TRAINER":
+                targets = [location for location in targets if location not in blocked]
+
+        # The city is kept with the field so that its id cannot be reused while the field is cached.
+        field: DistanceField = DistanceField(bounds, targets, blocked)
+        self.__fields[key] = (city, field)
+        while len(self.__fields) > self.max_fields:
+            self.__fields.popitem(last=False)
+        return field
+
+
+class CityRenderer:
+    """
+    This class contains attributes of a renderer showing the tiles of a city within a view radius of the player.
+    Each tile is only rendered again when a trainer has entered or left it, and the whole view is reused when
+    nothing in it changed, so rendering costs the same however large the city is.
+    """
+
+    VIEW_RADIUS: int = 5
+
+    def __init__(self, view_radius=VIEW_RADIUS):
+        # type: (int) -> None
+        self.view_radius: int = view_radius
+        self.num_rendered_tiles: int = 0
+        self.__city: City or None = None  # initial value
+        self.__rendered_tiles: dict = {}  # initial value
+        self.__view_key: tuple or None = None  # initial value
+        self.__rendered_view: str = ""  # initial value
+
+    def get_view_bounds(self, city, trainer):
+        # type: (City, Trainer) -> tuple
+        """
+        Finding the tiles within the view radius of 'trainer', shifted to stay inside the city.
+        :return: a tuple (min_x, min_y, max_x, max_y) with the maximums excluded
+        """
+
+        height: int = len(city.get_tiles())
+        width: int = len(city.get_tiles()[0])
+        view_size: int = 2 * self.view_radius + 1
+        min_x: int = max(0, min(trainer.location.tile_x - self.view_radius, width - view_size))
+        min_y: int = max(0, min(trainer.location.tile_y - self.view_radius, height - view_size))
+        return min_x, min_y, min(width, min_x + view_size), min(height, min_y + view_size)
+
+    def render(self, trainer):
+        # type: (Trainer) -> str
+        city: City = trainer.city
+        if city is not self.__city:
+            self.__city = city
+            self.__rendered_tiles = {}
+            self.__view_key = None
+
+        min_x, min_y, max_x, max_y = self.get_view_bounds(city, trainer)
+        versions: tuple = tuple(city.occupancy.get_version(x, y) for y in range(min_y, max_y)
+                                for x in range(min_x, max_x))
+        view_key: tuple = (min_x, min_y, max_x, max_y, versions)
+        if view_key == self.__view_key:
+            return self.__rendered_view
+
+        # The names of the trainers on the tiles to render are asked for together, in one request.
+        stale_tiles: dict = {(x, y): city.get_tile_at(x, y) for y in range(min_y, max_y) for x in range(min_x, max_x)
+                             if (x, y) not in self.__rendered_tiles or
+                             self.__rendered_tiles[(x, y)][0] != city.occupancy.get_version(x, y)}
+        LazyName.resolve_all([trainer.name for tile in stale_tiles.values() for trainer in tile.get_trainers()])
+
+        # Only the tiles in view are kept, so memory does not grow while walking around a large city.
+        rendered_tiles: dict = {}  # initial value
+        all_tiles: list = []  # initial value
+        for y in range(min_y, max_y):
+            curr_tiles: list = []  # initial value
+            for x in range(min_x, max_x):
+                version: int = city.occupancy.get_version(x, y)
+                rendered_tile: tuple or None = self.__rendered_tiles.get((x, y))
+                if (x, y) in stale_tiles:
+                    rendered_tile = (version, str(stale_tiles[(x, y)]))
+                    self.num_rendered_tiles += 1
+                rendered_tiles[(x, y)] = rendered_tile
+                curr_tiles.append(rendered_tile[1])
+
+            all_tiles.append(curr_tiles)
+
+        self.__rendered_tiles = rendered_tiles
+        self.__view_key = view_key
+        self.__rendered_view = str(city.name) + " (x: " + str(min_x) + " - " + str(max_x - 1) + ", y: " + \
+            str(min_y) + " - " + str(max_y - 1) + ")\n" + \
+            str(tabulate(all_tiles, headers='firstrow', tablefmt='fancy_grid'))
+        return self.__rendered_view
+
+
+class CityPrebuilder:
+    """
+    This class contains attributes of a background worker building the city behind a portal while the player is
+    approaching it, so that walking through the portal only has to swap the city the player is in.
+    """
+
+    PREBUILD_DISTANCE: int = 3
+    MAX_PREBUILT_CITIES: int = 4
+
+    def __init__(self, name_provider, prebuild_distance=PREBUILD_DISTANCE, max_prebuilt_cities=MAX_PREBUILT_CITIES,
+                 city_representation="GRID"):
+        # type: (NameProvider, int, int, str) -> None
+        self.name_provider: NameProvider = name_provider
+        self.prebuild_distance: int = prebuild_distance
+        self.max_prebuilt_cities: int = max_prebuilt_cities
+        self.city_representation: str = city_representation
+        self.__prebuilt_cities: OrderedDict = OrderedDict()  # initial value
+        self.__executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+
+    def update(self, trainer):
+        # type: (Trainer) -> None
+        """
+        Starting to build the city behind each portal within the prebuild distance of 'trainer'.
+        :return: None
+        """
+
+        if not isinstance(trainer.city, City):
+            return
+
+        average_level: int = get_average_battle_creature_level(trainer)
+        bounds: tuple = (max(0, trainer.location.tile_x - self.prebuild_distance),
+                         max(0, trainer.location.tile_y - self.prebuild_distance),
+                         min(len(trainer.city.get_tiles()[0]), trainer.location.tile_x + self.prebuild_distance + 1),
+                         min(len(trainer.city.get_tiles()), trainer.location.tile_y + self.prebuild_distance + 1))
+        for x, y in trainer.city.get_portal_locations(bounds):
+            if abs(x - trainer.location.tile_x) + abs(y - trainer.location.tile_y) > self.prebuild_distance:
+                continue
+
+            portal: tuple = (id(trainer.city), x, y)
+            prebuilt_city: tuple or None = self.__prebuilt_cities.get(portal)
+            if prebuilt_city is not None and prebuilt_city[1] == average_level:
+                self.__prebuilt_cities.move_to_end(portal)
+                continue
+
+            # The current city is kept in the entry so that its id cannot be reused while the entry exists.
+            self.__prebuilt_cities[portal] = (trainer.city, average_level,
+                                              self.__executor.submit(build_city, self.name_provider, average_level,
+                                                                     self.city_representation))
+            while len(self.__prebuilt_cities) > self.max_prebuilt_cities:
+                self.__prebuilt_cities.popitem(last=False)[1][2].cancel()
+
+    def generate_city(self, trainer):
+        # type: (Trainer) -> City
+        """
+        Moving 'trainer' to the city behind the portal it is standing on, building it now if it was not prebuilt.
+        :return: the new city
+        """
+
+        prebuilt_city: tuple or None = self.__prebuilt_cities.pop((id(trainer.city), trainer.location.tile_x,
+                                                                   trainer.location.tile_y), None)
+        if prebuilt_city is None or prebuilt_city[1] != get_average_battle_creature_level(trainer) or \
+                prebuilt_city[2].cancelled():
+            return generate_city(self.name_provider, trainer, self.city_representation)
+
+        city: City = prebuilt_city[2].result()
+        spawn_trainer(city, trainer)
+        return city
+
+    def close(self):
+        # type: () -> None
+        for prebuilt_city in self.__prebuilt_cities.values():
+            prebuilt_city[2].cancel()
+        self.__prebuilt_cities.clear()
+        self.__executor.shutdown(wait=False)
+
+
+class CityTile:
+    """
+    This class contains attributes of a tile in a city.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.__trainers: list = []  # initial value
+        self.__occupancy: TrainerOccupancyIndex or None = None  # initial value
+        self.__location: tuple = (0, 0)  # initial value
+        self.is_portal: bool = False
+        self.can_encounter_wild_battles: bool = False
+
+    def bind(self, occupancy, x, y):
+        # type: (TrainerOccupancyIndex, int, int) -> None
+        """
+        Letting the occupancy index of the city keep the trainers on this tile, which is at (x, y) in the city.
+        :return: None
+        """
+
+        for trainer in self.__trainers:
+            occupancy.add(x, y, trainer)
+        self.__trainers = []
+        self.__occupancy = occupancy
+        self.__location = (x, y)
+
+    def get_trainers(self):
+        # type: () -> list
+        if self.__occupancy is not None:
+            return self.__occupancy.get_trainers(self.__location[0], self.__location[1])
+        return self.__trainers
+
+    def count_trainers(self):
+        # type: () -> int
+        return len(self.get_trainers())
+
+    def add_trainer(self, trainer):
+        # type: (Trainer) -> None
+        if self.__occupancy is not None:
+            self.__occupancy.add(self.__location[0], self.__location[1], trainer)
+        else:
+            self.__trainers.append(trainer)
+
+    def remove_trainer(self, trainer):
+        # type: (Trainer) -> bool
+        if self.__occupancy is not None:
+            return self.__occupancy.remove(self.__location[0], self.__location[1], trainer)
+        if trainer in self.__trainers:
+            self.__trainers.remove(trainer)
+            return True
+        return False
+
+    def choose_opponent(self, trainer):
+        # type: (Trainer) -> Trainer or None
+        """
+        Choosing a random trainer on this tile other than 'trainer'.
+        :return: the chosen trainer, or None if 'trainer' is alone
+        """
+
+        if self.__occupancy is not None:
+            return self.__occupancy.choose_opponent(self.__location[0], self.__location[1], trainer)
+        return TrainerOccupancyIndex.choose_other_trainer(self.__trainers, trainer)
+
+    def __str__(self):
+        # type: () -> str
+        return "(" + str(type(self).__name__) + ")\nAND\n" + list_to_string([trainer.name for trainer in
+                                                                            self.get_trainers()])
+
+    def clone(self):
+        # type: () -> CityTile
+        if self.__occupancy is None:
+            return copy.deepcopy(self)
+
+        tile: CityTile = type(self)()
+        for trainer in self.get_trainers():
+            tile.add_trainer(copy.deepcopy(trainer))
+        return tile
+
+
+class PortalTile(CityTile):
+    """
+    This class contains attributes of a portal from one city to another.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        CityTile.__init__(self)
+        self.is_portal = True
+
+
+class GrassTile(CityTile):
+    """
+    This class contains attributes of a city tile with grass where the player can encounter wild legendary creatures.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        CityTile.__init__(self)
+        self.can_encounter_wild_battles = True
+
+
+class PavementTile(CityTile):
+    """
+    This class contains attributes of a tile with pavement where the player can walk safely without any distractions
+    from wild legendary creatures.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        CityTile.__init__(self)
+
+
+class CompactCityTile:
+    """
+    This class contains attributes of a view of a tile in a CompactCity or a ChunkedCity. The trainers on the tile
+    are kept by the city itself, so views are created on demand and can be thrown away at any time.
+    """
+
+    def __init__(self, city, x, y):
+        # type: (CompactCity, int, int) -> None
+        self.city: CompactCity = city
+        self.x: int = x
+        self.y: int = y
+
+    def get_trainers(self):
+        # type: () -> list
+        return self.city.get_occupants(self.x, self.y)
+
+    def add_trainer(self, trainer):
+        # type: (Trainer) -> None
+        self.city.add_occupant(self.x, self.y, trainer)
+
+    def remove_trainer(self, trainer):
+        # type: (Trainer) -> bool
+        return self.city.remove_occupant(self.x, self.y, trainer)
+
+    def choose_opponent(self, trainer):
+        # type: (Trainer) -> Trainer or None
+        return self.city.choose_opponent(self.x, self.y, trainer)
+
+    def __eq__(self, other):
+        # type: (object) -> bool
+        return isinstance(other, CompactCityTile) and (self.city, self.x, self.y) == (other.city, other.x, other.y)
+
+    def __hash__(self):
+        # type: () -> int
+        return hash((id(self.city), self.x, self.y))
+
+    def __str__(self):
+        # type: () -> str
+        return "(" + str(self.TILE_TYPE.__name__) + ")\nAND\n" + list_to_string([trainer.name for trainer in
+                                                                                self.get_trainers()])
+
+    def clone(self):
+        # type: () -> CityTile
+        tile: CityTile = self.TILE_TYPE()
+        for trainer in self.get_trainers():
+            tile.add_trainer(copy.deepcopy(trainer))
+        return tile
+
+
+class CompactPortalTile(CompactCityTile, PortalTile):
+    """
+    This class contains attributes of a view of a portal in a CompactCity.
+    """
+
+    TILE_TYPE: type = PortalTile
+    is_portal: bool = True
+    can_encounter_wild_battles: bool = False
+
+
+class CompactGrassTile(CompactCityTile, GrassTile):
+    """
+    This class contains attributes of a view of a tile with grass in a CompactCity.
+    """
+
+    TILE_TYPE: type = GrassTile
+    is_portal: bool = False
+    can_encounter_wild_battles: bool = True
+
+
+class CompactPavementTile(CompactCityTile, PavementTile):
+    """
+    This class contains attributes of a view of a tile with pavement in a CompactCity.
+    """
+
+    TILE_TYPE: type = PavementTile
+    is_portal: bool = False
+    can_encounter_wild_battles: bool = False
+
+
+class CompactCityRow:
+    """
+    This class contains attributes of a row of tiles in a CompactCity, creating views of the tiles on demand.
+    """
+
+    def __init__(self, city, y):
+        # type: (CompactCity, int) -> None
+        self.city: CompactCity = city
+        self.y: int = y
+
+    def __len__(self):
+        # type: () -> int
+        return self.city.width
+
+    def __getitem__(self, x):
+        # type: (int) -> CityTile
+        if x < 0:
+            x += self.city.width
+        if x < 0 or x >= self.city.width:
+            raise IndexError("tile index out of range")
+        return self.city.get_tile_at(x, self.y)
+
+    def __iter__(self):
+        for x in range(self.city.width):
+            yield self.city.get_tile_at(x, self.y)
+
+
+class CompactCityRows:
+    """
+    This class contains attributes of the rows of tiles in a CompactCity, creating rows on demand.
+    """
+
+    def __init__(self, city):
+        # type: (CompactCity) -> None
+        self.city: CompactCity = city
+
+    def __len__(self):
+        # type: () -> int
+        return self.city.height
+
+    def __getitem__(self, y):
+        # type: (int) -> CompactCityRow
+        if y < 0:
+            y += self.city.height
+        if y < 0 or y >= self.city.height:
+            raise IndexError("row index out of range")
+        return CompactCityRow(self.city, y)
+
+    def __iter__(self):
+        for y in range(self.city.height):
+            yield CompactCityRow(self.city, y)
+
+
+class CompactCity(City):
+    """
+    This class contains attributes of a city storing one byte per tile for the type of the tile and only keeping
+    the trainers of occupied tiles, so that very large cities fit in little memory.
+    """
+
+    TILE_VIEW_TYPES: list = [CompactPavementTile, CompactGrassTile, CompactPortalTile]
+    TILE_CODES: dict = {PavementTile: 0, GrassTile: 1, PortalTile: 2}
+
+    def __init__(self, name, width, height, tile_codes=None):
+        # type: (str, int, int, bytearray or None) -> None
+        City.__init__(self, name, [])
+        self.width: int = width
+        self.height: int = height
+        self.tile_codes: bytearray = tile_codes if tile_codes is not None else bytearray(width * height)
+
+    @staticmethod
+    def from_tile_types(name, tile_types):
+        # type: (str, list) -> CompactCity
+        city: CompactCity = CompactCity(name, len(tile_types[0]), len(tile_types))
+        for y in range(len(tile_types)):
+            for x in range(len(tile_types[y])):
+                city.set_tile_type(x, y, tile_types[y][x])
+        return city
+
+    @staticmethod
+    def from_city(city):
+        # type: (City) -> CompactCity
+        compact_city: CompactCity = CompactCity(city.name, len(city.get_tiles()[0]), len(city.get_tiles()))
+        for y in range(compact_city.height):
+            for x in range(compact_city.width):
+                tile: CityTile = city.get_tile_at(x, y)
+                compact_city.set_tile_type(x, y, type(tile))
+                for trainer in tile.get_trainers():
+                    compact_city.add_occupant(x, y, trainer)
+                    if trainer.city is city:
+                        trainer.city = compact_city
+        return compact_city
+
+    @staticmethod
+    def get_tile_code(tile_type):
+        # type: (type) -> int
+        for base_tile_type, tile_code in CompactCity.TILE_CODES.items():
+            if issubclass(tile_type, base_tile_type):
+                return tile_code
+        raise ValueError("unknown tile type: " + str(tile_type.__name__))
+
+    def set_tile_type(self, x, y, tile_type):
+        # type: (int, int, type) -> None
+        self.tile_codes[y * self.width + x] = self.get_tile_code(tile_type)
+
+    def get_tile_at(self, x, y):
+        # type: (int, int) -> CityTile or None
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return None
+        return self.TILE_VIEW_TYPES[self.tile_codes[y * self.width + x]](self, x, y)
+
+    def get_tiles(self):
+        # type: () -> CompactCityRows
+        return CompactCityRows(self)
+
+    def get_portal_locations(self, bounds=None):
+        # type: (tuple or None) -> list
+        if bounds is not None:
+            return self.get_tile_locations(bounds, PortalTile)
+
+        portal_locations: list = []  # initial value
+        index: int = self.tile_codes.find(self.TILE_CODES[PortalTile])
+        while index != -1:
+            portal_locations.append((index % self.width, index // self.width))
+            index = self.tile_codes.find(self.TILE_CODES[PortalTile], index + 1)
+        return portal_locations
+
+    def get_tile_locations(self, bounds, tile_type):
+        # type: (tuple, type) -> list
+        min_x, min_y, max_x, max_y = bounds
+        tile_code: int = self.get_tile_code(tile_type)
+        return [(x, y) for y in range(min_y, max_y) for x in range(min_x, max_x)
+                if self.tile_codes[y * self.width + x] == tile_code]
+
+    def get_occupants(self, x, y):
+        # type: (int, int) -> list
+        return self.occupancy.get_trainers(x, y)
+
+    def add_occupant(self, x, y, trainer):
+        # type: (int, int, Trainer) -> None
+        self.occupancy.add(x, y, trainer)
+
+    def remove_occupant(self, x, y, trainer):
+        # type: (int, int, Trainer) -> bool
+        return self.occupancy.remove(x, y, trainer)
+
+    def choose_opponent(self, x, y, trainer):
+        # type: (int, int, Trainer) -> Trainer or None
+        return self.occupancy.choose_opponent(x, y, trainer)
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(self.name)
+        all_tiles: list = [[str(tile) for tile in row] for row in self.get_tiles()]
+        return res + "\n" + str(tabulate(all_tiles, headers='firstrow', tablefmt='fancy_grid'))
+
+
+class CityChunk:
+    """
+    This class contains attributes of a square chunk of tiles in a ChunkedCity together with the AI trainers placed
+    on it, all derived from the seed of the chunk. 'ai_trainers' lists the AI trainers in the order they were
+    generated, so that changes to them can be recorded by index.
+    """
+
+    def __init__(self, tile_codes, occupants, ai_trainers):
+        # type: (bytearray, dict, list) -> None
+        self.tile_codes: bytearray = tile_codes
+        self.occupants: dict = occupants
+        self.ai_trainers: list = ai_trainers
+
+
+class ChunkedCity(City):
+    """
+    This class contains attributes of a very large city whose tiles and AI trainers are generated chunk by chunk
+    from a seed when they are first needed. Only the most recently used chunks are kept in memory; the others are
+    generated again from their seed when they are needed again, after which the recorded changes to their AI
+    trainers are applied again. Trainers entering the city, like the player, are kept apart from the chunks so that
+    they are never lost.
+    """
+
+    SIZE: int = 100000
+    CHUNK_SIZE: int = 16
+    MAX_LOADED_CHUNKS: int = 64
+    PORTAL_CHANCE: float = 0.25
+    MAX_AI_TRAINERS_PER_CHUNK: int = 2
+    VIEW_RADIUS: int = 4
+    TILE_VIEW_TYPES: list = CompactCity.TILE_VIEW_TYPES
+    TILE_CODES: dict = CompactCity.TILE_CODES
+    NAME_PROVIDER: "LocalNameProvider or None" = None  # initial value
+
+    def __init__(self, name, width, height, seed, average_player_battle_creature_level, chunk_size=CHUNK_SIZE,
+                 max_loaded_chunks=MAX_LOADED_CHUNKS):
+        # type: (str, int, int, int, int, int, int) -> None
+        City.__init__(self, name, [])
+        self.width: int = width
+        self.height: int = height
+        self.seed: int = seed
+        self.average_player_battle_creature_level: int = average_player_battle_creature_level
+        self.chunk_size: int = chunk_size
+        self.max_loaded_chunks: int = max_loaded_chunks
+        self.__chunks: OrderedDict = OrderedDict()  # initial value
+        self.__ai_trainer_changes: dict = {}  # initial value
+
+    def get_chunk(self, chunk_x, chunk_y):
+        # type: (int, int) -> CityChunk
+        chunk: CityChunk or None = self.__chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.generate_chunk(chunk_x, chunk_y)
+            self.apply_ai_trainer_changes(chunk_x, chunk_y, chunk)
+            self.__chunks[(chunk_x, chunk_y)] = chunk
+            while len(self.__chunks) > self.max_loaded_chunks:
+                self.__chunks.popitem(last=False)
+        else:
+            self.__chunks.move_to_end((chunk_x, chunk_y))
+        return chunk
+
+    def get_num_loaded_chunks(self):
+        # type: () -> int
+        return len(self.__chunks)
+
+    def apply_ai_trainer_changes(self, chunk_x, chunk_y, chunk):
+        # type: (int, int, CityChunk) -> None
+        """
+        Replacing the AI trainers of a newly generated chunk which changed since the chunk was first generated with
+        their changed selves, and taking out those which left.
+        :return: None
+        """
+
+        for i, ai_trainer in self.__ai_trainer_changes.get((chunk_x, chunk_y), {}).items():
+            generated_ai_trainer: Trainer = chunk.ai_trainers[i]
+            occupants: list = chunk.occupants[(generated_ai_trainer.location.tile_x % self.chunk_size,
+                                               generated_ai_trainer.location.tile_y % self.chunk_size)]
+            if ai_trainer is None:
+                occupants.remove(generated_ai_trainer)
+            else:
+                occupants[occupants.index(generated_ai_trainer)] = ai_trainer
+            chunk.ai_trainers[i] = ai_trainer
+
+    def record_ai_trainer_change(self, trainer, left):
+        # type: (Trainer, bool) -> None
+        """
+        Remembering that 'trainer', an AI trainer of one of the chunks, changed or, if 'left', left its chunk, so
+        that the change survives the chunk being generated again.
+        :return: None
+        """
+
+        chunk_x: int = trainer.location.tile_x // self.chunk_size
+        chunk_y: int = trainer.location.tile_y // self.chunk_size
+        chunk: CityChunk = self.get_chunk(chunk_x, chunk_y)
+        for i in range(len(chunk.ai_trainers)):
+            if chunk.ai_trainers[i] is trainer:
+                self.__ai_trainer_changes.setdefault((chunk_x, chunk_y), {})[i] = None if left else trainer
+                if left:
+                    chunk.ai_trainers[i] = None
+
+    def record_trainer_update(self, trainer):
+        # type: (Trainer) -> None
+        self.record_ai_trainer_change(trainer, False)
+
+    def get_max_region_radius(self):
+        # type: () -> int
+        """
+        Finding the largest radius, in whole chunks, of a region three radii wide whose chunks all fit in memory at
+        once, so that going through the region never unloads a chunk of it again.
+        :return: the radius in tiles
+        """
+
+        return max(1, math.isqrt(self.max_loaded_chunks) // 3) * self.chunk_size
+
+    def get_chunks_in(self, bounds):
+        # type: (tuple) -> list
+        """
+        Getting the chunks overlapping 'bounds', which is (min_x, min_y, max_x, max_y), generating them if needed.
+        :return: a list of (chunk_x, chunk_y, chunk)
+        """
+
+        min_x, min_y, max_x, max_y = bounds
+        if max_x <= min_x or max_y <= min_y:
+            return []
+        return [(chunk_x, chunk_y, self.get_chunk(chunk_x, chunk_y))
+                for chunk_y in range(min_y // self.chunk_size, (max_y - 1) // self.chunk_size + 1)
+                for chunk_x in range(min_x // self.chunk_size, (max_x - 1) // self.chunk_size + 1)]
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        # type: (int, int) -> CityChunk
+        """
+        Generating the tiles and AI trainers of a chunk from the seed of the city and the position of the chunk.
+        :return: the chunk
+        """
+
+        if ChunkedCity.NAME_PROVIDER is None:
+            ChunkedCity.NAME_PROVIDER = LocalNameProvider()
+
+        rng: random.Random = random.Random(str(self.seed) + ":" + str(chunk_x) + ":" + str(chunk_y))
+        chunk_width: int = min(self.chunk_size, self.width - chunk_x * self.chunk_size)
+        chunk_height: int = min(self.chunk_size, self.height - chunk_y * self.chunk_size)
+        tile_codes: bytearray = bytearray(rng.choice([self.TILE_CODES[PavementTile], self.TILE_CODES[GrassTile]])
+                                          for i in range(self.chunk_size * self.chunk_size))
+
+        # The player enters the city at the top left tile, so it is kept free.
+        free_tiles: list = [(x, y) for y in range(chunk_height) for x in range(chunk_width)
+                            if not (chunk_x == 0 and chunk_y == 0 and x == 0 and y == 0)]
+        if rng.random() < self.PORTAL_CHANCE:
+            x, y = rng.choice(free_tiles)
+            tile_codes[y * self.chunk_size + x] = self.TILE_CODES[PortalTile]
+
+        occupants: dict = {}  # initial value
+        ai_trainers: list = []  # initial value
+        for i in range(rng.randint(0, self.MAX_AI_TRAINERS_PER_CHUNK)):
+            x, y = rng.choice(free_tiles)
+            ai_trainer: AITrainer = generate_ai_trainer(ChunkedCity.NAME_PROVIDER.generate_name(
+                AI_TRAINER_NAME_PROMPT, rng), self.average_player_battle_creature_level, rng)
+            ai_trainer.location = AdventureModeLocation(chunk_x * self.chunk_size + x, chunk_y * self.chunk_size + y)
+            occupants.setdefault((x, y), []).append(ai_trainer)
+            ai_trainers.append(ai_trainer)
+
+        if chunk_x == 0 and chunk_y == 0:
+            tile_codes[0] = self.TILE_CODES[PavementTile]
+        return CityChunk(tile_codes, occupants, ai_trainers)
+
+    def get_tile_at(self, x, y):
+        # type: (int, int) -> CityTile or None
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return None
+        chunk: CityChunk = self.get_chunk(x // self.chunk_size, y // self.chunk_size)
+        return self.TILE_VIEW_TYPES[chunk.tile_codes[(y % self.chunk_size) * self.chunk_size +
+                                                     x % self.chunk_size]](self, x, y)
+
+    def get_tiles(self):
+        # type: () -> CompactCityRows
+        return CompactCityRows(self)
+
+    def get_portal_locations(self, bounds=None):
+        # type: (tuple or None) -> list
+        """
+        Finding the portals within 'bounds', generating the chunks there if needed. Without 'bounds', only the
+        chunks kept in memory, which are the ones around the trainers in the city, are searched.
+        :return: a list of (x, y) locations
+        """
+
+        if bounds is not None:
+            return self.get_tile_locations(bounds, PortalTile)
+
+        portal_locations: list = []  # initial value
+        for (chunk_x, chunk_y), chunk in list(self.__chunks.items()):
+            index: int = chunk.tile_codes.find(self.TILE_CODES[PortalTile])
+            if index != -1:
+                portal_locations.append((chunk_x * self.chunk_size + index % self.chunk_size,
+                                         chunk_y * self.chunk_size + index // self.chunk_size))
+        return portal_locations
+
+    def get_tile_locations(self, bounds, tile_type):
+        # type: (tuple, type) -> list
+        # The tile codes of each chunk are searched directly rather than making a tile for every location.
+        min_x, min_y, max_x, max_y = bounds
+        tile_code: int = CompactCity.get_tile_code(tile_type)
+        tile_locations: list = []  # initial value
+        for chunk_x, chunk_y, chunk in self.get_chunks_in(bounds):
+            index: int = chunk.tile_codes.find(tile_code)
+            while index != -1:
+                x: int = chunk_x * self.chunk_size + index % self.chunk_size
+                y: int = chunk_y * self.chunk_size + index // self.chunk_size
+                if min_x <= x < max_x and min_y <= y < max_y:
+                    tile_locations.append((x, y))
+                index = chunk.tile_codes.find(tile_code, index + 1)
+        return tile_locations
+
+    def get_trainer_locations(self, bounds, trainer=None):
+        # type: (tuple, Trainer or None) -> list
+        # The AI trainers of the chunks are not in the occupancy index, which only has the trainers which entered.
+        min_x, min_y, max_x, max_y = bounds
+        trainer_locations: set = set(City.get_trainer_locations(self, bounds, trainer))
+        for chunk_x, chunk_y, chunk in self.get_chunks_in(bounds):
+            for (x, y), occupants in chunk.occupants.items():
+                x += chunk_x * self.chunk_size
+                y += chunk_y * self.chunk_size
+                if min_x <= x < max_x and min_y <= y < max_y and any(other is not trainer for other in occupants):
+                    trainer_locations.add((x, y))
+        return sorted(trainer_locations)
+
+    def get_occupants(self, x, y):
+        # type: (int, int) -> list
+        chunk: CityChunk = self.get_chunk(x // self.chunk_size, y // self.chunk_size)
+        return chunk.occupants.get((x % self.chunk_size, y % self.chunk_size), []) + \
+            self.occupancy.get_trainers(x, y)
+
+    def add_occupant(self, x, y, trainer):
+        # type: (int, int, Trainer) -> None
+        self.occupancy.add(x, y, trainer)
+
+    def remove_occupant(self, x, y, trainer):
+        # type: (int, int, Trainer) -> bool
+        if self.occupancy.remove(x, y, trainer):
+            return True
+
+        chunk: CityChunk = self.get_chunk(x // self.chunk_size, y // self.chunk_size)
+        occupants: list = chunk.occupants.get((x % self.chunk_size, y % self.chunk_size), [])
+        if trainer in occupants:
+            self.record_ai_trainer_change(trainer, True)
+            occupants.remove(trainer)
+            self.occupancy.touch(x, y)
+            return True
+        return False
+
+    def choose_opponent(self, x, y, trainer):
+        # type: (int, int, Trainer) -> Trainer or None
+        return TrainerOccupancyIndex.choose_other_trainer(self.get_occupants(x, y), trainer)
+
+    def __getstate__(self):
+        # type: () -> dict
+        # Chunks can always be generated again from the seed and the changes to their AI trainers, so they are not
+        # saved.
+        state: dict = self.__dict__.copy()
+        state["_ChunkedCity__chunks"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        # type: (dict) -> None
+        City.__setstate__(self, state)
+        self.__dict__.setdefault("_ChunkedCity__ai_trainer_changes", {})  # saved before changes were recorded
+
+    def __str__(self):
+        # type: () -> str
+        center_x, center_y = next(iter(self.occupancy.get_occupied_locations()), (0, 0))
+        min_x: int = max(0, min(center_x - self.VIEW_RADIUS, self.width - 2 * self.VIEW_RADIUS - 1))
+        min_y: int = max(0, min(center_y - self.VIEW_RADIUS, self.height - 2 * self.VIEW_RADIUS - 1))
+        all_tiles: list = [[str(self.get_tile_at(x, y)) for x in range(min_x, min(self.width, min_x + 2 *
+                                                                                  self.VIEW_RADIUS + 1))]
+                           for y in range(min_y, min(self.height, min_y + 2 * self.VIEW_RADIUS + 1))]
+        return str(self.name) + " (" + str(min_x) + ", " + str(min_y) + ")\n" + \
+            str(tabulate(all_tiles, headers='firstrow', tablefmt='fancy_grid'))
+
+
+###########################################
+# ADVENTURE MODE
+###########################################
+
+
+###########################################
+# INVENTORY
+###########################################
+
+
+class LegendaryCreatureInventory:
+    """
+    This class contains attributes of an inventory containing legendary creatures.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.__legendary_creatures: list = []  # initial value
+
+    def add_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> None
+        self.__legendary_creatures.append(legendary_creature)
+
+    def remove_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.__legendary_creatures:
+            self.__legendary_creatures.remove(legendary_creature)
+            return True
+        return False
+
+    def get_legendary_creatures(self):
+        # type: () -> list
+        return self.__legendary_creatures
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> LegendaryCreatureInventory
+        return copy.deepcopy(self)
+
+
+class ItemInventory:
+    """
+    This class contains attributes of an inventory containing items.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.__items: list = []  # initial value
+
+    def add_item(self, item):
+        # type: (Item) -> None
+        self.__items.append(item)
+
+    def remove_item(self, item):
+        # type: (Item) -> bool
+        if item in self.__items:
+            self.__items.remove(item)
+            return True
+        return False
+
+    def get_items(self):
+        # type: () -> list
+        return self.__items
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> ItemInventory
+        return copy.deepcopy(self)
+
+
+###########################################
+# INVENTORY
+###########################################
+
+
+###########################################
+# LEGENDARY CREATURE
+###########################################
+
+
+class BattleTeam:
+    """
+    This class contains attributes of a team brought to battles.
+    """
+
+    MAX_LEGENDARY_CREATURES: int = 5
+
+    def __init__(self, legendary_creatures=None):
+        # type: (list) -> None
+        if legendary_creatures is None:
+            legendary_creatures = []
+        self.__legendary_creatures: list = legendary_creatures if len(legendary_creatures) <= \
+                                                                  self.MAX_LEGENDARY_CREATURES else []
+
+    def add_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if len(self.__legendary_creatures) < self.MAX_LEGENDARY_CREATURES:
+            self.__legendary_creatures.append(legendary_creature)
+            return True
+        return False
+
+    def remove_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.__legendary_creatures:
+            self.__legendary_creatures.remove(legendary_creature)
+            return True
+        return False
+
+    def get_legendary_creatures(self):
+        # type: () -> list
+        return self.__legendary_creatures
+
+    def recover_all(self):
+        # type: () -> None
+        for legendary_creature in self.__legendary_creatures:
+            legendary_creature.restore()
+
+    def all_died(self):
+        # type: () -> bool
+        for legendary_creature in self.__legendary_creatures:
+            if legendary_creature.get_is_alive():
+                return False
+        return True
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> BattleTeam
+        return copy.deepcopy(self)
+
+
+class LegendaryCreature:
+    """
+    This class contains attributes of a legendary creature in this game.
+    """
+
+    MIN_CRIT_RATE: mpf = mpf("0.15")
+    MAX_CRIT_RATE: mpf = mpf("1")
+    MIN_CRIT_DAMAGE: mpf = mpf("1.5")
+    MIN_ATTACK_GAUGE: mpf = mpf("0")
+    FULL_ATTACK_GAUGE: mpf = mpf("1")
+    POTENTIAL_ELEMENTS: list = ["TERRA", "FLAME", "SEA", "NATURE", "ELECTRIC", "ICE", "METAL", "DARK", "LIGHT", "WAR",
+                                "PURE", "LEGEND", "PRIMAL", "WIND", "BEAUTY", "MAGIC", "CHAOS", "HAPPY", "DREAM",
+                                "SOUL"]
+
+    def __init__(self, name, element, max_hp, max_magic_points, attack_power, defense, attack_speed, skills,
+                 awaken_bonus):
+        # type: (str, mpf, str, mpf, mpf, mpf, mpf, list, AwakenBonus) -> None
+        self.name: str = name
+        self.element: str = element if element in self.POTENTIAL_ELEMENTS else self.POTENTIAL_ELEMENTS[0]
+        self.level: int = 1
+        self.exp: mpf = mpf("0")
+        self.required_exp: mpf = mpf("1e6")
+        self.curr_hp: mpf = max_hp
+        self.max_hp: mpf = max_hp
+        self.curr_magic_points: mpf = max_magic_points
+        self.max_magic_points: mpf = max_magic_points
+        self.attack_power: mpf = attack_power
+        self.defense: mpf = defense
+        self.attack_speed: mpf = attack_speed
+        self.__skills: list = skills
+        self.awaken_bonus: AwakenBonus = awaken_bonus
+        self.crit_rate: mpf = self.MIN_CRIT_RATE
+        self.crit_damage: mpf = self.MIN_CRIT_DAMAGE
+        self.__runes: dict = {}  # initial value
         self.attack_gauge: mpf = self.MIN_ATTACK_GAUGE
         self.has_awakened: bool = False
         self.corresponding_team: BattleTeam or None = None  # initial value
 
-    def awaken(self):
+    def awaken(self):
+        # type: () -> bool
+        if not self.has_awakened:
+            self.name = "AWAKENED " + str(self.name)
+            self.max_hp *= 1 + self.awaken_bonus.max_hp_percentage_up / 100
+            self.max_magic_points *= 1 + self.awaken_bonus.max_magic_points_percentage_up / 100
+            self.attack_power *= 1 + self.awaken_bonus.attack_power_percentage_up / 100
+            self.defense *= 1 + self.awaken_bonus.defense_percentage_up / 100
+            self.attack_speed += self.awaken_bonus.attack_speed_up
+            self.crit_rate += self.awaken_bonus.crit_rate_up
+            if self.crit_rate > self.MAX_CRIT_RATE:
+                self.crit_rate = self.MAX_CRIT_RATE
+
+            self.crit_damage += self.awaken_bonus.crit_damage_up
+            self.restore()
+            self.has_awakened = True
+            return True
+        return False
+
+    def restore(self):
+        # type: () -> None
+        self.curr_magic_points = self.max_magic_points
+        self.curr_hp = self.max_hp
+
+    def get_skills(self):
+        # type: () -> list
+        return self.__skills
+
+    def get_runes(self):
+        # type: () -> dict
+        return self.__runes
+
+    def get_is_alive(self):
+        # type: () -> bool
+        return self.curr_hp > 0
+
+    def recover_magic_points(self):
+        # type: () -> None
+        self.curr_magic_points += self.max_magic_points / 12
+        if self.curr_magic_points >= self.max_magic_points:
+            self.curr_magic_points = self.max_magic_points
+
+    def place_rune(self, rune):
+        # type: (Rune) -> bool
+        if rune.already_placed:
+            return False
+
+        if rune.slot_number in self.__runes.keys():
+            self.remove_rune(rune.slot_number)
+
+        self.__runes[rune.slot_number] = rune
+        self.max_hp *= 1 + (rune.max_hp_percentage_up / 100)
+        self.max_magic_points *= 1 + (rune.max_magic_points_percentage_up / 100)
+        self.attack_power *= 1 + (rune.attack_power_percentage_up / 100)
+        self.defense *= 1 + (rune.stat_increase.defense_percentage_up / 100)
+        self.attack_speed += rune.attack_speed_up
+        self.crit_rate += rune.crit_rate_up
+        if self.crit_rate > self.MAX_CRIT_RATE:
+            self.crit_rate = self.MAX_CRIT_RATE
+
+        self.crit_damage += rune.crit_damage_up
+        self.restore()
+        rune.already_placed = True
+        return True
+
+    def level_up(self):
+        # type: () -> None
+        while self.exp >= self.required_exp:
+            self.level += 1
+            self.required_exp *= mpf("10") ** self.level
+            temp_runes: dict = self.__runes
+            for slot_number in self.__runes.keys():
+                self.remove_rune(slot_number)
+
+            self.attack_power *= triangular(self.level)
+            self.max_hp *= triangular(self.level)
+            self.player_gold_per_second *= triangular(self.level)
+            self.max_magic_points *= triangular(self.level)
+            self.defense *= triangular(self.level)
+            self.attack_speed += 2
+            for rune in temp_runes.values():
+                self.place_rune(rune)
+
+            self.restore()
+
+    def level_up_rune(self, slot_number):
+        # type: (int) -> bool
+        if slot_number not in self.__runes.keys():
+            return False
+
+        current_rune: Rune = self.__runes[slot_number]
+        self.remove_rune(slot_number)
+        success: bool = current_rune.level_up()
+        self.place_rune(current_rune)
+        return success
+
+    def remove_rune(self, slot_number):
+        # type: (int) -> bool
+        if slot_number in self.__runes.keys():
+            # Remove the rune at slot number 'slot_number'
+            current_rune: Rune = self.__runes[slot_number]
+            self.max_hp /= 1 + (current_rune.max_hp_percentage_up / 100)
+            self.max_magic_points /= 1 + (current_rune.max_magic_points_percentage_up / 100)
+            self.attack_power /= 1 + (current_rune.attack_power_percentage_up / 100)
+            self.defense /= 1 + (current_rune.defense_percentage_up / 100)
+            self.attack_speed -= current_rune.attack_speed_up
+            self.crit_rate -= current_rune.crit_rate_up
+            if self.crit_rate <= self.MIN_CRIT_RATE:
+                self.crit_rate = self.MIN_CRIT_RATE
+
+            self.crit_damage -= current_rune.crit_damage_up
+            if self.crit_damage <= self.MIN_CRIT_DAMAGE:
+                self.crit_damage = self.MIN_CRIT_DAMAGE
+
+            self.restore()
+            self.__runes.pop(current_rune.slot_number)
+            current_rune.already_placed = False
+            return True
+        return False
+
+    def have_turn(self, other, skill, action_name, rng=random, verbose=True):
+        # type: (LegendaryCreature, Skill or None, str, random.Random, bool) -> bool
+        self.attack_gauge = NumericBackend.of(self.attack_speed).min_attack_gauge
+        if action_name == "NORMAL ATTACK":
+            self.normal_attack(other, rng, verbose)
+        elif action_name == "NORMAL HEAL":
+            self.normal_heal(other, verbose)
+        elif action_name == "USE SKILL" and isinstance(skill, Skill):
+            return self.use_skill(other, skill, rng, verbose)
+        else:
+            return False
+
+        return True
+
+    def normal_attack(self, other, rng=random, verbose=True):
+        # type: (LegendaryCreature, random.Random, bool) -> None
+        action: Action = Action("NORMAL ATTACK", verbose)
+        action.execute(self, other, None, rng)
+
+    def normal_heal(self, other, verbose=True):
+        # type: (LegendaryCreature, bool) -> None
+        action: Action = Action("NORMAL HEAL", verbose)
+        action.execute(self, other)
+
+    def use_skill(self, other, active_skill, rng=random, verbose=True):
+        # type: (LegendaryCreature, Skill, random.Random, bool) -> bool
+        if active_skill not in self.__skills:
+            return False
+
+        if self.curr_magic_points < active_skill.magic_points_cost:
+            if verbose:
+                print("Not enough magic points!")
+            return False
+
+        action: Action = Action("USE SKILL", verbose)
+        action.execute(self, other, active_skill, rng)
+        self.curr_magic_points -= active_skill.magic_points_cost
+        return True
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> LegendaryCreature
+        return copy.deepcopy(self)
+
+
+class Skill:
+    """
+    This class contains attributes of a skill legendary creatures have.
+    """
+
+    POSSIBLE_SKILL_TYPES: list = ["ATTACK", "HEAL"]
+
+    def __init__(self, name, description, skill_type, damage_multiplier, heal_amount, magic_points_cost):
+        # type: (str, str, str, mpf, mpf, mpf) -> None
+        self.name: str = name
+        self.level: int = 1
+        self.description: str = description
+        self.skill_type: str = skill_type if skill_type in self.POSSIBLE_SKILL_TYPES else self.POSSIBLE_SKILL_TYPES[0]
+        self.damage_multiplier: mpf = damage_multiplier if self.skill_type == "ATTACK" else mpf("0")
+        self.heal_amount: mpf = heal_amount if self.skill_type == "HEAL" else mpf("0")
+        self.magic_points_cost: mpf = magic_points_cost
+
+    def level_up(self):
+        # type: () -> None
+        self.damage_multiplier *= mpf("1.25") * self.level
+        self.heal_amount *= mpf("1.25") * self.level
+        self.level += 1
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> Skill
+        return copy.deepcopy(self)
+
+
+###########################################
+# LEGENDARY CREATURE
+###########################################
+
+
+###########################################
+# ITEM
+###########################################
+
+
+class Item:
+    """
+    This class contains attributes of an item in this game.
+    """
+
+    def __init__(self, name, description, gold_cost):
+        # type: (str, str, mpf) -> None
+        self.name: str = name
+        self.description: str = description
+        self.gold_cost: mpf = gold_cost
+        self.sell_gold_gain: mpf = gold_cost / 5
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> Item
+        return copy.deepcopy(self)
+
+
+class Ball(Item):
+    """
+    This class contains attributes of a ball used to catch a legendary creature.
+    """
+
+    MIN_CATCH_SUCCESS_RATE: mpf = mpf("0.15")
+    MAX_CATCH_SUCCESS_RATE: mpf = mpf("1")
+
+    def __init__(self, name, description, gold_cost, catch_success_rate):
+        # type: (str, str, mpf, mpf) -> None
+        Item.__init__(self, name, description, gold_cost)
+        self.catch_success_rate: mpf = catch_success_rate if (self.MIN_CATCH_SUCCESS_RATE <= catch_success_rate <=
+                                                        self.MAX_CATCH_SUCCESS_RATE) else self.MIN_CATCH_SUCCESS_RATE
+
+
+class Rune(Item):
+    """
+    This class contains attributes of a rune used to strengthen legendary creatures.
+    """
+
+    MIN_SLOT_NUMBER: int = 1
+    MAX_SLOT_NUMBER: int = 6
+    MIN_RATING: int = 1
+    MAX_RATING: int = 6
+    MAX_CRIT_RATE_UP: mpf = mpf("0.85")
+
+    def __init__(self, name, description, gold_cost, rating, slot_number, max_magic_points_percentage_up,
+                 max_hp_percentage_up, attack_power_percentage_up, defense_percentage_up, attack_speed_up,
+                 crit_rate_up, crit_damage_up):
+        # type: (str, str, mpf, int, int, mpf, mpf, mpf, mpf, mpf, mpf, mpf) -> None
+        Item.__init__(self, name, description, gold_cost)
+        self.rating: int = rating if self.MIN_RATING <= rating <= self.MAX_RATING else self.MIN_RATING
+        self.slot_number: int = slot_number if self.MIN_SLOT_NUMBER <= slot_number <= self.MAX_SLOT_NUMBER \
+            else self.MIN_SLOT_NUMBER
+        self.max_magic_points_percentage_up: mpf = max_magic_points_percentage_up
+        self.max_hp_percentage_up: mpf = max_hp_percentage_up
+        self.attack_power_percentage_up: mpf = attack_power_percentage_up
+        self.defense_percentage_up: mpf = defense_percentage_up
+        self.attack_speed_up: mpf = attack_speed_up
+        self.crit_rate_up: mpf = crit_rate_up if mpf("0") <= crit_rate_up <= self.MAX_CRIT_RATE_UP else mpf("0")
+        self.crit_damage_up: mpf = crit_damage_up
+        self.level: int = 1
+        self.level_up_gold_cost: mpf = gold_cost
+        self.level_up_success_rate: mpf = mpf("1")
+        self.already_placed: bool = False  # initial value
+
+    def level_up(self):
+        # type: () -> bool
+        # Check whether levelling up is successful or not
+        if random.random() > self.level_up_success_rate:
+            return False
+
+        # Increase the level of the rune
+        self.level += 1
+
+        # Update the cost and success rate of levelling up the rune
+        self.level_up_gold_cost *= mpf("10") ** (self.level + self.rating)
+        self.level_up_success_rate *= mpf("0.95")
+
+        # Increase stats
+        self.stat_increase.max_hp_percentage_up += self.rating
+        self.stat_increase.max_magic_points_percentage_up += self.rating
+        self.stat_increase.attack_percentage_up += self.rating
+        self.stat_increase.defense_percentage_up += self.rating
+        self.stat_increase.attack_speed_up += 2 * self.rating
+        self.stat_increase.crit_rate_up += 0.01 * self.rating
+        self.stat_increase.crit_damage_up += 0.05 * self.rating
+        self.stat_increase.resistance_up += 0.01 * self.rating
+        self.stat_increase.accuracy_up += 0.01 * self.rating
+        return True
+
+
+class AwakenShard(Item):
+    """
+    This class contains attributes of an awaken shard to immediately awaken a legendary creature.
+    """
+
+    def __init__(self, name, description, gold_cost, legendary_creature_element):
+        # type: (str, str, mpf, str) -> None
+        Item.__init__(self, name, description, gold_cost)
+        self.legendary_creature_element: str = legendary_creature_element
+
+
+class EXPShard(Item):
+    """
+    This class contains attributes of an EXP shard to increase the EXP of a legendary creature.
+    """
+
+    def __init__(self, name, description, gold_cost, exp_granted):
+        # type: (str, str, mpf, mpf) -> None
+        Item.__init__(self, name, description, gold_cost)
+        self.exp_granted: mpf = exp_granted
+
+
+class LevelUpShard(Item):
+    """
+    This class contains attributes of a shard used to immediately level up a legendary creature.
+    """
+
+    def __init__(self, name, description, gold_cost):
+        # type: (str, str, mpf) -> None
+        Item.__init__(self, name, description, gold_cost)
+
+
+class SkillLevelUpShard(Item):
+    """
+    This class contains attributes of a skill level up shard to immediately increase the level of a
+    skill possessed by a legendary creature.
+    """
+
+    def __init__(self, name, description, gold_cost):
+        # type: (str, str, mpf) -> None
+        Item.__init__(self, name, description, gold_cost)
+
+
+###########################################
+# ITEM
+###########################################
+
+
+###########################################
+# GENERAL
+###########################################
+
+
+class Trainer:
+    """
+    This class contains attributes of a trainer in this game.
+    """
+
+    def __init__(self, name):
+        # type: (str) -> None
+        self.player_id: str = str(uuid.uuid1())  # generating random player ID
+        self.name: str = name
+        self.level: int = 1
+        self.exp: mpf = mpf("0")
+        self.required_exp: mpf = mpf("1e6")
+        self.gold: mpf = mpf("5e6")
+        self.battle_team: BattleTeam = BattleTeam()
+        self.item_inventory: ItemInventory = ItemInventory()
+        self.legendary_creature_inventory: LegendaryCreatureInventory = LegendaryCreatureInventory()
+        self.city: City or None = None  # initial value
+        self.location: AdventureModeLocation = AdventureModeLocation(0, 0)
+
+    def move_up(self):
         # type: () -> bool
-        if not self.has_awakened:
-            self.name = "AWAKENED " + str(self.name)
-            self.max_hp *= 1 + self.awaken_bonus.max_hp_percentage_up / 100
-            self.max_magic_points *= 1 + self.awaken_bonus.max_magic_points_percentage_up / 100
-            self.attack_power *= 1 + self.awaken_bonus.attack_power_percentage_up / 100
-            self.defense *= 1 + self.awaken_bonus.defense_percentage_up / 100
-            self.attack_speed += self.awaken_bonus.attack_speed_up
-            self.crit_rate += self.awaken_bonus.crit_rate_up
-            if self.crit_rate > self.MAX_CRIT_RATE:
-                self.crit_rate = self.MAX_CRIT_RATE
+        if isinstance(self.city, City):
+            if self.location.tile_y > 0:
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
+                self.location.tile_y -= 1
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
+                return True
+            return False
+        return False
 
-            self.crit_damage += self.awaken_bonus.crit_damage_up
-            self.restore()
-            self.has_awakened = True
+    def move_down(self):
+        # type: () -> bool
+        if isinstance(self.city, City):
+            if self.location.tile_y < len(self.city.get_tiles()) - 1:
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
+                self.location.tile_y += 1
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
+                return True
+            return False
+        return False
+
+    def move_left(self):
+        # type: () -> bool
+        if isinstance(self.city, City):
+            if self.location.tile_x > 0:
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
+                self.location.tile_x -= 1
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
+                return True
+            return False
+        return False
+
+    def move_right(self):
+        # type: () -> bool
+        if isinstance(self.city, City):
+            if self.location.tile_x < len(self.city.get_tiles()[0]) - 1:
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
+                self.location.tile_x += 1
+                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
+                return True
+            return False
+        return False
+
+    def claim_reward(self, reward):
+        # type: (Reward) -> None
+        self.exp += reward.player_reward_exp
+        self.level_up()
+        self.gold += reward.player_reward_gold
+        for legendary_creature in self.battle_team.get_legendary_creatures():
+            legendary_creature.exp += reward.legendary_creature_reward_exp
+            legendary_creature.level_up()
+
+        self.battle_team.recover_all()
+
+    def get_city_tile(self):
+        # type: () -> CityTile or None
+        if isinstance(self.city, City):
+            return self.city.get_tile_at(self.location.tile_x, self.location.tile_y)
+        return None
+
+    def place_rune_on_legendary_creature(self, legendary_creature, rune):
+        # type: (LegendaryCreature, Rune) -> bool
+        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures() and rune in \
+                self.item_inventory.get_items():
+            legendary_creature.place_rune(rune)
             return True
         return False
 
-    def restore(self):
+    def remove_rune_from_legendary_creature(self, legendary_creature, slot_number):
+        # type: (LegendaryCreature, int) -> bool
+        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+            if slot_number in legendary_creature.get_runes().keys():
+                legendary_creature.remove_rune(slot_number)
+                return True
+            return False
+        return False
+
+    def level_up(self):
         # type: () -> None
-        self.curr_magic_points = self.max_magic_points
-        self.curr_hp = self.max_hp
+        while self.exp >= self.required_exp:
+            self.level += 1
+            self.required_exp *= mpf("10") ** self.level
 
-    def get_skills(self):
-        # type: () -> list
-        return self.__skills
+    def purchase_item(self, item):
+        # type: (Item) -> bool
+        if self.gold >= item.gold_cost:
+            self.gold -= item.gold_cost
+            self.add_item_to_inventory(item)
+            return True
+        else:
+            print("Not enough gold!")
+            return False
 
-    def get_runes(self):
-        # type: () -> dict
-        return self.__runes
+    def sell_item(self, item):
+        # type: (Item) -> bool
+        if item in self.item_inventory.get_items():
+            if isinstance(item, Rune):
+                if item.already_placed:
+                    return False
 
-    def get_is_alive(self):
-        # type: () -> bool
-        return self.curr_hp > 0
+            self.remove_item_from_inventory(item)
+            self.gold += item.sell_gold_gain
+            return True
+        return False
 
-    def recover_magic_points(self):
-        # type: () -> None
-        self.curr_magic_points += self.max_magic_points / 12
-        if self.curr_magic_points >= self.max_magic_points:
-            self.curr_magic_points = self.max_magic_points
+    def level_up_rune(self, rune):
+        # type: (Rune) -> bool
+        creature_has_rune: bool = False
+        for legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+            if rune in legendary_creature.get_runes().values():
+                creature_has_rune = True
+                if self.gold >= rune.level_up_gold_cost:
+                    self.gold -= rune.level_up_gold_cost
+                    return legendary_creature.level_up_rune(rune.slot_number)
+                else:
+                    return False
+        if not creature_has_rune:
+            if rune in self.item_inventory.get_items():
+                if self.gold >= rune.level_up_gold_cost:
+                    self.gold -= rune.level_up_gold_cost
+                    return rune.level_up()
+                return False
+            return False
+        return False
+
+    def add_item_to_inventory(self, item):
+        # type: (Item) -> None
+        self.item_inventory.add_item(item)
+
+    def remove_item_from_inventory(self, item):
+        # type: (Item) -> bool
+        if isinstance(item, Rune):
+            for legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+                if item in legendary_creature.get_runes().values():
+                    return False
+
+        return self.item_inventory.remove_item(item)
+
+    def add_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> None
+        self.legendary_creature_inventory.add_legendary_creature(legendary_creature)
+
+    def remove_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.battle_team.get_legendary_creatures():
+            return False
+        return self.legendary_creature_inventory.remove_legendary_creature(legendary_creature)
+
+    def add_legendary_creature_to_team(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+            if self.battle_team.add_legendary_creature(legendary_creature):
+                legendary_creature.corresponding_team = self.battle_team
+                return True
+            return False
+        return False
+
+    def remove_legendary_creature_from_team(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+            legendary_creature.corresponding_team = None
+            return self.battle_team.remove_legendary_creature(legendary_creature)
+        return False
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            if item[0] == "city" and isinstance(item[1], City):
+                # Only the name of the city, as the whole city would show the names of every trainer in it.
+                res += str(item[0]) + "=" + str(item[1].name)
+            else:
+                res += str(item[0]) + "=" + str(item[1])
 
-    def place_rune(self, rune):
-        # type: (Rune) -> bool
-        if rune.already_placed:
-            return False
+            if index < len(vars(self).items()) - 1:
+                res += ", "
 
-        if rune.slot_number in self.__runes.keys():
-            self.remove_rune(rune.slot_number)
+            index += 1
 
-        self.__runes[rune.slot_number] = rune
-        self.max_hp *= 1 + (rune.max_hp_percentage_up / 100)
-        self.max_magic_points *= 1 + (rune.max_magic_points_percentage_up / 100)
-        self.attack_power *= 1 + (rune.attack_power_percentage_up / 100)
-        self.defense *= 1 + (rune.stat_increase.defense_percentage_up / 100)
-        self.attack_speed += rune.attack_speed_up
-        self.crit_rate += rune.crit_rate_up
-        if self.crit_rate > self.MAX_CRIT_RATE:
-            self.crit_rate = self.MAX_CRIT_RATE
+        return res + ")"
 
-        self.crit_damage += rune.crit_damage_up
-        self.restore()
-        rune.already_placed = True
-        return True
+    def clone(self):
+        # type: () -> Trainer
+        return copy.deepcopy(self)
 
-    def level_up(self):
-        # type: () -> None
-        while self.exp >= self.required_exp:
-            self.level += 1
-            self.required_exp *= mpf("10") ** self.level
-            temp_runes: dict = self.__runes
-            for slot_number in self.__runes.keys():
-                self.remove_rune(slot_number)
 
-            self.attack_power *= triangular(self.level)
-            self.max_hp *= triangular(self.level)
-            self.player_gold_per_second *= triangular(self.level)
-            self.max_magic_points *= triangular(self.level)
-            self.defense *= triangular(self.level)
-            self.attack_speed += 2
-            for rune in temp_runes.values():
-                self.place_rune(rune)
+class AITrainer(Trainer):
+    """
+    This class contains attributes of an AI-controlled trainer in this game.
+    """
 
-            self.restore()
+    def __init__(self, name):
+        # type: (str) -> None
+        Trainer.__init__(self, name)
 
-    def level_up_rune(self, slot_number):
-        # type: (int) -> bool
-        if slot_number not in self.__runes.keys():
-            return False
 
-        current_rune: Rune = self.__runes[slot_number]
-        self.remove_rune(slot_number)
-        success: bool = current_rune.level_up()
-        self.place_rune(current_rune)
-        return success
+class ItemShop:
+    """
+    This class contains attributes of an item shop selling items.
+    """
 
-    def remove_rune(self, slot_number):
-        # type: (int) -> bool
-        if slot_number in self.__runes.keys():
-            # Remove the rune at slot number 'slot_number'
-            current_rune: Rune = self.__runes[slot_number]
-            self.max_hp /= 1 + (current_rune.max_hp_percentage_up / 100)
-            self.max_magic_points /= 1 + (current_rune.max_magic_points_percentage_up / 100)
-            self.attack_power /= 1 + (current_rune.attack_power_percentage_up / 100)
-            self.defense /= 1 + (current_rune.defense_percentage_up / 100)
-            self.attack_speed -= current_rune.attack_speed_up
-            self.crit_rate -= current_rune.crit_rate_up
-            if self.crit_rate <= self.MIN_CRIT_RATE:
-                self.crit_rate = self.MIN_CRIT_RATE
+    def __init__(self, items_sold):
+        # type: (list) -> None
+        self.name: str = "ITEM SHOP"
+        self.__items_sold: list = items_sold
 
-            self.crit_damage -= current_rune.crit_damage_up
-            if self.crit_damage <= self.MIN_CRIT_DAMAGE:
-                self.crit_damage = self.MIN_CRIT_DAMAGE
+    def get_items_sold(self):
+        # type: () -> list
+        return self.__items_sold
 
-            self.restore()
-            self.__runes.pop(current_rune.slot_number)
-            current_rune.already_placed = False
-            return True
-        return False
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
 
-    def have_turn(self, other, skill, action_name):
-        # type: (LegendaryCreature, Skill or None, str) -> bool
-        self.attack_gauge = self.MIN_ATTACK_GAUGE
-        if action_name == "NORMAL ATTACK":
-            self.normal_attack(other)
-        elif action_name == "NORMAL HEAL":
-            self.normal_heal(other)
-        elif action_name == "USE SKILL" and isinstance(skill, Skill):
-            self.use_skill(other, skill)
-        else:
-            return False
+            if index < len(vars(self).items()) - 1:
+                res += ", "
 
-        return True
+            index += 1
 
-    def normal_attack(self, other):
-        # type: (LegendaryCreature) -> None
-        action: Action = Action("NORMAL ATTACK")
-        action.execute(self, other)
+        return res + ")"
 
-    def normal_heal(self, other):
-        # type: (LegendaryCreature) -> None
-        action: Action = Action("NORMAL HEAL")
-        action.execute(self, other)
+    def clone(self):
+        # type: () -> ItemShop
+        return copy.deepcopy(self)
 
-    def use_skill(self, other, active_skill):
-        # type: (LegendaryCreature, Skill) -> bool
-        if active_skill not in self.__skills:
-            return False
 
-        if self.curr_magic_points < active_skill.magic_points_cost:
-            print("Not enough magic points!")
-            return False
+class Reward:
+    """
+    This class contains attributes of the reward gained for doing something in this game.
+    """
 
-        action: Action = Action("USE SKILL")
-        action.execute(self, other, active_skill)
-        self.curr_magic_points -= active_skill.magic_points_cost
-        return True
+    def __init__(self, player_reward_exp=mpf("0"), player_reward_gold=mpf("0"),
+                 legendary_creature_reward_exp=mpf("0")):
+        # type: (mpf, mpf, mpf, mpf) -> None
+        self.player_reward_exp: mpf = player_reward_exp
+        self.player_reward_gold: mpf = player_reward_gold
+        self.legendary_creature_reward_exp: mpf = legendary_creature_reward_exp
 
     def __str__(self):
         # type: () -> str
@@ -932,32 +4233,19 @@ class LegendaryCreature:
         return res + ")"
 
     def clone(self):
-        # type: () -> LegendaryCreature
+        # type: () -> Reward
         return copy.deepcopy(self)
 
 
-class Skill:
+class AdventureModeLocation:
     """
-    This class contains attributes of a skill legendary creatures have.
+    This class contains attributes of the location of a trainer in adventure mode of this game.
     """
 
-    POSSIBLE_SKILL_TYPES: list = ["ATTACK", "HEAL"]
-
-    def __init__(self, name, description, skill_type, damage_multiplier, heal_amount, magic_points_cost):
-        # type: (str, str, str, mpf, mpf, mpf) -> None
-        self.name: str = name
-        self.level: int = 1
-        self.description: str = description
-        self.skill_type: str = skill_type if skill_type in self.POSSIBLE_SKILL_TYPES else self.POSSIBLE_SKILL_TYPES[0]
-        self.damage_multiplier: mpf = damage_multiplier if self.skill_type == "ATTACK" else mpf("0")
-        self.heal_amount: mpf = heal_amount if self.skill_type == "HEAL" else mpf("0")
-        self.magic_points_cost: mpf = magic_points_cost
-
-    def level_up(self):
-        # type: () -> None
-        self.damage_multiplier *= mpf("1.25") * self.level
-        self.heal_amount *= mpf("1.25") * self.level
-        self.level += 1
+    def __init__(self, tile_x, tile_y):
+        # type: (int, int) -> None
+        self.tile_x: int = tile_x
+        self.tile_y: int = tile_y
 
     def __str__(self):
         # type: () -> str
@@ -973,515 +4261,1434 @@ class Skill:
 
         return res + ")"
 
-    def clone(self):
-        # type: () -> Skill
-        return copy.deepcopy(self)
+    def clone(self):
+        # type: () -> AdventureModeLocation
+        return copy.deepcopy(self)
+
+
+class SavedGameData:
+    """
+    This class contains attributes of a saved game data.
+    """
+
+    def __init__(self, trainer_name, temperature, top_p, top_k, max_output_tokens, trainer_data):
+        # type: (str, float, float, float, int, Trainer) -> None
+        self.trainer_name: str = trainer_name
+        self.temperature: float = temperature
+        self.top_p: float = top_p
+        self.top_k: float = top_k
+        self.max_output_tokens: int = max_output_tokens
+        self.trainer_data: Trainer = trainer_data
+        self.world_graph: WorldGraph = WorldGraph()
+
+    def __str__(self):
+        # type: () -> str
+        res: str = ""  # initial value
+        res += str(self.trainer_name).upper() + "\n"
+        res += "Temperature: " + str(self.temperature) + "\n"
+        res += "Top P: " + str(self.top_p) + "\n"
+        res += "Top K: " + str(self.top_k) + "\n"
+        res += "Max output tokens: " + str(self.max_output_tokens) + "\n"
+        return res
+
+    def clone(self):
+        # type: () -> SavedGameData
+        return copy.deepcopy(self)
+
+
+class Terminal:
+    """
+    This class contains attributes of the output of this game. Everything printed is kept in memory and written to
+    the terminal at once when the output is flushed, which input() does before each question. On a terminal,
+    clearing the screen is done with ANSI escape sequences; otherwise, output is only ever appended.
+    """
+
+    CLEAR_SCREEN: str = "\033[H\033[2J\033[3J"  # cursor home, erase screen, erase scrollback
+
+    def __init__(self, stream):
+        # type: (object) -> None
+        self.stream: object = stream
+        self.encoding: str = getattr(stream, "encoding", None) or "utf-8"
+        self.is_tty: bool = stream.isatty()
+        self.num_writes: int = 0
+        self.__buffer: list = []  # initial value
+        if self.is_tty and sys.platform.startswith('win'):
+            os.system('')  # lets the Windows console understand ANSI escape sequences
+
+    def write(self, text):
+        # type: (str) -> int
+        self.__buffer.append(text)
+        return len(text)
+
+    def clear(self):
+        # type: () -> None
+        if self.is_tty:
+            # Whatever has not been shown yet would be erased straight away anyway.
+            self.__buffer = [self.CLEAR_SCREEN]
+
+    def flush(self):
+        # type: () -> None
+        if len(self.__buffer) == 0:
+            return
+
+        data: bytes = "".join(self.__buffer).encode(self.encoding, errors="replace")
+        self.__buffer = []
+        self.stream.flush()
+        try:
+            file_descriptor: int = self.stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            self.stream.write(data.decode(self.encoding))
+            self.stream.flush()
+            self.num_writes += 1
+            return
+
+        view: memoryview = memoryview(data)
+        while len(view) > 0:
+            view = view[os.write(file_descriptor, view):]
+            self.num_writes += 1
+
+    def fileno(self):
+        # type: () -> int
+        return self.stream.fileno()
+
+    def isatty(self):
+        # type: () -> bool
+        return self.is_tty
+
+
+###########################################
+# GENERAL
+###########################################
+
+
+###########################################
+# GEMINI
+###########################################
+
+
+class LLMStats:
+    """
+    This class contains attributes of statistics of the names asked from Google Gemini AI and of the names taken from
+    the name cache, the prefetched names or the fallback name provider, recorded per name category. The latencies of
+    calls to Google Gemini AI and of cache hits are kept apart, so that the quick cache hits never hide how slow
+    Google Gemini AI is.
+    """
+
+    CHARACTERS_PER_TOKEN: int = 4
+    PERCENTILES: list = [50, 95, 99]
+
+    def __init__(self):
+        # type: () -> None
+        self.__categories: dict = {}  # initial value
+        self.__lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def get_category(prompt):
+        # type: (str) -> str
+        bulk_request: tuple or None = parse_bulk_name_prompt(prompt)
+        if bulk_request is not None:
+            prompt = bulk_request[0]
+
+        for category, category_prompt in NAME_CATEGORIES.items():
+            if category_prompt.strip() == prompt.strip():
+                return category
+        return "OTHER"
+
+    @staticmethod
+    def count_tokens(text):
+        # type: (str) -> int
+        return int(math.ceil(len(text) / LLMStats.CHARACTERS_PER_TOKEN))
+
+    @staticmethod
+    def get_percentile(values, percentile):
+        # type: (list, float) -> float
+        if len(values) == 0:
+            return 0
+        sorted_values: list = sorted(values)
+        return sorted_values[max(0, int(math.ceil(percentile / 100 * len(sorted_values))) - 1)]
+
+    def __get_category_stats(self, prompt):
+        # type: (str) -> dict
+        return self.__categories.setdefault(self.get_category(prompt), {
+            "calls": 0,
+            "failed_calls": 0,
+            "retries": 0,
+            "prompt_tokens": 0,
+            "response_tokens": 0,
+            "cache_hits": 0,
+            "prefetch_hits": 0,
+            "fallbacks": 0,
+            "latencies": [],
+            "cache_hit_latencies": [],
+        })
+
+    def record_call(self, prompt, latency_seconds, num_retries, response_text, failed=False):
+        # type: (str, float, int, str, bool) -> None
+        with self.__lock:
+            category_stats: dict = self.__get_category_stats(prompt)
+            category_stats["calls"] += 1
+            category_stats["failed_calls"] += 1 if failed else 0
+            category_stats["retries"] += num_retries
+            category_stats["prompt_tokens"] += self.count_tokens(prompt) * (num_retries + 1)
+            category_stats["response_tokens"] += self.count_tokens(response_text)
+            category_stats["latencies"].append(latency_seconds)
+
+    def record_cache_hits(self, prompt, num_names, latency_seconds):
+        # type: (str, int, float) -> None
+        with self.__lock:
+            category_stats: dict = self.__get_category_stats(prompt)
+            category_stats["cache_hits"] += num_names
+            category_stats["cache_hit_latencies"].append(latency_seconds)
+
+    def record_prefetch_hit(self, prompt):
+        # type: (str) -> None
+        with self.__lock:
+            self.__get_category_stats(prompt)["prefetch_hits"] += 1
+
+    def record_fallback(self, prompt):
+        # type: (str) -> None
+        with self.__lock:
+            self.__get_category_stats(prompt)["fallbacks"] += 1
+
+    def get_summary(self):
+        # type: () -> dict
+        summary: dict = {}  # initial value
+        with self.__lock:
+            for category, category_stats in self.__categories.items():
+                summary[category] = {key: value for key, value in category_stats.items()
+                                     if key not in ["latencies", "cache_hit_latencies"]}
+                for percentile in self.PERCENTILES:
+                    summary[category]["p" + str(percentile) + "_latency_ms"] = \
+                        1000 * self.get_percentile(category_stats["latencies"], percentile)
+                    summary[category]["p" + str(percentile) + "_cache_hit_latency_ms"] = \
+                        1000 * self.get_percentile(category_stats["cache_hit_latencies"], percentile)
+
+        return summary
+
+    def dump_json(self, file_name):
+        # type: (str) -> None
+        with open(file_name, "w") as file:
+            json.dump(self.get_summary(), file, indent=4)
+
+    def __str__(self):
+        # type: () -> str
+        summary: dict = self.get_summary()
+        if len(summary) == 0:
+            return "No names have been generated yet."
+
+        table: list = [["CATEGORY", "CALLS", "FAILED\nCALLS", "RETRIES", "CACHE\nHITS", "PREFETCH\nHITS",
+                        "FALLBACKS", "PROMPT\nTOKENS", "RESPONSE\nTOKENS"] +
+                       ["P" + str(percentile) + "\n(MS)" for percentile in self.PERCENTILES] + ["CACHE HIT\nP50 (MS)"]]
+        for category, category_stats in summary.items():
+            table.append([category, category_stats["calls"], category_stats["failed_calls"],
+                          category_stats["retries"], category_stats["cache_hits"], category_stats["prefetch_hits"],
+                          category_stats["fallbacks"], category_stats["prompt_tokens"],
+                          category_stats["response_tokens"]] +
+                         [round(category_stats["p" + str(percentile) + "_latency_ms"], 1)
+                          for percentile in self.PERCENTILES] +
+                         [round(category_stats["p50_cache_hit_latency_ms"], 1)])
+
+        return str(tabulate(table, headers='firstrow', tablefmt='fancy_grid'))
+
+
+class GeminiUnavailableError(Exception):
+    """
+    This class contains attributes of the error raised when Google Gemini AI cannot be called.
+    """
+
+
+class GeminiRequestError(GeminiUnavailableError):
+    """
+    This class contains attributes of the error raised when Google Gemini AI refuses a request, e.g. because it is
+    invalid or the response is blocked, so that asking again cannot help.
+    """
+
+
+class CircuitBreaker:
+    """
+    This class contains attributes of a circuit breaker which stops calls to Google Gemini AI for a while after too
+    many of them failed in a row. Once the reset timeout passes, one trial call is let through to find out whether
+    Google Gemini AI has recovered.
+    """
+
+    FAILURE_THRESHOLD: int = 5
+    RESET_TIMEOUT_SECONDS: float = 30
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout_seconds=RESET_TIMEOUT_SECONDS):
+        # type: (int, float) -> None
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout_seconds: float = reset_timeout_seconds
+        self.state: str = "CLOSED"
+        self.__num_failures: int = 0
+        self.__opened_time: float = 0
+        self.__lock: threading.Lock = threading.Lock()
+
+    def allow_call(self):
+        # type: () -> bool
+        with self.__lock:
+            if self.state == "OPEN" and time.monotonic() - self.__opened_time >= self.reset_timeout_seconds:
+                self.state = "HALF OPEN"
+                return True
+            return self.state == "CLOSED"
+
+    def record_success(self):
+        # type: () -> None
+        with self.__lock:
+            self.state = "CLOSED"
+            self.__num_failures = 0
+
+    def record_failure(self):
+        # type: () -> None
+        with self.__lock:
+            self.__num_failures += 1
+            if self.state == "HALF OPEN" or self.__num_failures >= self.failure_threshold:
+                self.state = "OPEN"
+                self.__opened_time = time.monotonic()
+
+    def record_inconclusive(self):
+        # type: () -> None
+        # A call telling nothing about Google Gemini AI ends a trial without counting as a failure.
+        with self.__lock:
+            if self.state == "HALF OPEN":
+                self.state = "OPEN"
+                self.__opened_time = time.monotonic()
+
+
+class GeminiCallPolicy:
+    """
+    This class contains attributes of the policy every call to Google Gemini AI goes through. Each attempt has a
+    deadline, attempts failing with one of TRANSIENT_ERRORS are retried after a jittered exponential backoff, and a
+    circuit breaker stops calls while Google Gemini AI keeps failing. Requests refused with one of REQUEST_ERRORS
+    fail straight away with GeminiRequestError, and any other error is raised as it is. A call therefore never
+    takes much longer than (max_retries + 1) * timeout_seconds plus the backoffs, on top of any wait for the rate
+    limiter.
+    """
+
+    TIMEOUT_SECONDS: float = 10
+    MAX_RETRIES: int = 2
+    BASE_BACKOFF_SECONDS: float = 0.5
+    MAX_BACKOFF_SECONDS: float = 8
+    TRANSIENT_ERRORS: tuple = (TimeoutError, FutureTimeoutError, ConnectionError, google_exceptions.TooManyRequests,
+                               google_exceptions.ServerError)
+    REQUEST_ERRORS: tuple = (google_exceptions.GoogleAPICallError, gemini.types.BlockedPromptException,
+                             gemini.types.StopCandidateException, ValueError)
+
+    def __init__(self, timeout_seconds=TIMEOUT_SECONDS, max_retries=MAX_RETRIES,
+                 base_backoff_seconds=BASE_BACKOFF_SECONDS, max_backoff_seconds=MAX_BACKOFF_SECONDS,
+                 circuit_breaker=None):
+        # type: (float, int, float, float, CircuitBreaker or None) -> None
+        self.timeout_seconds: float = timeout_seconds
+        self.max_retries: int = max_retries
+        self.base_backoff_seconds: float = base_backoff_seconds
+        self.max_backoff_seconds: float = max_backoff_seconds
+        self.circuit_breaker: CircuitBreaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+
+    def get_backoff_seconds(self, attempt):
+        # type: (int) -> float
+        return random.uniform(0, min(self.max_backoff_seconds, self.base_backoff_seconds * 2 ** attempt))
+
+    def call(self, function, *args, rate_limiter=None):
+        # type: (callable, object, RateLimiter or None) -> object
+        """
+        Calling 'function' with 'args' under this policy.
+        :return: the result of 'function'
+        """
+
+        last_error: Exception or None = None  # initial value
+        for attempt in range(self.max_retries + 1):
+            if not self.circuit_breaker.allow_call():
+                raise GeminiUnavailableError("Google Gemini AI is unavailable at the moment.")
+
+            if attempt > 0:
+                time.sleep(self.get_backoff_seconds(attempt - 1))
+
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+
+            try:
+                result = self.run_attempt(function, args)
+            except self.TRANSIENT_ERRORS as error:
+                last_error = error
+                self.circuit_breaker.record_failure()
+                continue
+            except self.REQUEST_ERRORS as error:
+                # Google Gemini AI answered, so it is available, but asking again would be refused again.
+                self.circuit_breaker.record_success()
+                raise GeminiRequestError("Google Gemini AI refused the request.") from error
+            except Exception:
+                self.circuit_breaker.record_inconclusive()
+                raise
+
+            self.circuit_breaker.record_success()
+            return result
+
+        raise GeminiUnavailableError("Google Gemini AI failed " + str(self.max_retries + 1) +
+                                     " times in a row.") from last_error
+
+    def run_attempt(self, function, args):
+        # type: (callable, tuple) -> object
+        """
+        Calling 'function' with 'args' in a thread of its own and waiting for it for at most timeout_seconds. Every
+        attempt gets its own thread, so its deadline starts when it starts running rather than being spent waiting
+        behind attempts which ran past theirs. An attempt running past its deadline is abandoned and left to finish
+        in the background.
+        :return: the result of 'function'
+        """
 
+        future: Future = Future()
 
-###########################################
-# LEGENDARY CREATURE
-###########################################
+        def run():
+            # type: () -> None
+            try:
+                future.set_result(function(*args))
+            except BaseException as error:
+                future.set_exception(error)
 
+        threading.Thread(target=run, daemon=True).start()
+        return future.result(timeout=self.timeout_seconds)
 
-###########################################
-# ITEM
-###########################################
+    def close(self):
+        # type: () -> None
+        # Abandoned attempts run in daemon threads, which never keep the game from exiting.
+        pass
 
 
-class Item:
+class GeminiClientManager:
     """
-    This class contains attributes of an item in this game.
+    This class contains attributes of a manager owning one generative model and a small pool of reusable chat
+    sessions with it. The model and the chat sessions are only rebuilt when the generation config changes, and
+    the history of each chat session is kept short.
     """
 
-    def __init__(self, name, description, gold_cost):
-        # type: (str, str, mpf) -> None
-        self.name: str = name
-        self.description: str = description
-        self.gold_cost: mpf = gold_cost
-        self.sell_gold_gain: mpf = gold_cost / 5
+    MAX_SESSIONS: int = MAX_GEMINI_WORKERS
+    MAX_HISTORY_MESSAGES: int = 4
+
+    def __init__(self, generation_config, safety_settings, model_factory=None, call_policy=None, stats=None):
+        # type: (dict, list, callable or None, GeminiCallPolicy or None, LLMStats or None) -> None
+        self.generation_config: dict = dict(generation_config)
+        self.safety_settings: list = safety_settings
+        self.model_factory: callable = model_factory if model_factory is not None else create_generative_model
+        self.call_policy: GeminiCallPolicy or None = call_policy
+        self.stats: LLMStats = stats if stats is not None else LLMStats()
+        self.model = self.model_factory(self.generation_config, self.safety_settings)
+        self.__model_version: int = 0
+        self.__sessions: queue.LifoQueue = queue.LifoQueue(maxsize=self.MAX_SESSIONS)
+        self.__lock: threading.Lock = threading.Lock()
+
+    def set_generation_config(self, generation_config):
+        # type: (dict) -> bool
+        """
+        Using 'generation_config' from now on. The model is only rebuilt if the generation config is changed.
+        :return: True if the model is rebuilt, else False
+        """
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+        with self.__lock:
+            if dict(generation_config) == self.generation_config:
+                return False
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+            self.generation_config = dict(generation_config)
+            self.model = self.model_factory(self.generation_config, self.safety_settings)
+            self.__model_version += 1
+            self.__sessions = queue.LifoQueue(maxsize=self.MAX_SESSIONS)
+            return True
 
-            index += 1
+    def __borrow_session(self):
+        # type: () -> tuple
+        with self.__lock:
+            sessions: queue.LifoQueue = self.__sessions
+            model_version: int = self.__model_version
+            model = self.model
+
+        try:
+            return sessions.get_nowait(), model_version
+        except queue.Empty:
+            return model.start_chat(history=[
+            ]), model_version
+
+    def __return_session(self, convo, model_version):
+        # type: (object, int) -> None
+        with self.__lock:
+            if model_version != self.__model_version:
+                return
+            sessions: queue.LifoQueue = self.__sessions
+
+        try:
+            sessions.put_nowait(convo)
+        except queue.Full:
+            pass
 
-        return res + ")"
+    def send_message(self, prompt):
+        # type: (str) -> str
+        convo, model_version = self.__borrow_session()
+        convo.send_message(prompt)
+        text: str = str(convo.last.text)
 
-    def clone(self):
-        # type: () -> Item
-        return copy.deepcopy(self)
+        # Keeping the history of the chat session short
+        if len(convo.history) > self.MAX_HISTORY_MESSAGES:
+            convo.history = convo.history[len(convo.history) - self.MAX_HISTORY_MESSAGES:]
 
+        self.__return_session(convo, model_version)
+        return text
 
-class Ball(Item):
+
+class RateLimiter:
     """
-    This class contains attributes of a ball used to catch a legendary creature.
+    This class contains attributes of a token bucket limiting how often Google Gemini AI is called. Calls go out
+    immediately while tokens are left and only wait once the bucket is empty.
     """
 
-    MIN_CATCH_SUCCESS_RATE: mpf = mpf("0.15")
-    MAX_CATCH_SUCCESS_RATE: mpf = mpf("1")
+    REQUESTS_PER_MINUTE: float = 60
+    BURST_SIZE: int = 10
 
-    def __init__(self, name, description, gold_cost, catch_success_rate):
-        # type: (str, str, mpf, mpf) -> None
-        Item.__init__(self, name, description, gold_cost)
-        self.catch_success_rate: mpf = catch_success_rate if (self.MIN_CATCH_SUCCESS_RATE <= catch_success_rate <=
-                                                        self.MAX_CATCH_SUCCESS_RATE) else self.MIN_CATCH_SUCCESS_RATE
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, burst_size=BURST_SIZE):
+        # type: (float, int) -> None
+        self.requests_per_minute: float = requests_per_minute
+        self.burst_size: int = burst_size
+        self.__tokens: float = burst_size
+        self.__last_refill_time: float = time.monotonic()
+        self.__lock: threading.Lock = threading.Lock()
 
+    def try_acquire(self):
+        # type: () -> float
+        """
+        Trying to take a token from the bucket.
+        :return: 0 if a token is taken, else the number of seconds until the next token is available
+        """
 
-class Rune(Item):
+        with self.__lock:
+            now: float = time.monotonic()
+            self.__tokens = min(self.burst_size, self.__tokens + (now - self.__last_refill_time) *
+                                self.requests_per_minute / 60)
+            self.__last_refill_time = now
+            if self.__tokens >= 1:
+                self.__tokens -= 1
+                return 0
+            return (1 - self.__tokens) * 60 / self.requests_per_minute
+
+    def acquire(self):
+        # type: () -> None
+        wait_time: float = self.try_acquire()
+        while wait_time > 0:
+            time.sleep(wait_time)
+            wait_time = self.try_acquire()
+
+
+class NameCache:
     """
-    This class contains attributes of a rune used to strengthen legendary creatures.
+    This class contains attributes of an on-disk cache of names generated by Google Gemini AI. Names are pooled
+    per prompt and generation config, and old or least recently used pools are evicted.
     """
 
-    MIN_SLOT_NUMBER: int = 1
-    MAX_SLOT_NUMBER: int = 6
-    MIN_RATING: int = 1
-    MAX_RATING: int = 6
-    MAX_CRIT_RATE_UP: mpf = mpf("0.85")
+    MAX_NAMES_PER_KEY: int = 50
+    MAX_KEYS: int = 256
+    MAX_AGE_SECONDS: float = 7 * 24 * 60 * 60
+
+    def __init__(self, file_name, max_names_per_key=MAX_NAMES_PER_KEY, max_keys=MAX_KEYS,
+                 max_age_seconds=MAX_AGE_SECONDS):
+        # type: (str, int, int, float) -> None
+        self.file_name: str = file_name
+        self.max_names_per_key: int = max_names_per_key
+        self.max_keys: int = max_keys
+        self.max_age_seconds: float = max_age_seconds
+        self.__lock: threading.Lock = threading.Lock()
+        self.__connection: sqlite3.Connection = sqlite3.connect(file_name, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS name_keys (cache_key TEXT PRIMARY KEY, "
+                                      "last_used REAL NOT NULL)")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS names (cache_key TEXT NOT NULL, "
+                                      "name TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (cache_key, name))")
+
+    @staticmethod
+    def make_key(prompt, generation_config):
+        # type: (str, dict) -> str
+        key_data: dict = {
+            "prompt": prompt,
+            "temperature": generation_config.get("temperature"),
+            "top_p": generation_config.get("top_p"),
+            "top_k": generation_config.get("top_k"),
+            "max_output_tokens": generation_config.get("max_output_tokens"),
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def count_names(self, key):
+        # type: (str) -> int
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM names WHERE cache_key = ? AND created >= ?",
+                                             (key, time.time() - self.max_age_seconds)).fetchone()[0]
+
+    def get_names(self, key, num_names):
+        # type: (str, int) -> list
+        """
+        Drawing up to 'num_names' distinct random names from the pool of names with key 'key'.
+        :return: a list of names
+        """
 
-    def __init__(self, name, description, gold_cost, rating, slot_number, max_magic_points_percentage_up,
-                 max_hp_percentage_up, attack_power_percentage_up, defense_percentage_up, attack_speed_up,
-                 crit_rate_up, crit_damage_up):
-        # type: (str, str, mpf, int, int, mpf, mpf, mpf, mpf, mpf, mpf, mpf) -> None
-        Item.__init__(self, name, description, gold_cost)
-        self.rating: int = rating if self.MIN_RATING <= rating <= self.MAX_RATING else self.MIN_RATING
-        self.slot_number: int = slot_number if self.MIN_SLOT_NUMBER <= slot_number <= self.MAX_SLOT_NUMBER \
-            else self.MIN_SLOT_NUMBER
-        self.max_magic_points_percentage_up: mpf = max_magic_points_percentage_up
-        self.max_hp_percentage_up: mpf = max_hp_percentage_up
-        self.attack_power_percentage_up: mpf = attack_power_percentage_up
-        self.defense_percentage_up: mpf = defense_percentage_up
-        self.attack_speed_up: mpf = attack_speed_up
-        self.crit_rate_up: mpf = crit_rate_up if mpf("0") <= crit_rate_up <= self.MAX_CRIT_RATE_UP else mpf("0")
-        self.crit_damage_up: mpf = crit_damage_up
-        self.level: int = 1
-        self.level_up_gold_cost: mpf = gold_cost
-        self.level_up_success_rate: mpf = mpf("1")
-        self.already_placed: bool = False  # initial value
+        now: float = time.time()
+        with self.__lock, self.__connection:
+            rows: list = self.__connection.execute("SELECT name FROM names WHERE cache_key = ? AND created >= ? "
+                                                   "ORDER BY RANDOM() LIMIT ?",
+                                                   (key, now - self.max_age_seconds, num_names)).fetchall()
+            self.__connection.execute("UPDATE name_keys SET last_used = ? WHERE cache_key = ?", (now, key))
+        return [row[0] for row in rows]
+
+    def add_name(self, key, name):
+        # type: (str, str) -> None
+        now: float = time.time()
+        with self.__lock, self.__connection:
+            self.__connection.execute("INSERT OR REPLACE INTO name_keys (cache_key, last_used) VALUES (?, ?)",
+                                      (key, now))
+            self.__connection.execute("INSERT OR IGNORE INTO names (cache_key, name, created) VALUES (?, ?, ?)",
+                                      (key, name, now))
+
+            # Keeping only the newest names in the pool
+            self.__connection.execute("DELETE FROM names WHERE cache_key = ? AND name NOT IN (SELECT name FROM "
+                                      "names WHERE cache_key = ? ORDER BY created DESC LIMIT ?)",
+                                      (key, key, self.max_names_per_key))
+            self.__evict(now)
+
+    def __evict(self, now):
+        # type: (float) -> None
+        # Evicting names which are too old
+        self.__connection.execute("DELETE FROM names WHERE created < ?", (now - self.max_age_seconds,))
+
+        # Evicting the least recently used keys beyond the limit
+        self.__connection.execute("DELETE FROM name_keys WHERE cache_key NOT IN (SELECT cache_key FROM name_keys "
+                                  "ORDER BY last_used DESC LIMIT ?)", (self.max_keys,))
+        self.__connection.execute("DELETE FROM names WHERE cache_key NOT IN (SELECT cache_key FROM name_keys)")
+        self.__connection.execute("DELETE FROM name_keys WHERE cache_key NOT IN (SELECT cache_key FROM names)")
+
+    def close(self):
+        # type: () -> None
+        with self.__lock:
+            self.__connection.close()
 
-    def level_up(self):
-        # type: () -> bool
-        # Check whether levelling up is successful or not
-        if random.random() > self.level_up_success_rate:
-            return False
 
-        # Increase the level of the rune
-        self.level += 1
+class NameProvider:
+    """
+    This class contains attributes of a provider of names used in this game.
+    """
 
-        # Update the cost and success rate of levelling up the rune
-        self.level_up_gold_cost *= mpf("10") ** (self.level + self.rating)
-        self.level_up_success_rate *= mpf("0.95")
+    def generate_name(self, prompt):
+        # type: (str) -> str
+        return self.generate_names([prompt])[0]
 
-        # Increase stats
-        self.stat_increase.max_hp_percentage_up += self.rating
-        self.stat_increase.max_magic_points_percentage_up += self.rating
-        self.stat_increase.attack_percentage_up += self.rating
-        self.stat_increase.defense_percentage_up += self.rating
-        self.stat_increase.attack_speed_up += 2 * self.rating
-        self.stat_increase.crit_rate_up += 0.01 * self.rating
-        self.stat_increase.crit_damage_up += 0.05 * self.rating
-        self.stat_increase.resistance_up += 0.01 * self.rating
-        self.stat_increase.accuracy_up += 0.01 * self.rating
-        return True
+    def generate_names(self, prompts):
+        # type: (list) -> list
+        return [self.generate_name(prompt) for prompt in prompts]
 
+    def close(self):
+        # type: () -> None
+        pass
 
-class AwakenShard(Item):
+
+class GeminiNameProvider(NameProvider):
     """
-    This class contains attributes of an awaken shard to immediately awaken a legendary creature.
+    This class contains attributes of a provider asking Google Gemini AI for names. Names which cannot be asked for
+    because Google Gemini AI is unavailable are taken from the fallback name provider instead.
     """
 
-    def __init__(self, name, description, gold_cost, legendary_creature_element):
-        # type: (str, str, mpf, str) -> None
-        Item.__init__(self, name, description, gold_cost)
-        self.legendary_creature_element: str = legendary_creature_element
+    def __init__(self, client_manager, rate_limiter=None, fallback_name_provider=None):
+        # type: (GeminiClientManager, RateLimiter or None, NameProvider or None) -> None
+        self.client_manager: GeminiClientManager = client_manager
+        self.rate_limiter: RateLimiter or None = rate_limiter
+        self.fallback_name_provider: NameProvider = fallback_name_provider if fallback_name_provider is not None \
+            else LocalNameProvider()
 
+    def ask_names(self, prompts):
+        # type: (list) -> list
+        return ask_gemini_for_names(self.client_manager, prompts, self.rate_limiter)
 
-class EXPShard(Item):
+    def fill_missing_names(self, prompts, names):
+        # type: (list, list) -> list
+        missing_indices: list = [i for i in range(len(prompts)) if names[i] is None]
+        fallback_names: list = self.fallback_name_provider.generate_names([prompts[i] for i in missing_indices])
+        for i in range(len(missing_indices)):
+            names[missing_indices[i]] = fallback_names[i]
+            self.client_manager.stats.record_fallback(prompts[missing_indices[i]])
+
+        return names
+
+    def generate_names(self, prompts):
+        # type: (list) -> list
+        return self.fill_missing_names(prompts, self.ask_names(prompts))
+
+
+class CachedGeminiNameProvider(GeminiNameProvider):
     """
-    This class contains attributes of an EXP shard to increase the EXP of a legendary creature.
+    This class contains attributes of a provider asking Google Gemini AI for names through a name cache. Names are
+    drawn from the cache once enough of them are pooled and the pool is refilled in the background.
     """
 
-    def __init__(self, name, description, gold_cost, exp_granted):
-        # type: (str, str, mpf, mpf) -> None
-        Item.__init__(self, name, description, gold_cost)
-        self.exp_granted: mpf = exp_granted
+    MIN_CACHED_NAMES: int = 10
 
+    def __init__(self, client_manager, name_cache, rate_limiter=None, fallback_name_provider=None):
+        # type: (GeminiClientManager, NameCache, RateLimiter or None, NameProvider or None) -> None
+        GeminiNameProvider.__init__(self, client_manager, rate_limiter, fallback_name_provider)
+        self.name_cache: NameCache = name_cache
+        self.__refill_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+        self.__refilling_keys: set = set()  # initial value
+        self.__lock: threading.Lock = threading.Lock()
 
-class LevelUpShard(Item):
+    def generate_names(self, prompts):
+        # type: (list) -> list
+        """
+        Generating a name for each prompt in 'prompts', drawing from the name cache where possible and asking
+        Google Gemini AI concurrently for the rest.
+        :return: the names in the same order as 'prompts'
+        """
+
+        names: list = [None] * len(prompts)  # initial value
+        indices_by_prompt: dict = {}  # initial value
+        for i in range(len(prompts)):
+            indices_by_prompt.setdefault(prompts[i], []).append(i)
+
+        # Drawing names from the name cache
+        for prompt, indices in indices_by_prompt.items():
+            key: str = NameCache.make_key(prompt, self.client_manager.generation_config)
+            start_time: float = time.perf_counter()
+            if self.name_cache.count_names(key) >= self.MIN_CACHED_NAMES:
+                cached_names: list = self.name_cache.get_names(key, len(indices))
+                for i in range(len(cached_names)):
+                    names[indices[i]] = cached_names[i]
+
+                self.client_manager.stats.record_cache_hits(prompt, len(cached_names),
+                                                            time.perf_counter() - start_time)
+
+                self.refill_in_background(prompt)
+
+        # Asking Google Gemini AI for the names not found in the name cache
+        missing_indices: list = [i for i in range(len(prompts)) if names[i] is None]
+        new_names: list = self.ask_names([prompts[i] for i in missing_indices])
+        for i in range(len(missing_indices)):
+            if new_names[i] is not None:
+                names[missing_indices[i]] = new_names[i]
+                self.name_cache.add_name(NameCache.make_key(prompts[missing_indices[i]],
+                                                            self.client_manager.generation_config), new_names[i])
+
+        return self.fill_missing_names(prompts, names)
+
+    def refill_in_background(self, prompt):
+        # type: (str) -> None
+        key: str = NameCache.make_key(prompt, self.client_manager.generation_config)
+        with self.__lock:
+            if key in self.__refilling_keys:
+                return
+            self.__refilling_keys.add(key)
+
+        self.__refill_executor.submit(self.__refill, prompt, key)
+
+    def __refill(self, prompt, key):
+        # type: (str, str) -> None
+        try:
+            shortfall: int = min(self.MIN_CACHED_NAMES,
+                                 self.name_cache.max_names_per_key - self.name_cache.count_names(key))
+            if shortfall > 0:
+                for name in self.ask_names([prompt] * shortfall):
+                    if name is not None:
+                        self.name_cache.add_name(key, name)
+        except Exception:
+            pass  # refilling is best effort only
+        finally:
+            with self.__lock:
+                self.__refilling_keys.discard(key)
+
+    def close(self):
+        # type: () -> None
+        self.__refill_executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LocalNameProvider(NameProvider):
     """
-    This class contains attributes of a shard used to immediately level up a legendary creature.
+    This class contains attributes of a provider generating names locally with a Markov chain of letters trained on
+    the names in NAME_CORPUS, so that no network is needed.
     """
 
-    def __init__(self, name, description, gold_cost):
-        # type: (str, str, mpf) -> None
-        Item.__init__(self, name, description, gold_cost)
+    ORDER: int = 2
+    MIN_NAME_LENGTH: int = 3
+    MAX_NAME_LENGTH: int = 12
+    MAX_ATTEMPTS: int = 20
 
+    def __init__(self, corpus=None):
+        # type: (dict or None) -> None
+        if corpus is None:
+            corpus = NAME_CORPUS
+        self.__transitions: dict = {prompt: self.train(names) for prompt, names in corpus.items()}
 
-class SkillLevelUpShard(Item):
+    def train(self, names):
+        # type: (list) -> dict
+        """
+        Counting which letter follows each run of ORDER letters in 'names'. "^" marks the start and "$" marks the
+        end of a name.
+        :return: a dictionary from runs of letters to lists of following letters
+        """
+
+        transitions: dict = {}  # initial value
+        for name in names:
+            letters: str = "^" * self.ORDER + name.lower() + "$"
+            for i in range(len(letters) - self.ORDER):
+                transitions.setdefault(letters[i:i + self.ORDER], []).append(letters[i + self.ORDER])
+
+        return transitions
+
+    def generate_name(self, prompt, rng=random):
+        # type: (str, random.Random) -> str
+        if prompt not in self.__transitions:
+            return generate_random_name(rng)
+
+        transitions: dict = self.__transitions[prompt]
+        name: str = ""  # initial value
+        for attempt in range(self.MAX_ATTEMPTS):
+            name = ""
+            state: str = "^" * self.ORDER
+            while len(name) < self.MAX_NAME_LENGTH:
+                next_letter: str = rng.choice(transitions[state])
+                if next_letter == "$":
+                    break
+
+                name += next_letter
+                state = state[1:] + next_letter
+
+            if len(name) >= self.MIN_NAME_LENGTH:
+                break
+
+        return name.capitalize() if len(name) >= self.MIN_NAME_LENGTH else generate_random_name(rng)
+
+    def generate_names(self, prompts):
+        # type: (list) -> list
+        return [self.generate_name(prompt) for prompt in prompts]
+
+
+class NameProviderRouter(NameProvider):
     """
-    This class contains attributes of a skill level up shard to immediately increase the level of a
-    skill possessed by a legendary creature.
+    This class contains attributes of a provider passing each name prompt to the name provider chosen for it.
     """
 
-    def __init__(self, name, description, gold_cost):
-        # type: (str, str, mpf) -> None
-        Item.__init__(self, name, description, gold_cost)
+    def __init__(self, name_providers, default_name_provider):
+        # type: (dict, NameProvider) -> None
+        self.name_providers: dict = name_providers
+        self.default_name_provider: NameProvider = default_name_provider
 
+    def get_name_provider(self, prompt):
+        # type: (str) -> NameProvider
+        return self.name_providers.get(prompt, self.default_name_provider)
 
-###########################################
-# ITEM
-###########################################
+    def generate_names(self, prompts):
+        # type: (list) -> list
+        names: list = [None] * len(prompts)  # initial value
+        indices_by_name_provider: dict = {}  # initial value
+        for i in range(len(prompts)):
+            indices_by_name_provider.setdefault(self.get_name_provider(prompts[i]), []).append(i)
 
+        for name_provider, indices in indices_by_name_provider.items():
+            provider_names: list = name_provider.generate_names([prompts[i] for i in indices])
+            for i in range(len(indices)):
+                names[indices[i]] = provider_names[i]
 
-###########################################
-# GENERAL
-###########################################
+        return names
 
+    def close(self):
+        # type: () -> None
+        for name_provider in set(self.name_providers.values()) | {self.default_name_provider}:
+            name_provider.close()
 
-class Trainer:
+
+class NamePrefetcher(NameProvider):
     """
-    This class contains attributes of a trainer in this game.
+    This class contains attributes of a background worker keeping a queue of names ready for each name prompt
+    answered over the network, so that names can be taken without waiting for the name provider. The queues are only
+    refilled while the game is idle, i.e. after notify_idle() or once no names have been asked for in QUIET_SECONDS,
+    so that refilling never competes with names the player is waiting for.
     """
 
-    def __init__(self, name):
-        # type: (str) -> None
-        self.player_id: str = str(uuid.uuid1())  # generating random player ID
-        self.name: str = name
-        self.level: int = 1
-        self.exp: mpf = mpf("0")
-        self.required_exp: mpf = mpf("1e6")
-        self.gold: mpf = mpf("5e6")
-        self.battle_team: BattleTeam = BattleTeam()
-        self.item_inventory: ItemInventory = ItemInventory()
-        self.legendary_creature_inventory: LegendaryCreatureInventory = LegendaryCreatureInventory()
-        self.city: City or None = None  # initial value
-        self.location: AdventureModeLocation = AdventureModeLocation(0, 0)
-
-    def move_up(self):
-        # type: () -> bool
-        if isinstance(self.city, City):
-            if self.location.tile_y > 0:
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
-                self.location.tile_y -= 1
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
-                return True
-            return False
-        return False
+    LOW_WATER_MARK: int = 10
+    QUIET_SECONDS: float = 5
+
+    def __init__(self, name_provider, low_water_mark=LOW_WATER_MARK, prompts=None, stats=None):
+        # type: (NameProvider, int, list or None, LLMStats or None) -> None
+        if prompts is None:
+            prompts = NAME_PROMPTS
+        self.name_provider: NameProvider = name_provider
+        self.low_water_mark: int = low_water_mark
+        self.stats: LLMStats = stats if stats is not None else LLMStats()
+        self.__queues: dict = {prompt: queue.Queue() for prompt in prompts if not self.is_local(prompt)}
+        self.__last_busy_time: float = time.monotonic()
+        self.__idle: threading.Event = threading.Event()
+        self.__stopped: threading.Event = threading.Event()
+        self.__thread: threading.Thread = threading.Thread(target=self.__run, daemon=True)
+
+    def is_local(self, prompt):
+        # type: (str) -> bool
+        """
+        Checking whether names for 'prompt' are generated on this device, in which case they are as quick to
+        generate when asked for as they are to take from a queue.
+        :return: a boolean value
+        """
 
-    def move_down(self):
-        # type: () -> bool
-        if isinstance(self.city, City):
-            if self.location.tile_y < len(self.city.get_tiles()) - 1:
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
-                self.location.tile_y += 1
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
-                return True
-            return False
-        return False
+        name_provider: NameProvider = self.name_provider
+        if isinstance(name_provider, NameProviderRouter):
+            name_provider = name_provider.get_name_provider(prompt)
+        return isinstance(name_provider, LocalNameProvider)
 
-    def move_left(self):
-        # type: () -> bool
-        if isinstance(self.city, City):
-            if self.location.tile_x > 0:
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
-                self.location.tile_x -= 1
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
-                return True
-            return False
-        return False
+    def start(self):
+        # type: () -> None
+        self.__thread.start()
 
-    def move_right(self):
-        # type: () -> bool
-        if isinstance(self.city, City):
-            if self.location.tile_x < len(self.city.get_tiles()[0]) - 1:
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).remove_trainer(self)
-                self.location.tile_x += 1
-                self.city.get_tile_at(self.location.tile_x, self.location.tile_y).add_trainer(self)
-                return True
-            return False
-        return False
+    def get_num_ready_names(self, prompt):
+        # type: (str) -> int
+        return self.__queues[prompt].qsize() if prompt in self.__queues else 0
 
-    def claim_reward(self, reward):
-        # type: (Reward) -> None
-        self.exp += reward.player_reward_exp
-        self.level_up()
-        self.gold += reward.player_reward_gold
-        for legendary_creature in self.battle_team.get_legendary_creatures():
-            legendary_creature.exp += reward.legendary_creature_reward_exp
-            legendary_creature.level_up()
+    def notify_idle(self):
+        # type: () -> None
+        # Called while the game waits for the player, which is when the queues can be refilled for free.
+        self.__idle.set()
 
-        self.battle_team.recover_all()
+    def is_busy(self):
+        # type: () -> bool
+        return not self.__idle.is_set() and time.monotonic() - self.__last_busy_time < self.QUIET_SECONDS
 
-    def get_city_tile(self):
-        # type: () -> CityTile or None
-        if isinstance(self.city, City):
-            return self.city.get_tile_at(self.location.tile_x, self.location.tile_y)
-        return None
+    def pop_name(self, prompt):
+        # type: (str) -> str or None
+        """
+        Taking a ready name for 'prompt' without blocking.
+        :return: a name, or None if no name is ready
+        """
 
-    def place_rune_on_legendary_creature(self, legendary_creature, rune):
-        # type: (LegendaryCreature, Rune) -> bool
-        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures() and rune in \
-                self.item_inventory.get_items():
-            legendary_creature.place_rune(rune)
-            return True
-        return False
+        if prompt not in self.__queues:
+            return None
 
-    def remove_rune_from_legendary_creature(self, legendary_creature, slot_number):
-        # type: (LegendaryCreature, int) -> bool
-        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-            if slot_number in legendary_creature.get_runes().keys():
-                legendary_creature.remove_rune(slot_number)
-                return True
-            return False
-        return False
+        try:
+            return self.__queues[prompt].get_nowait()
+        except queue.Empty:
+            return None
 
-    def level_up(self):
+    def generate_names(self, prompts):
+        # type: (list) -> list
+        """
+        Generating a name for each prompt in 'prompts', taking ready names first and only asking the name provider
+        synchronously for the rest.
+        :return: the names in the same order as 'prompts'
+        """
+
+        self.__idle.clear()
+        self.__last_busy_time = time.monotonic()
+        names: list = [self.pop_name(prompt) for prompt in prompts]
+        for i in range(len(prompts)):
+            if names[i] is not None:
+                self.stats.record_prefetch_hit(prompts[i])
+
+        missing_indices: list = [i for i in range(len(prompts)) if names[i] is None]
+        new_names: list = self.name_provider.generate_names([prompts[i] for i in missing_indices])
+        for i in range(len(missing_indices)):
+            names[missing_indices[i]] = new_names[i]
+
+        return names
+
+    def __run(self):
         # type: () -> None
-        while self.exp >= self.required_exp:
-            self.level += 1
-            self.required_exp *= mpf("10") ** self.level
+        while not self.__stopped.is_set():
+            # Each kind of name is refilled in a request of its own, so that a player coming back in the middle of
+            # refilling waits for at most one request.
+            for prompt, name_queue in self.__queues.items():
+                if self.__stopped.is_set() or self.is_busy():
+                    break
+
+                num_missing_names: int = self.low_water_mark - name_queue.qsize()
+                if num_missing_names > 0:
+                    try:
+                        for name in self.name_provider.generate_names([prompt] * num_missing_names):
+                            name_queue.put(name)
+                    except Exception:
+                        pass  # prefetching is best effort only
+
+            self.__idle.clear()
+            self.__idle.wait(self.QUIET_SECONDS)
+
+    def close(self):
+        # type: () -> None
+        self.__stopped.set()
+        self.__idle.set()
 
-    def purchase_item(self, item):
-        # type: (Item) -> bool
-        if self.gold >= item.gold_cost:
-            self.gold -= item.gold_cost
-            self.add_item_to_inventory(item)
-            return True
-        else:
-            print("Not enough gold!")
-            return False
 
-    def sell_item(self, item):
-        # type: (Item) -> bool
-        if item in self.item_inventory.get_items():
-            if isinstance(item, Rune):
-                if item.already_placed:
-                    return False
+class LazyName:
+    """
+    This class contains attributes of a placeholder for a name which is only generated when it is first shown.
+    Placeholders shown together, like the names of the trainers in view, are resolved together with resolve_all()
+    in one request to the name provider. Unresolved placeholders are saved as their prompts and asked for with
+    NAME_PROVIDER once they are shown after loading.
+    """
 
-            self.remove_item_from_inventory(item)
-            self.gold += item.sell_gold_gain
-            return True
-        return False
+    CLAIM_LOCK: threading.Lock = threading.Lock()
+    NAME_PROVIDER: "NameProvider or None" = None  # initial value
 
-    def level_up_rune(self, rune):
-        # type: (Rune) -> bool
-        creature_has_rune: bool = False
-        for legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-            if rune in legendary_creature.get_runes().values():
-                creature_has_rune = True
-                if self.gold >= rune.level_up_gold_cost:
-                    self.gold -= rune.level_up_gold_cost
-                    return legendary_creature.level_up_rune(rune.slot_number)
-                else:
-                    return False
-        if not creature_has_rune:
-            if rune in self.item_inventory.get_items():
-                if self.gold >= rune.level_up_gold_cost:
-                    self.gold -= rune.level_up_gold_cost
-                    return rune.level_up()
-                return False
-            return False
-        return False
+    def __init__(self, prompt, name_provider=None):
+        # type: (str, NameProvider or None) -> None
+        self.prompt: str = prompt
+        self.__name_provider: NameProvider or None = name_provider
+        self.__future: Future or None = None  # initial value
 
-    def add_item_to_inventory(self, item):
-        # type: (Item) -> None
-        self.item_inventory.add_item(item)
+    @staticmethod
+    def load(prompt, name):
+        # type: (str, str or None) -> LazyName or str
+        """
+        Restoring a saved placeholder, which is only the name if it had been resolved and otherwise the prompt.
+        :return: the name, or a new placeholder for 'prompt'
+        """
 
-    def remove_item_from_inventory(self, item):
-        # type: (Item) -> bool
-        if isinstance(item, Rune):
-            for legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-                if item in legendary_creature.get_runes().values():
-                    return False
+        return LazyName(prompt) if name is None else name
 
-        return self.item_inventory.remove_item(item)
+    def get_name_provider(self):
+        # type: () -> NameProvider
+        if self.__name_provider is None:
+            if LazyName.NAME_PROVIDER is None:
+                LazyName.NAME_PROVIDER = LocalNameProvider()
+            self.__name_provider = LazyName.NAME_PROVIDER
+        return self.__name_provider
 
-    def add_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> None
-        self.legendary_creature_inventory.add_legendary_creature(legendary_creature)
+    def is_resolved(self):
+        # type: () -> bool
+        future: Future or None = self.__future
+        return future is not None and future.done() and future.exception() is None
 
-    def remove_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.battle_team.get_legendary_creatures():
-            return False
-        return self.legendary_creature_inventory.remove_legendary_creature(legendary_creature)
+    def set_name(self, name):
+        # type: (str) -> None
+        future: Future = Future()
+        future.set_result(str(name))
+        self.__future = future
 
-    def add_legendary_creature_to_team(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-            if self.battle_team.add_legendary_creature(legendary_creature):
-                legendary_creature.corresponding_team = self.battle_team
-                return True
-            return False
-        return False
+    @staticmethod
+    def resolve_all(names):
+        # type: (list) -> None
+        """
+        Resolving the placeholders among 'names' together, asking each name provider once for all of its
+        placeholders which nobody is resolving yet. CLAIM_LOCK is only held while claiming placeholders and never
+        during the request, so a slow name provider only holds up the placeholders in the same request.
+        :return: None
+        """
 
-    def remove_legendary_creature_from_team(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-            legendary_creature.corresponding_team = None
-            return self.battle_team.remove_legendary_creature(legendary_creature)
-        return False
+        claimed_names: dict = {}  # initial value
+        with LazyName.CLAIM_LOCK:
+            for name in names:
+                if isinstance(name, LazyName) and name.__future is None:
+                    name.__future = Future()
+                    claimed_names.setdefault(name.get_name_provider(), []).append(name)
+
+        for name_provider, lazy_names in claimed_names.items():
+            try:
+                provided_names: list = name_provider.generate_names([lazy_name.prompt for lazy_name in lazy_names])
+            except Exception as exception:
+                # The placeholders can be resolved again later, and whoever is waiting for them is told why not.
+                for lazy_name in lazy_names:
+                    future: Future = lazy_name.__future
+                    lazy_name.__future = None
+                    future.set_exception(exception)
+                raise
+
+            for i in range(len(lazy_names)):
+                lazy_names[i].__future.set_result(str(provided_names[i]))
+
+    def resolve(self):
+        # type: () -> str
+        future: Future or None = self.__future
+        if future is None:
+            LazyName.resolve_all([self])
+            future = self.__future
+        return future.result()
 
     def __str__(self):
         # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+        return self.resolve()
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+    def __repr__(self):
+        # type: () -> str
+        return repr(self.resolve())
 
-            index += 1
+    def __format__(self, format_spec):
+        # type: (str) -> str
+        return format(self.resolve(), format_spec)
 
-        return res + ")"
+    def __len__(self):
+        # type: () -> int
+        return len(self.resolve())
 
-    def clone(self):
-        # type: () -> Trainer
-        return copy.deepcopy(self)
+    def __eq__(self, other):
+        # type: (object) -> bool
+        return self.resolve() == str(other)
 
+    def __hash__(self):
+        # type: () -> int
+        return hash(self.resolve())
 
-class AITrainer(Trainer):
+    def __add__(self, other):
+        # type: (str) -> str
+        return self.resolve() + other
+
+    def __radd__(self, other):
+        # type: (str) -> str
+        return other + self.resolve()
+
+    def __copy__(self):
+        # type: () -> LazyName
+        return self
+
+    def __deepcopy__(self, memo):
+        # type: (dict) -> LazyName
+        # Clones share the placeholder, so that they show the same name once it is resolved.
+        return self
+
+    def __reduce__(self):
+        # Saving never resolves a name the player has not seen yet.
+        return LazyName.load, (self.prompt, self.__future.result() if self.is_resolved() else None)
+
+
+class LazyNameProvider(NameProvider):
     """
-    This class contains attributes of an AI-controlled trainer in this game.
+    This class contains attributes of a provider giving out placeholders for names straight away and only asking
+    the underlying name provider for them once they are shown. Each placeholder is resolved on its own unless it
+    is shown together with others, so names which are never shown are never asked for.
     """
 
-    def __init__(self, name):
+    def __init__(self, name_provider):
+        # type: (NameProvider) -> None
+        self.name_provider: NameProvider = name_provider
+
+    def generate_names(self, prompts):
+        # type: (list) -> list
+        return [LazyName(prompt, self.name_provider) for prompt in prompts]
+
+
+class StubResponse:
+    """
+    This class contains attributes of a response given by StubGenerativeModel.
+    """
+
+    def __init__(self, text):
         # type: (str) -> None
-        Trainer.__init__(self, name)
+        self.text: str = text
 
 
-class ItemShop:
+class StubChatSession:
     """
-    This class contains attributes of an item shop selling items.
+    This class contains attributes of a chat session with StubGenerativeModel.
     """
 
-    def __init__(self, items_sold):
-        # type: (list) -> None
-        self.name: str = "ITEM SHOP"
-        self.__items_sold: list = items_sold
+    def __init__(self, model, history):
+        # type: (StubGenerativeModel, list) -> None
+        self.model: StubGenerativeModel = model
+        self.history: list = history
+        self.last: StubResponse or None = None  # initial value
 
-    def get_items_sold(self):
-        # type: () -> list
-        return self.__items_sold
+    def send_message(self, content):
+        # type: (str) -> StubResponse
+        response: StubResponse = self.model.generate_response(str(content))
+        self.history.append({"role": "user", "parts": [str(content)]})
+        self.history.append({"role": "model", "parts": [response.text]})
+        self.last = response
+        return response
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+class StubGenerativeModel:
+    """
+    This class contains attributes of a local stand-in for Google Gemini AI. It answers name prompts with canned or
+    locally generated names after a random latency, and can be made to fail or to refuse calls as if rate limited.
+    """
 
-            index += 1
+    LATENCY_DISTRIBUTIONS: list = ["CONSTANT", "UNIFORM", "LOGNORMAL"]
+
+    def __init__(self, generation_config=None, safety_settings=None, latency_distribution="CONSTANT",
+                 latency_parameters=(0,), failure_rate=0, rate_limit_rate=0, canned_names=None):
+        # type: (dict or None, list or None, str, tuple, float, float, list or None) -> None
+        self.generation_config: dict = generation_config if generation_config is not None else {}
+        self.safety_settings: list = safety_settings if safety_settings is not None else []
+        self.latency_distribution: str = latency_distribution if latency_distribution in \
+            self.LATENCY_DISTRIBUTIONS else self.LATENCY_DISTRIBUTIONS[0]
+        self.latency_parameters: tuple = latency_parameters
+        self.failure_rate: float = failure_rate
+        self.rate_limit_rate: float = rate_limit_rate
+        self.canned_names: list = canned_names if canned_names is not None else []
+        self.num_calls: int = 0
+        self.num_failures: int = 0
+        self.num_rate_limited_calls: int = 0
+        self.__local_name_provider: LocalNameProvider = LocalNameProvider()
+        self.__lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls, generation_config=None, safety_settings=None):
+        # type: (dict or None, list or None) -> StubGenerativeModel
+        """
+        Creating a stub configured by the environment variables below.
+        GEMINI_STUB_LATENCY: latency distribution in seconds, e.g. "CONSTANT:0.5", "UNIFORM:0.2:1" or
+        "LOGNORMAL:0.5:0.3" (median and sigma)
+        GEMINI_STUB_FAILURE_RATE: chance of a call failing with a server error
+        GEMINI_STUB_RATE_LIMIT_RATE: chance of a call being refused as rate limited
+        GEMINI_STUB_NAMES: comma separated canned names to answer with
+        :return: a stub
+        """
 
-        return res + ")"
+        latency: list = os.environ.get("GEMINI_STUB_LATENCY", "CONSTANT:0").split(":")
+        canned_names: list = [name.strip() for name in os.environ.get("GEMINI_STUB_NAMES", "").split(",")
+                              if name.strip() != ""]
+        return cls(generation_config, safety_settings, latency[0].upper(),
+                   tuple(float(parameter) for parameter in latency[1:]),
+                   float(os.environ.get("GEMINI_STUB_FAILURE_RATE", "0")),
+                   float(os.environ.get("GEMINI_STUB_RATE_LIMIT_RATE", "0")), canned_names)
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> StubChatSession
+        return StubChatSession(self, list(history) if history is not None else [])
+
+    def sample_latency(self):
+        # type: () -> float
+        if self.latency_distribution == "UNIFORM":
+            return random.uniform(self.latency_parameters[0], self.latency_parameters[1])
+        elif self.latency_distribution == "LOGNORMAL":
+            return random.lognormvariate(math.log(self.latency_parameters[0]), self.latency_parameters[1])
+        return self.latency_parameters[0] if len(self.latency_parameters) > 0 else 0
+
+    def get_name(self, prompt):
+        # type: (str) -> str
+        if len(self.canned_names) > 0:
+            return random.choice(self.canned_names)
+        return self.__local_name_provider.generate_name(prompt)
+
+    def generate_response(self, prompt):
+        # type: (str) -> StubResponse
+        with self.__lock:
+            self.num_calls += 1
+
+        time.sleep(max(0, self.sample_latency()))
+        if random.random() < self.rate_limit_rate:
+            with self.__lock:
+                self.num_rate_limited_calls += 1
+            raise google_exceptions.ResourceExhausted("Resource has been exhausted (e.g. check quota).")
+
+        if random.random() < self.failure_rate:
+            with self.__lock:
+                self.num_failures += 1
+            raise google_exceptions.ServiceUnavailable("The service is currently unavailable.")
+
+        bulk_request: tuple or None = parse_bulk_name_prompt(prompt)
+        if bulk_request is not None:
+            return StubResponse(json.dumps([self.get_name(bulk_request[0]) for i in range(bulk_request[1])]))
+        return StubResponse(self.get_name(prompt))
 
-    def clone(self):
-        # type: () -> ItemShop
-        return copy.deepcopy(self)
+
+###########################################
+# GEMINI
+###########################################
 
 
-class Reward:
+# Creating functions used by the main function to play the game.
+
+
+def enter_portal(saved_game_data, city_prebuilder, visited_city_cache):
+    # type: (SavedGameData, CityPrebuilder, VisitedCityCache) -> None
     """
-    This class contains attributes of the reward gained for doing something in this game.
+    Moving the player to the city behind the portal the player is standing on, either one visited before or a new
+    one.
+    :return: None
     """
+    old_city: City = saved_game_data.trainer_data.city
+    destinations: list = saved_game_data.world_graph.get_neighbours(old_city.city_id)
+    new_city: City or None = None  # initial value
+    if len(destinations) > 0:
+        print("Below is a list of cities you can go back to:\n")
+        for i in range(len(destinations)):
+            print(str(i + 1) + ". " + str(saved_game_data.world_graph.get_city_name(destinations[i])))
+
+        destination: str = input("Please enter the index of the city you want to go to (1 - " +
+                                 str(len(destinations)) + ") or \"NEW CITY\" to go to a new city: ")
+        while destination != "NEW CITY" and destination not in [str(i + 1) for i in
+                                                                range(len(destinations))]:
+            destination = input("Sorry, invalid input! Please enter the index of the city you want to "
+                                "go to (1 - " + str(len(destinations)) + ") or \"NEW CITY\" to go to a "
+                                                                        "new city: ")
+
+        if destination != "NEW CITY":
+            new_city = visited_city_cache.get(destinations[int(destination) - 1])
+            if new_city is None:
+                print("Sorry, that city cannot be found any more! Going to a new city instead.")
+
+    if new_city is not None:
+        spawn_trainer(new_city, saved_game_data.trainer_data)
+    else:
+        new_city = city_prebuilder.generate_city(saved_game_data.trainer_data)
 
-    def __init__(self, player_reward_exp=mpf("0"), player_reward_gold=mpf("0"),
-                 legendary_creature_reward_exp=mpf("0")):
-        # type: (mpf, mpf, mpf, mpf) -> None
-        self.player_reward_exp: mpf = player_reward_exp
-        self.player_reward_gold: mpf = player_reward_gold
-        self.legendary_creature_reward_exp: mpf = legendary_creature_reward_exp
+    visited_city_cache.put(old_city)
+    saved_game_data.world_graph.add_portal(old_city, new_city)
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+def print_battle_odds(battle_outcome_estimator, team1, team2):
+    # type: (BattleOutcomeEstimator or None, BattleTeam, BattleTeam or LegendaryCreature) -> None
+    """
+    Printing the estimated odds of the player's team in a battle against 'team2', if battle odds are estimated.
+    The player is simulated as attacking the weakest opponent and healing when low on HP.
+    :return: None
+    """
 
-            index += 1
+    if battle_outcome_estimator is None:
+        return
 
-        return res + ")"
+    print("Below are your estimated odds in this battle.\n")
+    print(battle_outcome_estimator.estimate(team1, team2, policy1=FocusedBattlePolicy()))
+    print("\n")
 
-    def clone(self):
-        # type: () -> Reward
-        return copy.deepcopy(self)
 
+def play_wild_battle(saved_game_data, wild_legendary_creature, battle_outcome_estimator=None):
+    # type: (SavedGameData, LegendaryCreature, BattleOutcomeEstimator or None) -> None
+    """
+    Playing a battle against 'wild_legendary_creature' until it is caught, the player flees or a side wins.
+    :return: None
+    """
 
-class AdventureModeLocation:
+    print_battle_odds(battle_outcome_estimator, saved_game_data.trainer_data.battle_team, wild_legendary_creature)
+    wild_battle: WildBattle = WildBattle(saved_game_data.trainer_data, wild_legendary_creature)
+    battle_engine: BattleEngine = BattleEngine(wild_battle.trainer1.battle_team, wild_legendary_creature,
+                                               InputBattlePolicy(wild_battle.trainer1), RandomBattlePolicy(),
+                                               [PrintingBattleObserver()],
+                                               numeric_backend_name=Battle.NUMERIC_BACKEND_NAME)
+    result: BattleResult = battle_engine.run()
+    if result.outcome == "WON":
+        wild_battle.winner = wild_battle.trainer1.battle_team
+        saved_game_data.trainer_data.claim_reward(wild_battle.reward)
+        wild_battle.trainer1.battle_team.recover_all()
+    elif result.outcome == "LOST":
+        wild_battle.winner = BattleTeam([wild_legendary_creature])
+        wild_battle.trainer1.battle_team.recover_all()
+    elif result.outcome == "DRAW":
+        wild_battle.trainer1.battle_team.recover_all()
+    elif result.outcome == "FLED":
+        wild_battle.trainer_fled = True
+    elif result.outcome == "CAUGHT":
+        wild_battle.wild_legendary_creature_caught = True
+        saved_game_data.trainer_data.add_legendary_creature(wild_legendary_creature)
+        saved_game_data.trainer_data.add_legendary_creature_to_team(wild_legendary_creature)
+
+
+def play_trainer_battle(saved_game_data, other_trainer, battle_outcome_estimator=None):
+    # type: (SavedGameData, Trainer, BattleOutcomeEstimator or None) -> None
     """
-    This class contains attributes of the location of a trainer in adventure mode of this game.
+    Playing a battle against 'other_trainer' until a side wins.
+    :return: None
     """
 
-    def __init__(self, tile_x, tile_y):
-        # type: (int, int) -> None
-        self.tile_x: int = tile_x
-        self.tile_y: int = tile_y
+    print_battle_odds(battle_outcome_estimator, saved_game_data.trainer_data.battle_team, other_trainer.battle_team)
+    trainer_battle: TrainerBattle = TrainerBattle(saved_game_data.trainer_data, other_trainer)
+    saved_game_data.trainer_data.city.record_trainer_update(other_trainer)
+    battle_engine: BattleEngine = BattleEngine(trainer_battle.trainer1.battle_team, trainer_battle.trainer2.battle_team,
+                                               InputBattlePolicy(trainer_battle.trainer1), RandomBattlePolicy(),
+                                               [PrintingBattleObserver()],
+                                               numeric_backend_name=Battle.NUMERIC_BACKEND_NAME)
+    result: BattleResult = battle_engine.run()
+    if result.outcome == "WON":
+        trainer_battle.winner = trainer_battle.trainer1.battle_team
+        trainer_battle.trainer1.claim_reward(trainer_battle.reward)
+    elif result.outcome == "LOST":
+        trainer_battle.winner = trainer_battle.trainer2.battle_team
+        trainer_battle.trainer2.claim_reward(trainer_battle.reward)
+
+    trainer_battle.trainer1.battle_team.recover_all()
+    trainer_battle.trainer2.battle_team.recover_all()
+
+
+def handle_tile_encounter(saved_game_data, city_prebuilder, visited_city_cache, battle_outcome_estimator=None):
+    # type: (SavedGameData, CityPrebuilder, VisitedCityCache, BattleOutcomeEstimator or None) -> bool
+    """
+    Checking the type of tile the player has landed on and letting a portal, a wild battle or a trainer battle
+    happen there.
+    :return: True if something happened, False otherwise
+    """
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+    curr_tile: CityTile = saved_game_data.trainer_data.get_city_tile()
+    if isinstance(curr_tile, PortalTile):
+        enter_portal(saved_game_data, city_prebuilder, visited_city_cache)
+        return True
+    elif isinstance(curr_tile, GrassTile):
+        # Determine if a wild or trainer battle occurs or not.
+        wild_battle_occurs: bool = random.random() < 0.5
+        if wild_battle_occurs:
+            wild_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
+                                                          (random.choice(LegendaryCreature.POTENTIAL_ELEMENTS)))
+            average_player_battle_creature_level: int = get_average_battle_creature_level(
+                saved_game_data.trainer_data)
+            while wild_legendary_creature.level < average_player_battle_creature_level:
+                wild_legendary_creature.exp = wild_legendary_creature.required_exp
+                wild_legendary_creature.level_up()
+
+            play_wild_battle(saved_game_data, wild_legendary_creature, battle_outcome_estimator)
+            return True
+        else:
+            if curr_tile.count_trainers() > 1:
+                trainer_battle_occurs: bool = random.random() < 0.5
+                if trainer_battle_occurs:
+                    play_trainer_battle(saved_game_data,
+                                        curr_tile.choose_opponent(saved_game_data.trainer_data),
+                                        battle_outcome_estimator)
+                    return True
+    elif isinstance(curr_tile, PavementTile):
+        # Determine if a trainer battle occurs or not.
+        if curr_tile.count_trainers() > 1:
+            trainer_battle_occurs: bool = random.random() < 0.5
+            if trainer_battle_occurs:
+                play_trainer_battle(saved_game_data, curr_tile.choose_opponent(saved_game_data.trainer_data),
+                                    battle_outcome_estimator)
+                return True
+    else:
+        pass
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+    return False
 
-            index += 1
 
-        return res + ")"
+def parse_go_to_target(text):
+    # type: (str) -> str or tuple or None
+    """
+    Reading where the player wants to go: one of DistanceFieldCache.TARGET_TYPES or coordinates "X,Y".
+    :return: the target, or None if 'text' is not a valid target
+    """
 
-    def clone(self):
-        # type: () -> AdventureModeLocation
-        return copy.deepcopy(self)
+    if text in DistanceFieldCache.TARGET_TYPES:
+        return text
+
+    match = re.fullmatch(r"\s*(\d+)\s*,\s*(\d+)\s*", text)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
 
 
-class SavedGameData:
+def go_to(saved_game_data, target, distance_field_cache, city_prebuilder, visited_city_cache,
+          battle_outcome_estimator=None):
+    # type: (SavedGameData, str or tuple, DistanceFieldCache, CityPrebuilder, VisitedCityCache, BattleOutcomeEstimator) -> int
     """
-    This class contains attributes of a saved game data.
+    Walking the player along a shortest path to the nearest 'target', stopping early when something happens on the
+    way.
+    :return: the number of steps walked, or -1 if no such target can be reached
     """
 
-    def __init__(self, trainer_name, temperature, top_p, top_k, max_output_tokens, trainer_data):
-        # type: (str, float, float, float, int, Trainer) -> None
-        self.trainer_name: str = trainer_name
-        self.temperature: float = temperature
-        self.top_p: float = top_p
-        self.top_k: float = top_k
-        self.max_output_tokens: int = max_output_tokens
-        self.trainer_data: Trainer = trainer_data
+    trainer: Trainer = saved_game_data.trainer_data
+    city: City = trainer.city
+    field: DistanceField = distance_field_cache.get_field(trainer, target)
+    if field.get_distance(trainer.location.tile_x, trainer.location.tile_y) == DistanceField.UNREACHABLE:
+        return -1
 
-    def __str__(self):
-        # type: () -> str
-        res: str = ""  # initial value
-        res += str(self.trainer_name).upper() + "\n"
-        res += "Temperature: " + str(self.temperature) + "\n"
-        res += "Top P: " + str(self.top_p) + "\n"
-        res += "Top K: " + str(self.top_k) + "\n"
-        res += "Max output tokens: " + str(self.max_output_tokens) + "\n"
-        return res
+    num_steps: int = 0  # initial value
+    direction: str or None = field.get_next_step(trainer.location.tile_x, trainer.location.tile_y)
+    while direction is not None:
+        if direction == "UP":
+            trainer.move_up()
+        elif direction == "DOWN":
+            trainer.move_down()
+        elif direction == "LEFT":
+            trainer.move_left()
+        elif direction == "RIGHT":
+            trainer.move_right()
 
-    def clone(self):
-        # type: () -> SavedGameData
-        return copy.deepcopy(self)
+        num_steps += 1
+        if handle_tile_encounter(saved_game_data, city_prebuilder, visited_city_cache, battle_outcome_estimator) or \
+                trainer.city is not city:
+            break
 
+        direction = field.get_next_step(trainer.location.tile_x, trainer.location.tile_y)
 
-###########################################
-# GENERAL
-###########################################
+    return num_steps
 
 
 # Creating main function used to run the game.
@@ -1494,7 +5701,12 @@ def main() -> int:
     """
 
     load_dotenv()
-    gemini.configure(api_key=os.environ['GEMINI_API_KEY'])
+    gemini.configure(api_key=os.environ.get('GEMINI_API_KEY'))
+
+    # Screens are written to the terminal in one go
+    terminal: Terminal = Terminal(sys.stdout)
+    sys.stdout = terminal
+    atexit.register(terminal.flush)
 
     # Gemini safety settings
     safety_settings = [
@@ -1523,13 +5735,59 @@ def main() -> int:
     # The player's trainer name
     player_trainer_name: str = ""  # initial value
 
+    # Cache of names generated by Google Gemini AI
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    name_cache: NameCache = NameCache(os.path.join(CACHE_DIRECTORY, "names.sqlite3"))
+    prefetch_low_water_mark: int = int(os.environ.get("NAME_PREFETCH_LOW_WATER_MARK",
+                                                      NamePrefetcher.LOW_WATER_MARK))
+
+    # Rate limiter shared by all calls to Google Gemini AI
+    rate_limiter: RateLimiter = RateLimiter(float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE",
+                                                                 RateLimiter.REQUESTS_PER_MINUTE)),
+                                            int(os.environ.get("GEMINI_BURST_SIZE", RateLimiter.BURST_SIZE)))
+
+    # How close to a portal the player must be for the city behind it to be built in the background
+    prebuild_distance: int = int(os.environ.get("PORTAL_PREBUILD_DISTANCE", CityPrebuilder.PREBUILD_DISTANCE))
+    max_prebuilt_cities: int = int(os.environ.get("MAX_PREBUILT_CITIES", CityPrebuilder.MAX_PREBUILT_CITIES))
+
+    # How the tiles of cities are stored
+    city_representation: str = os.environ.get("CITY_REPRESENTATION", "GRID")
+    if city_representation not in CITY_REPRESENTATIONS:
+        city_representation = "GRID"
+
+    # How many of the cities the player has left are kept in memory, so that they can be returned to through portals
+    max_cached_cities: int = int(os.environ.get("MAX_CACHED_CITIES", VisitedCityCache.MAX_CITIES_IN_MEMORY))
+
+    # Distance fields used to walk to places in cities
+    distance_field_cache: DistanceFieldCache = DistanceFieldCache()
+
+    # Estimator of the odds in battles, used when BATTLE_ODDS_SIMULATIONS is positive
+    num_battle_odds_simulations: int = int(os.environ.get("BATTLE_ODDS_SIMULATIONS", "0"))
+    battle_outcome_estimator: BattleOutcomeEstimator or None = BattleOutcomeEstimator(
+        int(os.environ.get("BATTLE_ODDS_WORKERS", os.cpu_count() or 1)), num_battle_odds_simulations) \
+        if num_battle_odds_simulations > 0 else None
+
+    # Kind of numbers the stats of legendary creatures are kept in during battles
+    Battle.NUMERIC_BACKEND_NAME = os.environ.get("BATTLE_NUMERIC_BACKEND", Battle.NUMERIC_BACKEND_NAME)
+
+    # Renderer of the part of the city around the player
+    city_renderer: CityRenderer = CityRenderer(int(os.environ.get("CITY_VIEW_RADIUS", CityRenderer.VIEW_RADIUS)))
+
+    # Statistics of the names generated in this game
+    llm_stats: LLMStats = LLMStats()
+
+    # Policy every call to Google Gemini AI goes through
+    call_policy: GeminiCallPolicy = GeminiCallPolicy(float(os.environ.get("GEMINI_TIMEOUT_SECONDS",
+                                                                          GeminiCallPolicy.TIMEOUT_SECONDS)),
+                                                     int(os.environ.get("GEMINI_MAX_RETRIES",
+                                                                        GeminiCallPolicy.MAX_RETRIES)))
+
     # Gemini Generative Model
-    model = gemini.GenerativeModel(model_name="gemini-1.0-pro",
-                                       generation_config={"temperature": 0.9,
-                                                          "top_p": 1,
-                                                          "top_k": 1,
-                                                          "max_output_tokens": 2048,},
-                                       safety_settings=safety_settings)  # initial value
+    client_manager: GeminiClientManager = GeminiClientManager({"temperature": 0.9,
+                                                               "top_p": 1,
+                                                               "top_k": 1,
+                                                               "max_output_tokens": 2048,}, safety_settings,
+                                                              call_policy=call_policy, stats=llm_stats)
 
     print("Enter \"NEW GAME\" to create new saved game data.")
     print("Enter \"LOAD GAME\" to load existing saved game data.")
@@ -1578,13 +5836,19 @@ def main() -> int:
                 "max_output_tokens": int_max_output_tokens,
             }
 
-            model = gemini.GenerativeModel(model_name="gemini-1.0-pro",
-                                           generation_config=generation_config,
-                                           safety_settings=safety_settings)
+            client_manager.set_generation_config(generation_config)
+            name_provider: NameProvider = create_name_provider(client_manager, name_cache, rate_limiter)
+            name_prefetcher: NamePrefetcher = NamePrefetcher(name_provider, prefetch_low_water_mark,
+                                                             stats=llm_stats)
+            name_prefetcher.start()
+            lazy_name_provider: LazyNameProvider = LazyNameProvider(name_prefetcher)
+            LazyName.NAME_PROVIDER = name_prefetcher
+            city_prebuilder: CityPrebuilder = CityPrebuilder(lazy_name_provider, prebuild_distance,
+                                                             max_prebuilt_cities, city_representation)
 
             player_trainer_name = input("Please enter trainer name: ")
-            saved_game_files: list = [f for f in os.listdir("../saved")]
-            while player_trainer_name in saved_game_files:
+            saved_game_files: list = get_saved_game_files()
+            while os.path.exists(os.path.join("../saved", player_trainer_name)):
                 print("Below is a list of existing saved game files:\n")
                 for i in range(len(saved_game_files)):
                     print(str(i + 1) + ". " + str(saved_game_files[i]))
@@ -1603,82 +5867,16 @@ def main() -> int:
                 saved_game_data.trainer_data.add_legendary_creature_to_team(new_legendary_creature)
 
             # Generate the city where the player is at.
-            city_width: int = random.randint(6, 10)
-            city_height: int = random.randint(6, 10)
-            city_tiles: list = []  # initial value
-            portals: int = 0  # initial value
-            for y in range(city_height):
-                curr_row: list = []
-                for x in range(city_width):
-                    if x == 0 and y == 0:
-                        curr_row.append(PavementTile())
-                    elif portals == 0:
-                        if x == city_width - 1 and y == city_height - 1:
-                            portals += 1
-                            curr_row.append(PortalTile())
-                        else:
-                            curr_tile: str = random.choice(["PORTAL", "PAVEMENT", "GRASS"])
-                            if curr_tile == "PORTAL":
-                                portals += 1
-                                curr_row.append(PortalTile())
-                            elif curr_tile == "PAVEMENT":
-                                curr_row.append(PavementTile())
-                            elif curr_tile == "GRASS":
-                                curr_row.append(GrassTile())
-                    else:
-                        curr_tile: str = random.choice(["PAVEMENT", "GRASS"])
-                        if curr_tile == "PAVEMENT":
-                            curr_row.append(PavementTile())
-                        elif curr_tile == "GRASS":
-                            curr_row.append(GrassTile())
-
-                city_tiles.append(curr_row)
-            convo = model.start_chat(history=[
-            ])
-            convo.send_message("Please enter a good name of a fictional city (safe one word response only please)!")
-            city_name: str = str(convo.last.text)
-            city: City = City(city_name, city_tiles)
-
-            # Spawn player trainer
-            saved_game_data.trainer_data.city = city
-            saved_game_data.trainer_data.location = AdventureModeLocation(0, 0)
-            city.get_tile_at(0, 0).add_trainer(saved_game_data.trainer_data)
-
-            # Spawn 5 to 10 random AI trainers.
-            num_ai_trainers: int = random.randint(5, 10)
-            for i in range(num_ai_trainers):
-                tile_x: int = random.randint(0, len(city.get_tiles()[0]) - 1)
-                tile_y: int = random.randint(0, len(city.get_tiles()) - 1)
-                while tile_x == 0 and tile_y == 0:
-                    tile_x = random.randint(0, len(city.get_tiles()[0]) - 1)
-                    tile_y = random.randint(0, len(city.get_tiles()) - 1)
-
-                time.sleep(5)
-                convo.send_message("Please enter a good male/female game character name "
-                                   "(safe one word response only please)! ")
-                ai_trainer_name: str = str(convo.last.text)
-                ai_trainer: AITrainer = AITrainer(ai_trainer_name)
-                average_player_battle_creature_level: int = (sum(legendary_creature.level for legendary_creature in
-                                                         saved_game_data.trainer_data.battle_team.get_legendary_creatures())
-                                                             // len(saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                for j in range(5):
-                    new_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
-                                                                 (random.choice(LegendaryCreature.POTENTIAL_ELEMENTS)))
-                    while new_legendary_creature.level < average_player_battle_creature_level:
-                        new_legendary_creature.exp = new_legendary_creature.required_exp
-                        new_legendary_creature.level_up()
-
-                    ai_trainer.add_legendary_creature(new_legendary_creature)
-                    ai_trainer.add_legendary_creature_to_team(new_legendary_creature)
-
-                ai_trainer.location = AdventureModeLocation(tile_x, tile_y)
-                city.get_tile_at(tile_x, tile_y).add_trainer(ai_trainer)
+            generate_city(lazy_name_provider, saved_game_data.trainer_data, city_representation)
 
+            # Cities the player has left, so that they can be returned to through portals
+            visited_city_cache: VisitedCityCache = VisitedCityCache(get_city_cache_directory(player_trainer_name),
+                                                                    max_cached_cities)
             game_started = True
         else:
             clear()
 
-            saved_game_files: list = [f for f in os.listdir("../saved")]
+            saved_game_files: list = get_saved_game_files()
             if len(saved_game_files) == 0:
                 action = "NEW GAME"
 
@@ -1697,6 +5895,8 @@ def main() -> int:
                                      "saved game data you want to load: ")
 
             saved_game_data = load_game_data(os.path.join("../saved", player_trainer_name))
+            if getattr(saved_game_data, "world_graph", None) is None:
+                saved_game_data.world_graph = WorldGraph()  # saved before portals could lead back
 
             # Set up the model
             generation_config = {
@@ -1706,9 +5906,19 @@ def main() -> int:
                 "max_output_tokens": saved_game_data.max_output_tokens,
             }
 
-            model = gemini.GenerativeModel(model_name="gemini-1.0-pro",
-                                           generation_config=generation_config,
-                                           safety_settings=safety_settings)
+            client_manager.set_generation_config(generation_config)
+            name_provider: NameProvider = create_name_provider(client_manager, name_cache, rate_limiter)
+            name_prefetcher: NamePrefetcher = NamePrefetcher(name_provider, prefetch_low_water_mark,
+                                                             stats=llm_stats)
+            name_prefetcher.start()
+            lazy_name_provider: LazyNameProvider = LazyNameProvider(name_prefetcher)
+            LazyName.NAME_PROVIDER = name_prefetcher
+            city_prebuilder: CityPrebuilder = CityPrebuilder(lazy_name_provider, prebuild_distance,
+                                                             max_prebuilt_cities, city_representation)
+
+            # Cities the player has left, so that they can be returned to through portals
+            visited_city_cache: VisitedCityCache = VisitedCityCache(get_city_cache_directory(player_trainer_name),
+                                                                    max_cached_cities)
             game_started = True
 
     # Start playing the game.
@@ -1719,17 +5929,34 @@ def main() -> int:
         continue_playing: str = input("Do you want to continue playing? ")
         if continue_playing != "Y":
             save_game_data(saved_game_data, os.path.join("../saved", player_trainer_name))
+            city_prebuilder.close()
+            visited_city_cache.close()
+            if battle_outcome_estimator is not None:
+                battle_outcome_estimator.close()
+            name_prefetcher.close()
+            name_provider.close()
+            call_policy.close()
+            print("Below are the statistics of the names generated in this session.\n")
+            print(llm_stats)
+            if os.environ.get("LLM_STATS_FILE", "") != "":
+                llm_stats.dump_json(os.environ["LLM_STATS_FILE"])
+            name_cache.close()
+            terminal.flush()
+            sys.stdout = terminal.stream
             return 0  # successfully saved the game
 
         clear()
 
         print("Below is the representation of the city you are currently in:\n")
-        print(str(saved_game_data.trainer_data.city) + "\n")
+        print(city_renderer.render(saved_game_data.trainer_data) + "\n")
+        city_prebuilder.update(saved_game_data.trainer_data)
+        name_prefetcher.notify_idle()
 
         # Implement possible actions the player can do in the game.
-        allowed: list = ["MOVE TRAINER", "PLACE RUNE", "LEVEL UP RUNE",
+        allowed: list = ["MOVE TRAINER", "GO TO", "PLACE RUNE", "LEVEL UP RUNE",
                          "REMOVE RUNE", "BUY ITEM", "SELL ITEM", "USE ITEM", "MANAGE BATTLE TEAM", "VIEW STATS"]
         print("Enter \"MOVE TRAINER\" to move trainer in the map.")
+        print("Enter \"GO TO\" to walk to the nearest portal, grass, trainer or a tile of your choice.")
         print("Enter \"PLACE RUNE\" to place a rune on a legendary creature.")
         print("Enter \"LEVEL UP RUNE\" to level up a rune.")
         print("Enter \"REMOVE RUNE\" to remove a rune from a legendary creature.")
@@ -1741,6 +5968,7 @@ def main() -> int:
         action: str = input("What do you want to do? ")
         while action not in allowed:
             print("Enter \"MOVE TRAINER\" to move trainer in the map.")
+            print("Enter \"GO TO\" to walk to the nearest portal, grass, trainer or a tile of your choice.")
             print("Enter \"PLACE RUNE\" to place a rune on a legendary creature.")
             print("Enter \"LEVEL UP RUNE\" to level up a rune.")
             print("Enter \"REMOVE RUNE\" to remove a rune from a legendary creature.")
@@ -1769,513 +5997,25 @@ def main() -> int:
             clear()
 
             # Checking the type of tile the player lands on.
-            curr_tile: CityTile = saved_game_data.trainer_data.get_city_tile()
-            if isinstance(curr_tile, PortalTile):
-                # Generate the city where the player is at.
-                city_width: int = random.randint(6, 10)
-                city_height: int = random.randint(6, 10)
-                city_tiles: list = []  # initial value
-                portals: int = 0  # initial value
-                for y in range(city_height):
-                    curr_row: list = []
-                    for x in range(city_width):
-                        if x == 0 and y == 0:
-                            curr_row.append(PavementTile())
-                        elif portals == 0:
-                            if x == city_width - 1 and y == city_height - 1:
-                                portals += 1
-                                curr_row.append(PortalTile())
-                            else:
-                                curr_tile: str = random.choice(["PORTAL", "PAVEMENT", "GRASS"])
-                                if curr_tile == "PORTAL":
-                                    portals += 1
-                                    curr_row.append(PortalTile())
-                                elif curr_tile == "PAVEMENT":
-                                    curr_row.append(PavementTile())
-                                elif curr_tile == "GRASS":
-                                    curr_row.append(GrassTile())
-                        else:
-                            curr_tile: str = random.choice(["PAVEMENT", "GRASS"])
-                            if curr_tile == "PAVEMENT":
-                                curr_row.append(PavementTile())
-                            elif curr_tile == "GRASS":
-                                curr_row.append(GrassTile())
-
-                    city_tiles.append(curr_row)
-                convo = model.start_chat(history=[
-                ])
-                convo.send_message("Please enter a good name of a fictional city (safe one word response only please)!")
-                city_name: str = str(convo.last.text)
-                city: City = City(city_name, city_tiles)
-
-                # Spawn player trainer
-                saved_game_data.trainer_data.city = city
-                saved_game_data.trainer_data.location = AdventureModeLocation(0, 0)
-                city.get_tile_at(0, 0).add_trainer(saved_game_data.trainer_data)
-
-                # Spawn 5 to 10 random AI trainers.
-                num_ai_trainers: int = random.randint(5, 10)
-                for i in range(num_ai_trainers):
-                    tile_x: int = random.randint(0, len(city.get_tiles()[0]) - 1)
-                    tile_y: int = random.randint(0, len(city.get_tiles()) - 1)
-                    while tile_x == 0 and tile_y == 0:
-                        tile_x = random.randint(0, len(city.get_tiles()[0]) - 1)
-                        tile_y = random.randint(0, len(city.get_tiles()) - 1)
-
-                    time.sleep(5)
-                    convo.send_message("Please enter a good male/female game character name "
-                                       "(safe one word response only please)! ")
-                    ai_trainer_name: str = str(convo.last.text)
-                    ai_trainer: AITrainer = AITrainer(ai_trainer_name)
-                    average_player_battle_creature_level: int = (sum(legendary_creature.level for legendary_creature in
-                                                                     saved_game_data.trainer_data.battle_team.get_legendary_creatures())
-                                                                 // len(
-                                saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                    for j in range(5):
-                        new_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
-                                                                     (random.choice(
-                                                                         LegendaryCreature.POTENTIAL_ELEMENTS)))
-                        while new_legendary_creature.level < average_player_battle_creature_level:
-                            new_legendary_creature.exp = new_legendary_creature.required_exp
-                            new_legendary_creature.level_up()
-
-                        ai_trainer.add_legendary_creature(new_legendary_creature)
-                        ai_trainer.add_legendary_creature_to_team(new_legendary_creature)
-
-                    ai_trainer.location = AdventureModeLocation(tile_x, tile_y)
-                    city.get_tile_at(tile_x, tile_y).add_trainer(ai_trainer)
-            elif isinstance(curr_tile, GrassTile):
-                # Determine if a wild or trainer battle occurs or not.
-                wild_battle_occurs: bool = random.random() < 0.5
-                if wild_battle_occurs:
-                    wild_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
-                                                                  (random.choice(LegendaryCreature.POTENTIAL_ELEMENTS)))
-                    average_player_battle_creature_level: int = (sum(legendary_creature.level for legendary_creature in
-                                                                     saved_game_data.trainer_data.battle_team.get_legendary_creatures())
-                                                                 // len(
-                                saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                    while wild_legendary_creature.level < average_player_battle_creature_level:
-                        wild_legendary_creature.exp = wild_legendary_creature.required_exp
-                        wild_legendary_creature.level_up()
-
-                    wild_battle: WildBattle = WildBattle(saved_game_data.trainer_data, wild_legendary_creature)
-                    while not wild_battle.wild_legendary_creature_caught and not wild_battle.trainer_fled \
-                        and wild_battle.winner is None:
-                        print("Below are the current stats of your legendary creatures.\n")
-                        creature_number: int = 1
-                        for legendary_creature in saved_game_data.trainer_data.battle_team.get_legendary_creatures():
-                            print(str(creature_number) + ". " + str(legendary_creature))
-                            creature_number += 1
-
-                        print("\n")
-                        print("Below are the current stats of the wild legendary creature.\n")
-                        print(wild_legendary_creature)
-                        print("\n")
-
-                        wild_battle.get_someone_to_move()
-                        if wild_battle.whose_turn == wild_legendary_creature:
-                            chosen_action: str = random.choice(Action.POSSIBLE_NAMES)
-                            if chosen_action == "NORMAL HEAL":
-                                wild_legendary_creature.have_turn(wild_legendary_creature, None, chosen_action)
-                            elif chosen_action == "NORMAL ATTACK":
-                                target: LegendaryCreature = (
-                                    random.choice(saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                                wild_legendary_creature.have_turn(target, None, chosen_action)
-                            elif chosen_action == "USE SKILL":
-                                skill_to_use: Skill = random.choice(wild_legendary_creature.get_skills())
-                                if skill_to_use.skill_type == "HEAL":
-                                    wild_legendary_creature.have_turn(wild_legendary_creature, skill_to_use, chosen_action)
-                                elif skill_to_use.skill_type == "ATTACK":
-                                    target: LegendaryCreature = (
-                                        random.choice(
-                                            saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                                    wild_legendary_creature.have_turn(target, skill_to_use, chosen_action)
-                                else:
-                                    pass
-                            else:
-                                pass
-                        else:
-                            print("Enter \"NORMAL ATTACK\" for normal attack!")
-                            print("Enter \"NORMAL HEAL\" for normal heal!")
-                            print("Enter \"USE SKILL\" to use a skill!")
-                            print("Enter \"FLEE\" to flee from the wild battle!")
-                            print("Enter \"CATCH\" to catch wild legendary creature!")
-                            battle_action: str = input("What do you want to do? ")
-                            while battle_action not in ["NORMAL ATTACK", "NORMAL HEAL", "USE SKILL", "FLEE", "CATCH"]:
-                                print("Enter \"NORMAL ATTACK\" for normal attack!")
-                                print("Enter \"NORMAL HEAL\" for normal heal!")
-                                print("Enter \"USE SKILL\" to use a skill!")
-                                print("Enter \"FLEE\" to flee from the wild battle!")
-                                print("Enter \"CATCH\" to catch wild legendary creature!")
-                                battle_action = input("Sorry, invalid input! What do you want to do? ")
-
-                            if battle_action == "NORMAL ATTACK":
-                                wild_battle.whose_turn.have_turn(wild_legendary_creature, None, battle_action)
-                            elif battle_action == "NORMAL HEAL":
-                                wild_battle.whose_turn.have_turn(wild_battle.whose_turn, None, battle_action)
-                            elif battle_action == "USE SKILL":
-                                print("Below are the skills that you can use:\n")
-                                skill_number: int = 1
-                                for skill in wild_battle.whose_turn.get_skills():
-                                    print(str(skill_number) + ". " + str(skill))
-                                    skill_number += 1
-
-                                skill_index: int = int(input("Please enter the index of the skill you want to "
-                                                             "use (1 - " +
-                                                             str(len(wild_battle.whose_turn.get_skills())) + "): "))
-                                while skill_index < 1 or skill_index > len(wild_battle.whose_turn.get_skills()):
-                                    skill_index = int(input("Sorry, invalid input! Please enter the index of the skill you want to "
-                                                                 "use (1 - " +
-                                                                 str(len(wild_battle.whose_turn.get_skills())) + "): "))
-
-                                skill_to_use: Skill = wild_battle.whose_turn.get_skills()[skill_index - 1]
-                                if skill_to_use.skill_type == "HEAL":
-                                    wild_battle.whose_turn.have_turn(wild_battle.whose_turn, skill_to_use, battle_action)
-                                elif skill_to_use.skill_type == "ATTACK":
-                                    wild_battle.whose_turn.have_turn(wild_legendary_creature, skill_to_use,
-                                                                     battle_action)
-                                else:
-                                    pass
-                            elif battle_action == "FLEE":
-                                flee_success: bool = random.random() < 0.75
-                                if flee_success:
-                                    print("You successfully fled!")
-                                    wild_battle.trainer_fled = True
-                                    break
-                                else:
-                                    print("Sorry! You can't run away!")
-                            elif battle_action == "CATCH":
-                                ball_objects: list = [item for item in
-                                                      saved_game_data.trainer_data.item_inventory.get_items() if
-                                                      isinstance(item, Ball)]
-                                ball_number: int = 1
-                                for ball in ball_objects:
-                                    print(str(ball_number) + ". " + str(ball))
-                                    ball_number += 1
-
-                                ball_index: int = int(input("Please enter the index of the ball you want to use "
-                                                            "(1 - " + str(len(ball_objects)) + "): "))
-                                while ball_index < 1 or ball_index > len(ball_objects):
-                                    ball_index = int(input("Sorry, invalid input! Please enter the index of the ball "
-                                                           "you want to use (1 - " + str(len(ball_objects)) + "): "))
-
-                                ball_to_use: Ball = ball_objects[ball_index - 1]
-                                catch_success: bool = random.random() < ball_to_use.catch_success_rate
-                                if catch_success:
-                                    print("You successfully caught " + str(wild_legendary_creature.name) + "!")
-                                    saved_game_data.trainer_data.add_legendary_creature(wild_legendary_creature)
-                                    saved_game_data.trainer_data.add_legendary_creature_to_team(wild_legendary_creature)
-                                else:
-                                    print("Cannot catch " + str(wild_legendary_creature.name) + "!")
-                            else:
-                                pass
-
-                        if not wild_legendary_creature.get_is_alive():
-                            wild_battle.winner = wild_battle.trainer1.battle_team
-                            print("You won the battle!")
-                            saved_game_data.trainer_data.claim_reward(wild_battle.reward)
-                            wild_battle.trainer1.battle_team.recover_all()
-                            break
-
-                        if wild_battle.trainer1.battle_team.all_died():
-                            wild_battle.winner = BattleTeam([wild_legendary_creature])
-                            print("You lost!")
-                            wild_battle.trainer1.battle_team.recover_all()
-                            break
+            handle_tile_encounter(saved_game_data, city_prebuilder, visited_city_cache, battle_outcome_estimator)
 
-                else:
-                    if len(curr_tile.get_trainers()) > 1:
-                        trainer_battle_occurs: bool = random.random() < 0.5
-                        if trainer_battle_occurs:
-                            other_trainer: Trainer = random.choice(curr_tile.get_trainers())
-                            while other_trainer == saved_game_data.trainer_data:
-                                other_trainer = random.choice(curr_tile.get_trainers())
-
-                            trainer_battle: TrainerBattle = TrainerBattle(saved_game_data.trainer_data, other_trainer)
-                            while trainer_battle.winner is None:
-                                print("Below are the current stats of your legendary creatures.\n")
-                                creature_number: int = 1
-                                for legendary_creature in saved_game_data.trainer_data.battle_team.get_legendary_creatures():
-                                    print(str(creature_number) + ". " + str(legendary_creature))
-                                    creature_number += 1
-
-                                print("Below are the current stats of your opponent's legendary creatures.\n")
-                                other_creature_number: int = 1
-                                for legendary_creature in trainer_battle.trainer2.battle_team.get_legendary_creatures():
-                                    print(str(other_creature_number) + ". " + str(legendary_creature))
-                                    other_creature_number += 1
-
-                                trainer_battle.get_someone_to_move()
-                                if trainer_battle.whose_turn in other_trainer.battle_team.get_legendary_creatures():
-                                    chosen_action: str = random.choice(Action.POSSIBLE_NAMES)
-                                    if chosen_action == "NORMAL HEAL":
-                                        trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, None, chosen_action)
-                                    elif chosen_action == "NORMAL ATTACK":
-                                        target: LegendaryCreature = (
-                                            random.choice(
-                                                saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                                        trainer_battle.whose_turn.have_turn(target, None, chosen_action)
-                                    elif chosen_action == "USE SKILL":
-                                        skill_to_use: Skill = random.choice(trainer_battle.whose_turn.get_skills())
-                                        if skill_to_use.skill_type == "HEAL":
-                                            trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, skill_to_use, chosen_action)
-                                        elif skill_to_use.skill_type == "ATTACK":
-                                            target: LegendaryCreature = (
-                                                random.choice(
-                                                    saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                                            trainer_battle.whose_turn.have_turn(target, skill_to_use, chosen_action)
-                                        else:
-                                            pass
-                                    else:
-                                        pass
-                                else:
-                                    print("Enter \"NORMAL ATTACK\" for normal attack!")
-                                    print("Enter \"NORMAL HEAL\" for normal heal!")
-                                    print("Enter \"USE SKILL\" to use a skill!")
-                                    battle_action: str = input("What do you want to do? ")
-                                    while battle_action not in ["NORMAL ATTACK", "NORMAL HEAL", "USE SKILL"]:
-                                        print("Enter \"NORMAL ATTACK\" for normal attack!")
-                                        print("Enter \"NORMAL HEAL\" for normal heal!")
-                                        print("Enter \"USE SKILL\" to use a skill!")
-                                        battle_action = input("Sorry, invalid input! What do you want to do? ")
-
-                                    if battle_action == "NORMAL ATTACK":
-                                        print("Below is a list of legendary creatures you can attack:\n")
-                                        creature_index: int = 1
-                                        for legendary_creature in other_trainer.battle_team.get_legendary_creatures():
-                                            print(str(creature_index) + ". " + str(legendary_creature))
-                                            creature_index += 1
-
-                                        target_index: int = int(input("Please enter the index of the legendary creature "
-                                                                      "you want to attack (1 - " +
-                                                                      str(len(other_trainer.battle_team.get_legendary_creatures())) +
-                                                                      "): "))
-                                        while target_index < 1 or target_index > len(other_trainer.battle_team.get_legendary_creatures()):
-                                            target_index = int(
-                                                input("Sorry, invalid input! Please enter the index of the legendary creature "
-                                                      "you want to attack (1 - " +
-                                                      str(len(other_trainer.battle_team.get_legendary_creatures())) +
-                                                      "): "))
-
-                                        target_creature: LegendaryCreature = (
-                                            other_trainer.battle_team.get_legendary_creatures())[target_index - 1]
-                                        trainer_battle.whose_turn.have_turn(target_creature, None, battle_action)
-                                    elif battle_action == "NORMAL HEAL":
-                                        trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, None, battle_action)
-                                    elif battle_action == "USE SKILL":
-                                        print("Below are the skills that you can use:\n")
-                                        skill_number: int = 1
-                                        for skill in trainer_battle.whose_turn.get_skills():
-                                            print(str(skill_number) + ". " + str(skill))
-                                            skill_number += 1
-
-                                        skill_index: int = int(input("Please enter the index of the skill you want to "
-                                                                     "use (1 - " +
-                                                                     str(len(
-                                                                         trainer_battle.whose_turn.get_skills())) + "): "))
-                                        while skill_index < 1 or skill_index > len(trainer_battle.whose_turn.get_skills()):
-                                            skill_index = int(input(
-                                                "Sorry, invalid input! Please enter the index of the skill you want to "
-                                                "use (1 - " +
-                                                str(len(trainer_battle.whose_turn.get_skills())) + "): "))
-
-                                        skill_to_use: Skill = trainer_battle.whose_turn.get_skills()[skill_index - 1]
-                                        if skill_to_use.skill_type == "HEAL":
-                                            trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, skill_to_use, battle_action)
-                                        elif skill_to_use.skill_type == "ATTACK":
-                                            print("Below is a list of legendary creatures you can attack:\n")
-                                            creature_index: int = 1
-                                            for legendary_creature in other_trainer.battle_team.get_legendary_creatures():
-                                                print(str(creature_index) + ". " + str(legendary_creature))
-                                                creature_index += 1
-
-                                            target_index: int = int(
-                                                input("Please enter the index of the legendary creature "
-                                                      "you want to attack (1 - " +
-                                                      str(len(other_trainer.battle_team.get_legendary_creatures())) +
-                                                      "): "))
-                                            while target_index < 1 or target_index > len(
-                                                    other_trainer.battle_team.get_legendary_creatures()):
-                                                target_index = int(
-                                                    input(
-                                                        "Sorry, invalid input! Please enter the index of the legendary creature "
-                                                        "you want to attack (1 - " +
-                                                        str(len(other_trainer.battle_team.get_legendary_creatures())) +
-                                                        "): "))
-
-                                            target_creature: LegendaryCreature = (
-                                                other_trainer.battle_team.get_legendary_creatures())[target_index - 1]
-                                            trainer_battle.whose_turn.have_turn(target_creature, skill_to_use, battle_action)
-                                        else:
-                                            pass
-                                    else:
-                                        pass
-
-                                    if trainer_battle.trainer2.battle_team.all_died():
-                                        trainer_battle.winner = trainer_battle.trainer1.battle_team
-                                        print("You won the battle!")
-                                        saved_game_data.trainer_data.claim_reward(trainer_battle.reward)
-                                        trainer_battle.trainer1.battle_team.recover_all()
-                                        trainer_battle.trainer2.battle_team.recover_all()
-                                        break
-
-                                    if trainer_battle.trainer1.battle_team.all_died():
-                                        trainer_battle.winner = trainer_battle.trainer2.battle_team
-                                        print("You lost!")
-                                        trainer_battle.trainer2.claim_reward(trainer_battle.reward)
-                                        trainer_battle.trainer1.battle_team.recover_all()
-                                        trainer_battle.trainer2.battle_team.recover_all()
-                                        break
-
-            elif isinstance(curr_tile, PavementTile):
-                # Determine if a trainer battle occurs or not.
-                if len(curr_tile.get_trainers()) > 1:
-                    trainer_battle_occurs: bool = random.random() < 0.5
-                    if trainer_battle_occurs:
-                        other_trainer: Trainer = random.choice(curr_tile.get_trainers())
-                        while other_trainer == saved_game_data.trainer_data:
-                            other_trainer = random.choice(curr_tile.get_trainers())
-
-                        trainer_battle: TrainerBattle = TrainerBattle(saved_game_data.trainer_data, other_trainer)
-                        while trainer_battle.winner is None:
-                            print("Below are the current stats of your legendary creatures.\n")
-                            creature_number: int = 1
-                            for legendary_creature in saved_game_data.trainer_data.battle_team.get_legendary_creatures():
-                                print(str(creature_number) + ". " + str(legendary_creature))
-                                creature_number += 1
-
-                            print("Below are the current stats of your opponent's legendary creatures.\n")
-                            other_creature_number: int = 1
-                            for legendary_creature in trainer_battle.trainer2.battle_team.get_legendary_creatures():
-                                print(str(other_creature_number) + ". " + str(legendary_creature))
-                                other_creature_number += 1
-
-                            trainer_battle.get_someone_to_move()
-                            if trainer_battle.whose_turn in other_trainer.battle_team.get_legendary_creatures():
-                                chosen_action: str = random.choice(Action.POSSIBLE_NAMES)
-                                if chosen_action == "NORMAL HEAL":
-                                    trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, None, chosen_action)
-                                elif chosen_action == "NORMAL ATTACK":
-                                    target: LegendaryCreature = (
-                                        random.choice(
-                                            saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                                    trainer_battle.whose_turn.have_turn(target, None, chosen_action)
-                                elif chosen_action == "USE SKILL":
-                                    skill_to_use: Skill = random.choice(trainer_battle.whose_turn.get_skills())
-                                    if skill_to_use.skill_type == "HEAL":
-                                        trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, skill_to_use, chosen_action)
-                                    elif skill_to_use.skill_type == "ATTACK":
-                                        target: LegendaryCreature = (
-                                            random.choice(
-                                                saved_game_data.trainer_data.battle_team.get_legendary_creatures()))
-                                        trainer_battle.whose_turn.have_turn(target, skill_to_use, chosen_action)
-                                    else:
-                                        pass
-                                else:
-                                    pass
-                            else:
-                                print("Enter \"NORMAL ATTACK\" for normal attack!")
-                                print("Enter \"NORMAL HEAL\" for normal heal!")
-                                print("Enter \"USE SKILL\" to use a skill!")
-                                battle_action: str = input("What do you want to do? ")
-                                while battle_action not in ["NORMAL ATTACK", "NORMAL HEAL", "USE SKILL"]:
-                                    print("Enter \"NORMAL ATTACK\" for normal attack!")
-                                    print("Enter \"NORMAL HEAL\" for normal heal!")
-                                    print("Enter \"USE SKILL\" to use a skill!")
-                                    battle_action = input("Sorry, invalid input! What do you want to do? ")
-
-                                if battle_action == "NORMAL ATTACK":
-                                    print("Below is a list of legendary creatures you can attack:\n")
-                                    creature_index: int = 1
-                                    for legendary_creature in other_trainer.battle_team.get_legendary_creatures():
-                                        print(str(creature_index) + ". " + str(legendary_creature))
-                                        creature_index += 1
-
-                                    target_index: int = int(input("Please enter the index of the legendary creature "
-                                                                  "you want to attack (1 - " +
-                                                                  str(len(
-                                                                      other_trainer.battle_team.get_legendary_creatures())) +
-                                                                  "): "))
-                                    while target_index < 1 or target_index > len(
-                                            other_trainer.battle_team.get_legendary_creatures()):
-                                        target_index = int(
-                                            input(
-                                                "Sorry, invalid input! Please enter the index of the legendary creature "
-                                                "you want to attack (1 - " +
-                                                str(len(other_trainer.battle_team.get_legendary_creatures())) +
-                                                "): "))
+            input("Please enter anything to continue: ")
+        elif action == "GO TO":
+            target_text: str = input("Please enter \"PORTAL\", \"GRASS\", \"TRAINER\" or the coordinates \"X,Y\" of "
+                                     "the tile you want to go to: ")
+            while parse_go_to_target(target_text) is None:
+                target_text = input("Sorry, invalid input! Please enter \"PORTAL\", \"GRASS\", \"TRAINER\" or the "
+                                    "coordinates \"X,Y\" of the tile you want to go to: ")
 
-                                    target_creature: LegendaryCreature = (
-                                        other_trainer.battle_team.get_legendary_creatures())[target_index - 1]
-                                    trainer_battle.whose_turn.have_turn(target_creature, None, battle_action)
-                                elif battle_action == "NORMAL HEAL":
-                                    trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, None, battle_action)
-                                elif battle_action == "USE SKILL":
-                                    print("Below are the skills that you can use:\n")
-                                    skill_number: int = 1
-                                    for skill in trainer_battle.whose_turn.get_skills():
-                                        print(str(skill_number) + ". " + str(skill))
-                                        skill_number += 1
-
-                                    skill_index: int = int(input("Please enter the index of the skill you want to "
-                                                                 "use (1 - " +
-                                                                 str(len(
-                                                                     trainer_battle.whose_turn.get_skills())) + "): "))
-                                    while skill_index < 1 or skill_index > len(trainer_battle.whose_turn.get_skills()):
-                                        skill_index = int(input(
-                                            "Sorry, invalid input! Please enter the index of the skill you want to "
-                                            "use (1 - " +
-                                            str(len(trainer_battle.whose_turn.get_skills())) + "): "))
-
-                                    skill_to_use: Skill = trainer_battle.whose_turn.get_skills()[skill_index - 1]
-                                    if skill_to_use.skill_type == "HEAL":
-                                        trainer_battle.whose_turn.have_turn(trainer_battle.whose_turn, skill_to_use, battle_action)
-                                    elif skill_to_use.skill_type == "ATTACK":
-                                        print("Below is a list of legendary creatures you can attack:\n")
-                                        creature_index: int = 1
-                                        for legendary_creature in other_trainer.battle_team.get_legendary_creatures():
-                                            print(str(creature_index) + ". " + str(legendary_creature))
-                                            creature_index += 1
-
-                                        target_index: int = int(
-                                            input("Please enter the index of the legendary creature "
-                                                  "you want to attack (1 - " +
-                                                  str(len(other_trainer.battle_team.get_legendary_creatures())) +
-                                                  "): "))
-                                        while target_index < 1 or target_index > len(
-                                                other_trainer.battle_team.get_legendary_creatures()):
-                                            target_index = int(
-                                                input(
-                                                    "Sorry, invalid input! Please enter the index of the legendary creature "
-                                                    "you want to attack (1 - " +
-                                                    str(len(other_trainer.battle_team.get_legendary_creatures())) +
-                                                    "): "))
-
-                                        target_creature: LegendaryCreature = (
-                                            other_trainer.battle_team.get_legendary_creatures())[target_index - 1]
-                                        trainer_battle.whose_turn.have_turn(target_creature, skill_to_use, battle_action)
-                                    else:
-                                        pass
-                                else:
-                                    pass
-
-                                if trainer_battle.trainer2.battle_team.all_died():
-                                    trainer_battle.winner = trainer_battle.trainer1.battle_team
-                                    print("You won the battle!")
-                                    saved_game_data.trainer_data.claim_reward(trainer_battle.reward)
-                                    trainer_battle.trainer1.battle_team.recover_all()
-                                    trainer_battle.trainer2.battle_team.recover_all()
-                                    break
-
-                                if trainer_battle.trainer1.battle_team.all_died():
-                                    trainer_battle.winner = trainer_battle.trainer2.battle_team
-                                    print("You lost!")
-                                    trainer_battle.trainer2.claim_reward(trainer_battle.reward)
-                                    trainer_battle.trainer1.battle_team.recover_all()
-                                    trainer_battle.trainer2.battle_team.recover_all()
-                                    break
+            # Clearing the command line window.
+            clear()
+
+            num_steps: int = go_to(saved_game_data, parse_go_to_target(target_text), distance_field_cache,
+                                   city_prebuilder, visited_city_cache, battle_outcome_estimator)
+            if num_steps < 0:
+                print("Sorry, there is no such place nearby!")
             else:
-                pass
+                print("You walked " + str(num_steps) + " steps.")
 
             input("Please enter anything to continue: ")
         elif action == "PLACE RUNE":
@@ -2371,60 +6111,11 @@ def main() -> int:
             input("Please enter anything to continue: ")
         elif action == "BUY ITEM":
             clear()
-            items_sold: list = []  # initial value
-            num_items: int = random.randint(30, 50)
-
-            # Populating the items in the item shop
-            for i in range(num_items):
-                item_type: str = random.choice(["BALL", "RUNE", "AWAKEN SHARD", "EXP SHARD", "LEVEL UP SHARD",
-                "SKILL LEVEL UP SHARD"])
-                if item_type == "BALL":
-                    convo = model.start_chat(history=[
-                    ])
-                    convo.send_message("Please enter a good name of a ball to catch a monster like in Pokemon games "
-                                       "(safe one word response only please)!")
-                    ball_name: str = str(convo.last.text)
-                    gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
-                    new_ball: Ball = Ball(ball_name, "A ball to catch a legendary creature.", gold_cost,
-                                          mpf(random.randint(50, 100) / 100))
-                    items_sold.append(new_ball)
-                elif item_type == "RUNE":
-                    convo = model.start_chat(history=[
-                    ])
-                    convo.send_message("Please enter a good name of a rune to strengthen legendary creatures "
-                                       "(safe one word response only please)!")
-                    rune_name: str = str(convo.last.text)
-                    gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
-                    rating: int = random.randint(Rune.MIN_RATING, Rune.MAX_RATING)
-                    slot_number: int = random.randint(Rune.MIN_SLOT_NUMBER, Rune.MAX_SLOT_NUMBER)
-                    new_rune: Rune = Rune(rune_name, "A rune to strengthen legendary creatures.", gold_cost,
-                                          rating, slot_number, rating, rating, rating, rating, rating * 2,
-                                          rating * mpf("0.01"), rating * mpf("0.05"))
-                    items_sold.append(new_rune)
-                elif item_type == "AWAKEN SHARD":
-                    new_awaken_shard: AwakenShard = AwakenShard("Awaken Shard", "A shard to immediately "
-                                                                                "awaken a legendary creature.", mpf("5e7"),
-                                                                random.choice(LegendaryCreature.POTENTIAL_ELEMENTS))
-                    items_sold.append(new_awaken_shard)
-                elif item_type == "EXP SHARD":
-                    gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(6, 11)
-                    exp_granted: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
-                    new_exp_shard: EXPShard = EXPShard("EXP Shard", "An EXP shard used to immediately increase the EXP of a legendary creature.",
-                                                       gold_cost, exp_granted)
-                    items_sold.append(new_exp_shard)
-                elif item_type == "LEVEL UP SHARD":
-                    new_level_up_shard: LevelUpShard = LevelUpShard("Level Up Shard", "A shard to immediately "
-                                                                                "level up a legendary creature.", mpf("5e7"))
-                    items_sold.append(new_level_up_shard)
-                elif item_type == "SKILL LEVEL UP SHARD":
-                    new_skill_level_up_shard: SkillLevelUpShard = SkillLevelUpShard("Skill Level Up Shard", "A shard to immediately "
-                                                                                      "level up a skill a legendary creature has.",
-                                                                    mpf("5e7"))
-                    items_sold.append(new_skill_level_up_shard)
-                else:
-                    pass
-
+            items_sold: list = generate_items_sold(lazy_name_provider)
             item_shop: ItemShop = ItemShop(items_sold)
+
+            # Asking for the names of all balls and runes on sale at once
+            LazyName.resolve_all([item.name for item in item_shop.get_items_sold()])
             print("Below is a list of items in the item shop.\n")
             item_number: int = 1
             for item in item_shop.get_items_sold():
@@ -2581,6 +6272,9 @@ def main() -> int:
             clear()
             print("Below are your current stats.\n")
             print(saved_game_data.trainer_data)
+            print("\nBelow are the statistics of the names generated in this session.\n")
+            print(llm_stats)
+            print(visited_city_cache)
             input("Please enter anything to continue: ")
         else:
             pass
@@ -21,6 +21,9 @@ setup(
     long_description_content_type="text/markdown",
     include_package_data=True,
     install_requires=[],
+    extras_require={
+        "batch": ["numpy"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3.9",
@@ -0,0 +1,128 @@
+import random
+import statistics
+import unittest
+
+from gemini_cli_creature_hunter import gemini_cli_creature_hunter as game
+
+
+def generate_battle_team(rng):
+    # type: (random.Random) -> game.BattleTeam
+    return game.BattleTeam([game.generate_random_legendary_creature(
+        rng.choice(game.LegendaryCreature.POTENTIAL_ELEMENTS), rng)
+        for i in range(game.BattleTeam.MAX_LEGENDARY_CREATURES)])
+
+
+def get_someone_to_move_by_ticking(legendary_creatures):
+    # type: (list) -> game.LegendaryCreature
+    """
+    Finding the legendary creature which moves next the way battles did before AttackGaugeScheduler, by ticking the
+    clock until somebody's attack gauge is full.
+    :return: the legendary creature which moves next
+    """
+
+    full_attack_gauge_list: list = []  # initial value
+    while len(full_attack_gauge_list) == 0:
+        for legendary_creature in legendary_creatures:
+            if legendary_creature.attack_gauge >= legendary_creature.FULL_ATTACK_GAUGE and legendary_creature not \
+                    in full_attack_gauge_list:
+                full_attack_gauge_list.append(legendary_creature)
+
+        for legendary_creature in legendary_creatures:
+            legendary_creature.attack_gauge += legendary_creature.attack_speed * \
+                game.AttackGaugeScheduler.ATTACK_GAUGE_RATE
+
+    whose_turn: game.LegendaryCreature or None = None  # initial value
+    max_attack_gauge = max(legendary_creature.attack_gauge for legendary_creature in full_attack_gauge_list)
+    for legendary_creature in full_attack_gauge_list:
+        if legendary_creature.attack_gauge == max_attack_gauge:
+            whose_turn = legendary_creature
+    return whose_turn
+
+
+class TestAttackGaugeScheduler(unittest.TestCase):
+    """
+    This class contains tests checking that the attack gauge scheduler gives the same turn order as ticking the
+    clock.
+    """
+
+    def test_turn_order_matches_ticking_the_clock(self):
+        # type: () -> None
+        rng: random.Random = random.Random(0)
+        for trial in range(5):
+            legendary_creatures: list = generate_battle_team(rng).get_legendary_creatures() + \
+                generate_battle_team(rng).get_legendary_creatures()
+            ticked_legendary_creatures: list = [legendary_creature.clone()
+                                                for legendary_creature in legendary_creatures]
+            scheduler: game.AttackGaugeScheduler = game.AttackGaugeScheduler(legendary_creatures)
+            for turn in range(200):
+                whose_turn: game.LegendaryCreature = scheduler.get_someone_to_move()
+                ticked_whose_turn: game.LegendaryCreature = get_someone_to_move_by_ticking(
+                    ticked_legendary_creatures)
+                index: int = legendary_creatures.index(whose_turn)
+                self.assertIs(ticked_legendary_creatures[index], ticked_whose_turn)
+                for i in range(len(legendary_creatures)):
+                    self.assertAlmostEqual(float(legendary_creatures[i].attack_gauge),
+                                           float(ticked_legendary_creatures[i].attack_gauge), places=6)
+
+                # The legendary creature which moved starts again, and attack speeds change now and then.
+                whose_turn.attack_gauge = game.LegendaryCreature.MIN_ATTACK_GAUGE
+                ticked_whose_turn.attack_gauge = game.LegendaryCreature.MIN_ATTACK_GAUGE
+                if turn % 25 == 0:
+                    whose_turn.attack_speed *= game.mpf("1.5")
+                    ticked_whose_turn.attack_speed *= game.mpf("1.5")
+
+
+@unittest.skipIf(game.np is None, "NumPy is needed to simulate battles in batches.")
+class TestBatchBattleSimulator(unittest.TestCase):
+    """
+    This class contains tests checking that battles simulated in batches have the same statistics as battles carried
+    out by battle engines.
+    """
+
+    NUM_ENGINE_BATTLES: int = 200
+    NUM_BATCH_BATTLES: int = 4000
+
+    def compare(self, policy_name, policy_class, seed):
+        # type: (str, type, int) -> None
+        rng: random.Random = random.Random(seed)
+        team1: game.BattleTeam = generate_battle_team(rng)
+        team2: game.BattleTeam = team1.clone()
+
+        results: list = [game.BattleEngine(team1.clone(), team2.clone(), policy_class(), game.RandomBattlePolicy(),
+                                           rng=random.Random(i), numeric_backend_name="FLOAT").run()
+                         for i in range(self.NUM_ENGINE_BATTLES)]
+        win_rate: float = sum(result.get_winning_side() == 1 for result in results) / len(results)
+        turns: list = [result.num_turns for result in results]
+
+        batch_result: game.BatchBattleResult = game.BatchBattleSimulator.from_matchups(
+            [(team1, team2)] * self.NUM_BATCH_BATTLES, policy_name, "RANDOM").run(seed)
+        batch_win_rate: float = batch_result.get_win_rate()
+        batch_mean_turns: float = float(batch_result.num_turns.mean())
+
+        # Allowing four standard errors either way
+        win_rate_error: float = (win_rate * (1 - win_rate) / self.NUM_ENGINE_BATTLES +
+                                 batch_win_rate * (1 - batch_win_rate) / self.NUM_BATCH_BATTLES) ** 0.5
+        turns_error: float = statistics.stdev(turns) / self.NUM_ENGINE_BATTLES ** 0.5
+        self.assertLessEqual(abs(win_rate - batch_win_rate), 4 * win_rate_error + 0.01)
+        self.assertLessEqual(abs(statistics.mean(turns) - batch_mean_turns), 4 * turns_error + 0.5)
+
+    def test_random_policies_match_battle_engine(self):
+        # type: () -> None
+        self.compare("RANDOM", game.RandomBattlePolicy, 2)
+
+    def test_focused_policy_matches_battle_engine(self):
+        # type: () -> None
+        self.compare("FOCUSED", game.FocusedBattlePolicy, 2)
+
+    def test_same_seed_gives_same_battles(self):
+        # type: () -> None
+        rng: random.Random = random.Random(3)
+        matchups: list = [(generate_battle_team(rng), generate_battle_team(rng)) for i in range(20)]
+        first_result: game.BatchBattleResult = game.BatchBattleSimulator.from_matchups(matchups).run(5)
+        second_result: game.BatchBattleResult = game.BatchBattleSimulator.from_matchups(matchups).run(5)
+        self.assertEqual(first_result.winning_sides.tolist(), second_result.winning_sides.tolist())
+        self.assertEqual(first_result.num_turns.tolist(), second_result.num_turns.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+import pickle
+import random
+import unittest
+from collections import deque
+
+from gemini_cli_creature_hunter import gemini_cli_creature_hunter as game
+
+
+def make_city(tile_types):
+    # type: (list) -> game.City
+    return game.City("Test", [[tile_type() for tile_type in row] for row in tile_types])
+
+
+def place_trainer(city, trainer, x, y):
+    # type: (game.City, game.Trainer, int, int) -> None
+    trainer.city = city
+    trainer.location = game.AdventureModeLocation(x, y)
+    city.get_tile_at(x, y).add_trainer(trainer)
+
+
+def get_trainer_names(city, bounds):
+    # type: (game.City, tuple) -> dict
+    min_x, min_y, max_x, max_y = bounds
+    return {(x, y): sorted(str(trainer.name) for trainer in city.get_tile_at(x, y).get_trainers())
+            for y in range(min_y, max_y) for x in range(min_x, max_x)
+            if city.get_tile_at(x, y).count_trainers() > 0}
+
+
+def get_tile_types(city, bounds):
+    # type: (game.City, tuple) -> list
+    min_x, min_y, max_x, max_y = bounds
+    return [[type(city.get_tile_at(x, y)).__name__ for x in range(min_x, max_x)] for y in range(min_y, max_y)]
+
+
+class TestTrainerOccupancyIndex(unittest.TestCase):
+    """
+    This class contains tests checking the trainer occupancy index of a city against every tile of the city.
+    """
+
+    def test_matches_tile_scan_after_random_moves(self):
+        # type: () -> None
+        rng: random.Random = random.Random(0)
+        city: game.City = make_city([[game.PavementTile] * 6 for y in range(5)])
+        expected_locations: dict = {}  # initial value
+        trainers: list = [game.Trainer("Trainer" + str(i)) for i in range(12)]
+        for step in range(500):
+            trainer: game.Trainer = rng.choice(trainers)
+            if trainer in expected_locations and rng.random() < 0.3:
+                x, y = expected_locations.pop(trainer)
+                self.assertTrue(city.get_tile_at(x, y).remove_trainer(trainer))
+            elif trainer in expected_locations:
+                x, y = expected_locations[trainer]
+                trainer.location = game.AdventureModeLocation(x, y)
+                if rng.choice([trainer.move_up, trainer.move_down, trainer.move_left, trainer.move_right])():
+                    expected_locations[trainer] = (trainer.location.tile_x, trainer.location.tile_y)
+            else:
+                x, y = rng.randrange(6), rng.randrange(5)
+                place_trainer(city, trainer, x, y)
+                expected_locations[trainer] = (x, y)
+
+            for y in range(5):
+                for x in range(6):
+                    expected_trainers: set = {id(other) for other, location in expected_locations.items()
+                                              if location == (x, y)}
+                    self.assertEqual({id(other) for other in city.get_tile_at(x, y).get_trainers()},
+                                     expected_trainers)
+                    self.assertEqual(city.occupancy.count(x, y), len(expected_trainers))
+
+            self.assertEqual(sorted(city.occupancy.get_occupied_locations()),
+                             sorted(set(expected_locations.values())))
+            self.assertEqual(len(city.occupancy), len(expected_locations))
+
+    def test_choose_opponent_never_chooses_the_trainer_itself(self):
+        # type: () -> None
+        occupancy: game.TrainerOccupancyIndex = game.TrainerOccupancyIndex()
+        player: game.Trainer = game.Trainer("Player")
+        others: list = [game.Trainer("Other" + str(i)) for i in range(3)]
+        for trainer in [others[0], player] + others[1:]:
+            occupancy.add(1, 1, trainer)
+
+        rng: random.Random = random.Random(0)
+        chosen: set = {id(occupancy.choose_opponent(1, 1, player, rng)) for i in range(200)}
+        self.assertEqual(chosen, {id(other) for other in others})
+
+        for other in others:
+            occupancy.remove(1, 1, other)
+        self.assertIsNone(occupancy.choose_opponent(1, 1, player, rng))
+
+
+class TestDistanceField(unittest.TestCase):
+    """
+    This class contains tests checking the paths given by distance fields.
+    """
+
+    @staticmethod
+    def get_reference_distances(width, height, targets, blocked):
+        # type: (int, int, list, set) -> dict
+        distances: dict = {target: 0 for target in targets}
+        frontier: deque = deque(targets)
+        while len(frontier) > 0:
+            x, y = frontier.popleft()
+            for next_location in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                if 0 <= next_location[0] < width and 0 <= next_location[1] < height and \
+                        next_location not in distances and next_location not in blocked:
+                    distances[next_location] = distances[(x, y)] + 1
+                    frontier.append(next_location)
+        return distances
+
+    def test_paths_are_shortest_and_avoid_blocked_tiles(self):
+        # type: () -> None
+        rng: random.Random = random.Random(1)
+        width, height = 12, 9
+        for trial in range(20):
+            locations: list = [(x, y) for y in range(height) for x in range(width)]
+            rng.shuffle(locations)
+            targets: list = locations[:3]
+            blocked: set = set(locations[3:3 + 25])
+            field: game.DistanceField = game.DistanceField((0, 0, width, height), targets, blocked)
+            reference_distances: dict = self.get_reference_distances(width, height, targets, blocked)
+            steps: dict = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+            for x, y in locations:
+                if (x, y) in blocked:
+                    continue
+
+                distance: int = field.get_distance(x, y)
+                self.assertEqual(distance, reference_distances.get((x, y), game.DistanceField.UNREACHABLE))
+                if distance == game.DistanceField.UNREACHABLE:
+                    self.assertIsNone(field.get_next_step(x, y))
+                    continue
+
+                # Following the field reaches a target in exactly 'distance' steps without stepping on a blocked tile.
+                for i in range(distance):
+                    step_x, step_y = steps[field.get_next_step(x, y)]
+                    x, y = x + step_x, y + step_y
+                    self.assertNotIn((x, y), blocked)
+                self.assertIn((x, y), targets)
+                self.assertIsNone(field.get_next_step(x, y))
+
+    def test_go_to_routes_around_portals_which_are_not_the_target(self):
+        # type: () -> None
+        tile_types: list = [[game.PavementTile] * 6 for y in range(6)]
+        tile_types[3][0] = game.PortalTile
+        city: game.City = make_city(tile_types)
+        player: game.Trainer = game.Trainer("Player")
+        place_trainer(city, player, 0, 0)
+        cache: game.DistanceFieldCache = game.DistanceFieldCache()
+
+        field: game.DistanceField = cache.get_field(player, (5, 5))
+        x, y = 0, 0
+        steps: dict = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+        while field.get_next_step(x, y) is not None:
+            step_x, step_y = steps[field.get_next_step(x, y)]
+            x, y = x + step_x, y + step_y
+            self.assertNotEqual((x, y), (0, 3))
+        self.assertEqual((x, y), (5, 5))
+
+        self.assertEqual(cache.get_field(player, "PORTAL").get_distance(0, 0), 3)
+
+
+class TestCityPickling(unittest.TestCase):
+    """
+    This class contains tests checking that cities saved as their seed and the changes made to them since are loaded
+    back the same, for each city representation.
+    """
+
+    def setUp(self):
+        # type: () -> None
+        random.seed(0)
+        self.name_provider: game.NameProvider = game.LocalNameProvider()
+
+    def check_round_trip(self, city, bounds):
+        # type: (game.City, tuple) -> game.City
+        loaded_city: game.City = pickle.loads(pickle.dumps(city))
+        self.assertEqual(loaded_city.city_id, city.city_id)
+        self.assertEqual(str(loaded_city.name), str(city.name))
+        self.assertEqual(get_tile_types(loaded_city, bounds), get_tile_types(city, bounds))
+        self.assertEqual(get_trainer_names(loaded_city, bounds), get_trainer_names(city, bounds))
+        return loaded_city
+
+    def test_grid_and_compact_cities(self):
+        # type: () -> None
+        for city_representation in ["GRID", "COMPACT"]:
+            with self.subTest(city_representation=city_representation):
+                city: game.City = game.build_city(self.name_provider, 1, city_representation, seed=7)
+                bounds: tuple = (0, 0, len(city.get_tiles()[0]), len(city.get_tiles()))
+                ai_trainers: list = [trainer for location in city.occupancy.get_occupied_locations()
+                                     for trainer in city.occupancy.get_trainers(*location)]
+
+                # An AI trainer which lost a battle, one which left and a trainer which entered
+                ai_trainers[0].gold = game.mpf("123")
+                city.record_trainer_update(ai_trainers[0])
+                city.get_tile_at(ai_trainers[1].location.tile_x,
+                                 ai_trainers[1].location.tile_y).remove_trainer(ai_trainers[1])
+                place_trainer(city, game.Trainer("Player"), 0, 0)
+
+                loaded_city: game.City = self.check_round_trip(city, bounds)
+                loaded_trainer: game.Trainer = next(
+                    trainer for trainer in loaded_city.get_tile_at(ai_trainers[0].location.tile_x,
+                                                                   ai_trainers[0].location.tile_y).get_trainers()
+                    if str(trainer.name) == str(ai_trainers[0].name))
+                self.assertEqual(loaded_trainer.gold, game.mpf("123"))
+
+    def test_chunked_city_keeps_ai_trainer_changes(self):
+        # type: () -> None
+        city: game.ChunkedCity = game.ChunkedCity("Test", 1000, 1000, 7, 1, max_loaded_chunks=4)
+        chunks_with_ai_trainers: list = [(chunk_x, chunk_y) for chunk_y in range(4) for chunk_x in range(4)
+                                         if len(city.get_chunk(chunk_x, chunk_y).ai_trainers) > 0]
+        changed_chunk, left_chunk = chunks_with_ai_trainers[:2]
+
+        changed_ai_trainer: game.Trainer = city.get_chunk(*changed_chunk).ai_trainers[0]
+        changed_ai_trainer.gold = game.mpf("123")
+        city.record_trainer_update(changed_ai_trainer)
+        left_ai_trainer: game.Trainer = city.get_chunk(*left_chunk).ai_trainers[0]
+        left_location: tuple = (left_ai_trainer.location.tile_x, left_ai_trainer.location.tile_y)
+        self.assertTrue(city.get_tile_at(*left_location).remove_trainer(left_ai_trainer))
+
+        # Unloading both chunks, so that they are generated again from the seed
+        for chunk_y in range(8, 12):
+            for chunk_x in range(8, 12):
+                city.get_chunk(chunk_x, chunk_y)
+
+        for loaded_city in [city, pickle.loads(pickle.dumps(city))]:
+            self.assertEqual(loaded_city.get_chunk(*changed_chunk).ai_trainers[0].gold, game.mpf("123"))
+            self.assertIsNone(loaded_city.get_chunk(*left_chunk).ai_trainers[0])
+            self.assertNotIn(str(left_ai_trainer.name),
+                             [str(trainer.name) for trainer in loaded_city.get_occupants(*left_location)])
+
+        bounds: tuple = (0, 0, 40, 40)
+        self.check_round_trip(city, bounds)
+
+    def test_unresolved_names_are_not_resolved_by_saving(self):
+        # type: () -> None
+        class CountingNameProvider(game.NameProvider):
+            def __init__(self):
+                # type: () -> None
+                self.num_names: int = 0
+
+            def generate_names(self, prompts):
+                # type: (list) -> list
+                self.num_names += len(prompts)
+                return ["Name" + str(i) for i in range(len(prompts))]
+
+        counting_name_provider: CountingNameProvider = CountingNameProvider()
+        city: game.City = game.build_city(game.LazyNameProvider(counting_name_provider), 1, "GRID", seed=7)
+        saved_city: bytes = pickle.dumps(city)
+        city.clone()
+        self.assertEqual(counting_name_provider.num_names, 0)
+
+        game.LazyName.NAME_PROVIDER = counting_name_provider
+        try:
+            self.assertEqual(str(pickle.loads(saved_city).name), "Name0")
+        finally:
+            game.LazyName.NAME_PROVIDER = None
+        self.assertEqual(counting_name_provider.num_names, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import time
+import unittest
+
+from gemini_cli_creature_hunter import gemini_cli_creature_hunter as game
+
+
+class TestNameCache(unittest.TestCase):
+    """
+    This class contains tests checking which names the name cache evicts.
+    """
+
+    def setUp(self):
+        # type: () -> None
+        self.directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.file_name: str = os.path.join(self.directory.name, "names.sqlite3")
+
+    def tearDown(self):
+        # type: () -> None
+        self.directory.cleanup()
+
+    def test_keeps_only_the_newest_names_of_a_key(self):
+        # type: () -> None
+        name_cache: game.NameCache = game.NameCache(self.file_name, max_names_per_key=3)
+        for i in range(5):
+            name_cache.add_name("key", "Name" + str(i))
+            time.sleep(0.01)
+
+        self.assertEqual(name_cache.count_names("key"), 3)
+        self.assertEqual(sorted(name_cache.get_names("key", 10)), ["Name2", "Name3", "Name4"])
+        name_cache.close()
+
+    def test_evicts_the_least_recently_used_keys(self):
+        # type: () -> None
+        name_cache: game.NameCache = game.NameCache(self.file_name, max_keys=2)
+        name_cache.add_name("key1", "Name1")
+        time.sleep(0.01)
+        name_cache.add_name("key2", "Name2")
+        time.sleep(0.01)
+        name_cache.get_names("key1", 1)  # key1 is now used more recently than key2
+        time.sleep(0.01)
+        name_cache.add_name("key3", "Name3")
+
+        self.assertEqual(name_cache.get_names("key1", 10), ["Name1"])
+        self.assertEqual(name_cache.get_names("key2", 10), [])
+        self.assertEqual(name_cache.get_names("key3", 10), ["Name3"])
+        name_cache.close()
+
+    def test_evicts_names_which_are_too_old(self):
+        # type: () -> None
+        name_cache: game.NameCache = game.NameCache(self.file_name, max_age_seconds=0.05)
+        name_cache.add_name("key", "Name")
+        self.assertEqual(name_cache.count_names("key"), 1)
+        time.sleep(0.1)
+        self.assertEqual(name_cache.count_names("key"), 0)
+        self.assertEqual(name_cache.get_names("key", 10), [])
+        name_cache.close()
+
+    def test_names_survive_reopening(self):
+        # type: () -> None
+        name_cache: game.NameCache = game.NameCache(self.file_name)
+        name_cache.add_name("key", "Name")
+        name_cache.close()
+
+        name_cache = game.NameCache(self.file_name)
+        self.assertEqual(name_cache.get_names("key", 10), ["Name"])
+        name_cache.close()
+
+
+class TestGeminiCallPolicy(unittest.TestCase):
+    """
+    This class contains tests checking how calls to a StubGenerativeModel are retried and stopped by the circuit
+    breaker.
+    """
+
+    def make_client_manager(self, model, failure_threshold=5, reset_timeout_seconds=60, timeout_seconds=5):
+        # type: (game.StubGenerativeModel, int, float, float) -> game.GeminiClientManager
+        call_policy: game.GeminiCallPolicy = game.GeminiCallPolicy(
+            timeout_seconds=timeout_seconds, max_retries=2, base_backoff_seconds=0, max_backoff_seconds=0,
+            circuit_breaker=game.CircuitBreaker(failure_threshold, reset_timeout_seconds))
+        return game.GeminiClientManager({}, [], model_factory=lambda generation_config, safety_settings: model,
+                                        call_policy=call_policy)
+
+    def test_successful_call_is_not_retried(self):
+        # type: () -> None
+        model: game.StubGenerativeModel = game.StubGenerativeModel(canned_names=["Name"])
+        client_manager: game.GeminiClientManager = self.make_client_manager(model)
+        self.assertEqual(game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT), "Name")
+        self.assertEqual(model.num_calls, 1)
+        self.assertEqual(client_manager.call_policy.circuit_breaker.state, "CLOSED")
+
+    def test_server_errors_and_rate_limits_are_retried(self):
+        # type: () -> None
+        for model in [game.StubGenerativeModel(failure_rate=1), game.StubGenerativeModel(rate_limit_rate=1)]:
+            client_manager: game.GeminiClientManager = self.make_client_manager(model)
+            with self.assertRaises(game.GeminiUnavailableError):
+                game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT)
+            self.assertEqual(model.num_calls, 3)
+
+    def test_refused_requests_fail_at_once(self):
+        # type: () -> None
+        call_policy: game.GeminiCallPolicy = game.GeminiCallPolicy(base_backoff_seconds=0, max_backoff_seconds=0)
+        num_calls: list = [0]
+
+        def refuse():
+            # type: () -> None
+            num_calls[0] += 1
+            raise ValueError("The response was blocked.")
+
+        with self.assertRaises(game.GeminiRequestError):
+            call_policy.call(refuse)
+        self.assertEqual(num_calls[0], 1)
+        self.assertEqual(call_policy.circuit_breaker.state, "CLOSED")
+
+    def test_attempts_running_past_their_deadline_are_retried(self):
+        # type: () -> None
+        model: game.StubGenerativeModel = game.StubGenerativeModel(latency_parameters=(1,))
+        client_manager: game.GeminiClientManager = self.make_client_manager(model, timeout_seconds=0.05)
+        start_time: float = time.perf_counter()
+        with self.assertRaises(game.GeminiUnavailableError):
+            game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT)
+        self.assertLess(time.perf_counter() - start_time, 0.9)
+        self.assertEqual(model.num_calls, 3)
+
+    def test_circuit_breaker_stops_calls_until_the_reset_timeout(self):
+        # type: () -> None
+        model: game.StubGenerativeModel = game.StubGenerativeModel(failure_rate=1, canned_names=["Name"])
+        client_manager: game.GeminiClientManager = self.make_client_manager(model, failure_threshold=3,
+                                                                            reset_timeout_seconds=0.2)
+        circuit_breaker: game.CircuitBreaker = client_manager.call_policy.circuit_breaker
+        with self.assertRaises(game.GeminiUnavailableError):
+            game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT)
+        self.assertEqual(circuit_breaker.state, "OPEN")
+
+        # While the circuit breaker is open, Google Gemini AI is not called at all.
+        with self.assertRaises(game.GeminiUnavailableError):
+            game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT)
+        self.assertEqual(model.num_calls, 3)
+
+        # After the reset timeout, one trial call closes the circuit breaker again if it succeeds.
+        time.sleep(0.25)
+        model.failure_rate = 0
+        self.assertEqual(game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT), "Name")
+        self.assertEqual(circuit_breaker.state, "CLOSED")
+        self.assertEqual(model.num_calls, 4)
+
+    def test_failed_trial_call_opens_the_circuit_breaker_again(self):
+        # type: () -> None
+        model: game.StubGenerativeModel = game.StubGenerativeModel(failure_rate=1)
+        client_manager: game.GeminiClientManager = self.make_client_manager(model, failure_threshold=3,
+                                                                            reset_timeout_seconds=0.2)
+        with self.assertRaises(game.GeminiUnavailableError):
+            game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT)
+
+        time.sleep(0.25)
+        with self.assertRaises(game.GeminiUnavailableError):
+            game.ask_gemini_for_name(client_manager, game.CITY_NAME_PROMPT)
+        self.assertEqual(model.num_calls, 4)
+        self.assertEqual(client_manager.call_policy.circuit_breaker.state, "OPEN")
+
+    def test_unavailable_names_fall_back_to_local_names(self):
+        # type: () -> None
+        model: game.StubGenerativeModel = game.StubGenerativeModel(failure_rate=1)
+        name_provider: game.GeminiNameProvider = game.GeminiNameProvider(self.make_client_manager(model))
+        names: list = name_provider.generate_names([game.CITY_NAME_PROMPT] * 3 + [game.RUNE_NAME_PROMPT])
+        self.assertEqual(len(names), 4)
+        self.assertTrue(all(isinstance(name, str) and len(name) > 0 for name in names))
+
+
+if __name__ == "__main__":
+    unittest.main()